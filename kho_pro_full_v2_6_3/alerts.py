@@ -0,0 +1,120 @@
+"""Cảnh báo tồn thấp: bảng canh_bao_ton giữ lịch sử mở / đóng cảnh báo.
+
+Một cảnh báo MỞ (dong_luc IS NULL) cho mỗi (kho, SP) đang có so_luong <= nguong_canh_bao.
+Điều kiện so sánh hai cột của ton_kho không dùng được chỉ mục, nên trạng thái
+được duy trì ngay khi ghi tồn: stock_engine gọi on_stock() với tồn mới +
+ngưỡng của các dòng vừa ghi; đổi ngưỡng thì gọi sync(). Trang cảnh báo và
+API đếm chỉ đọc các dòng đang mở (chỉ mục ix_cbt_mo: dong_luc, id_kho).
+"""
+from datetime import datetime
+
+from sqlalchemy import select, update, insert, func, tuple_, bindparam
+
+from models import db, CanhBaoTon, TonKho, SanPham
+
+cbt = CanhBaoTon.__table__
+ton_kho = TonKho.__table__
+
+
+def _active(keys):
+    """{(id_kho, id_sp): id cảnh báo đang mở} cho các khóa."""
+    if not keys:
+        return {}
+    return {
+        (k, sp): cid for cid, k, sp in db.session.execute(
+            select(cbt.c.id, cbt.c.id_kho, cbt.c.id_san_pham)
+            .where(cbt.c.dong_luc.is_(None), tuple_(cbt.c.id_kho, cbt.c.id_san_pham).in_(list(keys)))
+        )
+    }
+
+
+def on_stock(rows, now=None):
+    """rows: (id_kho, id_sp, so_luong, nguong) sau khi ghi; mở / cập nhật / đóng cảnh báo tương ứng."""
+    rows = {(k, sp): (int(q), int(n)) for k, sp, q, n in rows}
+    if not rows:
+        return
+    now = now or datetime.now()
+    active = _active(rows)
+    opened, changed, closed = [], [], []
+    for key, (q, n) in rows.items():
+        cid = active.get(key)
+        if q <= n:
+            if cid is None:
+                opened.append(dict(id_kho=key[0], id_san_pham=key[1], so_luong=q, nguong=n, mo_luc=now))
+            else:
+                changed.append({"b_id": cid, "b_q": q, "b_n": n})
+        elif cid is not None:
+            closed.append({"b_id": cid, "b_q": q, "b_n": n, "b_t": now})
+    if opened:
+        db.session.execute(insert(cbt), opened)
+    if changed:
+        db.session.execute(
+            update(cbt).where(cbt.c.id == bindparam("b_id"))
+            .values(so_luong=bindparam("b_q"), nguong=bindparam("b_n")),
+            changed,
+        )
+    if closed:
+        db.session.execute(
+            update(cbt).where(cbt.c.id == bindparam("b_id"))
+            .values(so_luong=bindparam("b_q"), nguong=bindparam("b_n"), dong_luc=bindparam("b_t")),
+            closed,
+        )
+
+
+def sync(keys=None, batch=1000):
+    """Đối chiếu lại cảnh báo với ton_kho (keys=None: toàn bảng, theo lô); trả về số dòng đã xét.
+
+    Dùng sau khi đổi nguong_canh_bao hoặc khi ton_kho bị sửa ngoài app.
+    """
+    cols = (ton_kho.c.id_kho, ton_kho.c.id_san_pham, ton_kho.c.so_luong, ton_kho.c.nguong_canh_bao)
+    if keys is not None:
+        keys = list(keys)
+        if keys:
+            on_stock(db.session.execute(
+                select(*cols).where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(keys))
+            ).all())
+        return len(keys)
+
+    total, last = 0, None
+    while True:
+        q = select(*cols).order_by(ton_kho.c.id_kho, ton_kho.c.id_san_pham).limit(batch)
+        if last is not None:
+            q = q.where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham) > last)
+        rows = db.session.execute(q).all()
+        if not rows:
+            break
+        on_stock(rows)
+        db.session.commit()
+        total += len(rows)
+        last = tuple_(*rows[-1][:2])
+    # cảnh báo mở của dòng ton_kho đã bị xóa
+    orphan = (
+        select(cbt.c.id)
+        .outerjoin(ton_kho, (ton_kho.c.id_kho == cbt.c.id_kho) & (ton_kho.c.id_san_pham == cbt.c.id_san_pham))
+        .where(cbt.c.dong_luc.is_(None), ton_kho.c.id_kho.is_(None))
+    )
+    ids = db.session.execute(orphan).scalars().all()
+    if ids:
+        db.session.execute(update(cbt).where(cbt.c.id.in_(ids)).values(dong_luc=datetime.now()))
+    db.session.commit()
+    return total
+
+
+def active_query(kho=None):
+    """SELECT các cảnh báo đang mở (kèm tên SP), kho=None / 'ALL' = mọi kho."""
+    q = (
+        select(CanhBaoTon, SanPham.ten_san_pham)
+        .join(SanPham, SanPham.id_san_pham == CanhBaoTon.id_san_pham)
+        .where(CanhBaoTon.dong_luc.is_(None))
+    )
+    if kho and kho != "ALL":
+        q = q.where(CanhBaoTon.id_kho == kho)
+    return q
+
+
+def count_active(kho=None):
+    """Số cảnh báo đang mở: COUNT trên chỉ mục ix_cbt_mo, không chạm ton_kho."""
+    q = select(func.count()).select_from(cbt).where(cbt.c.dong_luc.is_(None))
+    if kho and kho != "ALL":
+        q = q.where(cbt.c.id_kho == kho)
+    return db.session.execute(q).scalar() or 0
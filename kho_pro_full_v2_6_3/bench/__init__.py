@@ -0,0 +1,7 @@
+"""Đo hiệu năng: sinh dữ liệu quy mô lớn (datagen), đo các route (harness),
+đo thời gian khởi động worker (startup).
+
+    flask bench-data --scale 1 --reset      # nạp ~1 triệu dòng hóa đơn
+    flask bench-run --out bench.json --compare bench_cu.json
+    flask bench-startup --out startup.json  # import / create_app / request đầu
+"""
@@ -0,0 +1,209 @@
+"""Sinh dữ liệu giả lập theo hệ số quy mô (scale) để đo hiệu năng.
+
+scale=1 ~ 2.000 SP, 1.000 KH, 200k dòng nhập, 800k dòng xuất trải trên `days`
+ngày; độ phổ biến SP lệch (vài mã bán chạy chiếm phần lớn dòng xuất).
+Dòng được chèn theo lô bằng executemany (chạy được trên SQLite lẫn MySQL),
+sau đó các bảng dẫn xuất được dựng lại bằng chính code của app: ton_kho,
+gia_von_tb / lop_gia_von, doanh_thu_ngay, canh_bao_ton, chi_so_kho, tim_kiem.
+"""
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import accumulate
+
+from sqlalchemy import insert, select, func, delete
+
+from models import (
+    db, User, DiaDiem, Kho, NhanVien, NhaCungCap, XeVanChuyen, SanPham, KhachHang,
+    HoaDonNhap, HoaDonXuat, DieuChuyen, DieuChuyenCT, TonKho, GiaVonTB, LopGiaVon,
+)
+import alerts
+import costing
+import kpi
+import passwords
+from rollup import rebuild as rebuild_doanh_thu
+from search import SEARCH_FIELDS, ensure_search_schema, reindex
+
+LOAI = ["Bàn", "Ghế", "Tủ", "Kệ", "Giường", "Sofa", "Đèn", "Gương", "Tab", "Bàn trà"]
+CHAT_LIEU = ["Gỗ sồi", "Gỗ thông", "Nhựa", "Sắt", "Inox", "Mây", "Kính"]
+MAU = ["Nâu", "Trắng", "Đen", "Xám", "Be", "Xanh"]
+HO = ["Nguyễn", "Trần", "Lê", "Phạm", "Hoàng", "Phan", "Vũ", "Đặng", "Bùi", "Đỗ"]
+TEN = ["An", "Bình", "Chi", "Dũng", "Giang", "Hà", "Hùng", "Lan", "Minh", "Nam", "Phương", "Quân", "Thảo", "Vy"]
+TINH = ["Hà Nội", "Hải Phòng", "Đà Nẵng", "Huế", "Cần Thơ", "TP HCM", "Nha Trang", "Vinh"]
+
+DEFAULT_USERS = [
+    ("admin", "admin123", "Quản trị hệ thống", "admin", None),
+    ("nv1", "123456", "Nhân viên Kho 1", "staff", "K1"),
+    ("nv2", "123456", "Nhân viên Kho 2", "staff", "K2"),
+    ("nv3", "123456", "Nhân viên Kho 3", "staff", "K3"),
+]
+
+
+def sizes(scale):
+    """Số lượng từng loại bản ghi cho một hệ số quy mô."""
+    return dict(
+        kho=min(20, 3 + int(2 * scale)),
+        san_pham=max(50, int(2000 * scale)),
+        khach_hang=max(20, int(1000 * scale)),
+        nha_cung_cap=max(5, int(50 * scale)),
+        xe=max(3, int(20 * scale)),
+        nhap=max(200, int(200_000 * scale)),
+        xuat=max(800, int(800_000 * scale)),
+        dieu_chuyen=max(20, int(5_000 * scale)),
+    )
+
+
+def _bulk(table, rows, batch):
+    for i in range(0, len(rows), batch):
+        db.session.execute(insert(table), rows[i:i + batch])
+        db.session.commit()
+
+
+def reset():
+    """Xóa sạch dữ liệu mọi bảng (kể cả users; tài khoản mặc định được tạo lại)."""
+    for t in reversed(db.metadata.sorted_tables):
+        db.session.execute(delete(t))
+    db.session.commit()
+
+
+class _Picker:
+    """Chọn SP theo phân phối lệch (Zipf nhẹ), nhanh cho hàng triệu lần chọn."""
+
+    def __init__(self, items, rng, skew=0.9):
+        self.items, self.rng = items, rng
+        self.cum = list(accumulate(1 / (i + 1) ** skew for i in range(len(items))))
+
+    def take(self, k):
+        # k mã khác nhau cho một hóa đơn
+        out = set()
+        while len(out) < k:
+            out.update(self.rng.choices(self.items, cum_weights=self.cum, k=k - len(out)))
+        return list(out)
+
+
+def _invoices(n_lines, start, span, rng, make_lines):
+    """Sinh dòng hóa đơn theo thứ tự thời gian; mỗi hóa đơn 1-5 dòng (hóa đơn cuối giữ đủ dòng)."""
+    n_inv = max(1, n_lines // 3)
+    lines, i = [], 0
+    while len(lines) < n_lines:
+        t = start + span * (i / n_inv) + timedelta(minutes=rng.randint(0, 600))
+        lines.extend(make_lines(i + 1, t.replace(hour=7 + t.hour % 13, second=0, microsecond=0)))
+        i += 1
+    return lines
+
+
+def generate(scale=1.0, days=730, seed=42, batch=5000, progress=print):
+    """Nạp bộ dữ liệu vào DB đang cấu hình (DB phải trống); trả về dict số dòng."""
+    if db.session.execute(select(func.count()).select_from(Kho)).scalar():
+        raise RuntimeError("DB đã có dữ liệu; dùng reset() (--reset) trước khi sinh.")
+    rng = random.Random(seed)
+    n = sizes(scale)
+    end = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    start = end - timedelta(days=days)
+    span = end - start
+
+    # --- danh mục ---
+    _bulk(DiaDiem.__table__, [dict(id_dia_diem=f"DD{i:02d}", ten_dia_diem=t) for i, t in enumerate(TINH, 1)], batch)
+    khos = [f"K{i}" for i in range(1, n["kho"] + 1)]
+    _bulk(Kho.__table__, [dict(id_kho=k, ten_kho=f"Kho {k}", id_dia_diem=f"DD{i % len(TINH) + 1:02d}")
+                          for i, k in enumerate(khos)], batch)
+    nvs = [f"NV{i:03d}" for i in range(0, 3 * n["kho"] + 1)]
+    _bulk(NhanVien.__table__, [dict(id_nhan_vien=v, ho=rng.choice(HO), ten=rng.choice(TEN)) for v in nvs], batch)
+    nccs = [f"NCC{i:03d}" for i in range(1, n["nha_cung_cap"] + 1)]
+    _bulk(NhaCungCap.__table__, [dict(id_nha_cung_cap=c, ten_nha_cung_cap=f"Công ty {rng.choice(HO)} {rng.choice(TEN)} {c}",
+                                      so_dien_thoai_nha_cung_cap=f"09{rng.randrange(10**8):08d}") for c in nccs], batch)
+    xes = [f"VC{i:03d}" for i in range(1, n["xe"] + 1)]
+    _bulk(XeVanChuyen.__table__, [dict(id_xe_van_chuyen=x, bien_so=f"29C-{rng.randrange(10**5):05d}") for x in xes], batch)
+    sps = [f"SP{i:06d}" for i in range(1, n["san_pham"] + 1)]
+    cost = {sp: rng.randrange(50, 5000) * 1000 for sp in sps}
+    _bulk(SanPham.__table__, [dict(id_san_pham=sp, ten_san_pham=f"{rng.choice(LOAI)} {rng.choice(CHAT_LIEU).lower()} {i}",
+                                   chat_lieu=rng.choice(CHAT_LIEU), mau=rng.choice(MAU)) for i, sp in enumerate(sps, 1)], batch)
+    khs = [f"KH{i:06d}" for i in range(1, n["khach_hang"] + 1)]
+    _bulk(KhachHang.__table__, [dict(id_khach_hang=kh, ho=rng.choice(HO), ten=rng.choice(TEN),
+                                     so_dien_thoai=f"09{rng.randrange(10**8):08d}") for kh in khs], batch)
+    progress(f"danh mục: {len(khos)} kho, {len(sps)} SP, {len(khs)} KH")
+
+    # --- nhập / xuất / điều chuyển ---
+    picker = _Picker(sps, rng)
+    ton = defaultdict(int)
+
+    def nhap_lines(i, t):
+        k = rng.choice(khos)
+        nv, ncc = rng.choice(nvs), rng.choice(nccs)
+        out = []
+        for sp in picker.take(rng.randint(1, 5)):
+            q = rng.randint(10, 40)
+            ton[(k, sp)] += q
+            out.append(dict(id_hoa_don_nhap=f"N{i:07d}", id_san_pham=sp, id_kho=k, so_san_pham_nhap=q,
+                            gia_nhap=round(cost[sp] * rng.uniform(0.9, 1.1), -2), ngay_nhap=t,
+                            id_nhan_vien=nv, id_nha_cung_cap=ncc))
+        return out
+
+    rows = _invoices(n["nhap"], start, span, rng, nhap_lines)
+    _bulk(HoaDonNhap.__table__, rows, batch)
+    progress(f"hoa_don_nhap: {len(rows)} dòng")
+
+    so_hd = [0]  # đánh số hóa đơn xuất liên tục qua các phần
+
+    def xuat_lines(_i, t):
+        so_hd[0] += 1
+        i = so_hd[0]
+        k = rng.choice(khos)
+        nv, xe, kh = rng.choice(nvs), rng.choice(xes), rng.choice(khs)
+        out = []
+        for sp in picker.take(rng.randint(1, 5)):
+            q = rng.randint(1, 10)
+            ton[(k, sp)] -= q
+            out.append(dict(id_hoa_don_xuat=f"X{i:07d}", id_san_pham=sp, id_kho=k, so_san_pham_xuat=q,
+                            gia_ban=round(cost[sp] * rng.uniform(1.15, 1.5), -2), ngay_xuat=t,
+                            id_nhan_vien=nv, id_xe_van_chuyen=xe, id_khach_hang=kh, don_gia_von=cost[sp]))
+        return out
+
+    # sinh + chèn theo từng phần để không giữ hàng triệu dict trong bộ nhớ
+    total, part = 0, 200_000
+    for off in range(0, n["xuat"], part):
+        cnt = min(part, n["xuat"] - off)
+        t0 = start + span * (off / n["xuat"])
+        rows = _invoices(cnt, t0, span * (cnt / n["xuat"]), rng, xuat_lines)
+        _bulk(HoaDonXuat.__table__, rows, batch)
+        total += len(rows)
+    progress(f"hoa_don_xuat: {total} dòng")
+
+    dcs, cts = [], []
+    for i in range(1, n["dieu_chuyen"] + 1):
+        src, dst = rng.sample(khos, 2)
+        dcs.append(dict(id_dieu_chuyen=f"DC{i:06d}", kho_nguon=src, kho_dich=dst,
+                        ngay_dc=start + span * (i / n["dieu_chuyen"]), ghi_chu="bench"))
+        for sp in picker.take(rng.randint(1, 3)):
+            q = rng.randint(1, 10)
+            ton[(src, sp)] -= q
+            ton[(dst, sp)] += q
+            cts.append(dict(id_dieu_chuyen=f"DC{i:06d}", id_san_pham=sp, so_luong=q, don_gia_von=cost[sp]))
+    _bulk(DieuChuyen.__table__, dcs, batch)
+    _bulk(DieuChuyenCT.__table__, cts, batch)
+    progress(f"dieu_chuyen: {len(dcs)} phiếu, {len(cts)} dòng")
+
+    # --- bảng dẫn xuất (tồn âm do thứ tự ngẫu nhiên thì ghi 0) ---
+    ton_rows = [dict(id_kho=k, id_san_pham=sp, so_luong=max(q, 0), nguong_canh_bao=rng.choice((5, 10, 20, 50)))
+                for (k, sp), q in ton.items()]
+    _bulk(TonKho.__table__, ton_rows, batch)
+    if costing.method() == "fifo":
+        _bulk(LopGiaVon.__table__, [dict(id_kho=r["id_kho"], id_san_pham=r["id_san_pham"], ngay=end,
+                                         so_luong_con=r["so_luong"], don_gia=cost[r["id_san_pham"]])
+                                    for r in ton_rows if r["so_luong"] > 0], batch)
+    else:
+        _bulk(GiaVonTB.__table__, [dict(id_kho=r["id_kho"], id_san_pham=r["id_san_pham"], so_luong=r["so_luong"],
+                                        don_gia=cost[r["id_san_pham"]]) for r in ton_rows], batch)
+    progress(f"ton_kho: {len(ton_rows)} dòng")
+    progress(f"doanh_thu_ngay: {rebuild_doanh_thu()} dòng")
+    alerts.sync()
+    progress(f"canh_bao_ton: {alerts.count_active()} đang mở")
+    kpi.refresh(khos)
+    ensure_search_schema(db.engine)
+    for name in SEARCH_FIELDS:
+        reindex(name)
+
+    _bulk(User.__table__, [dict(username=u, password_hash=passwords.hash_password(p), full_name=f, role=r, assigned_kho=k)
+                           for u, p, f, r, k in DEFAULT_USERS
+                           if not db.session.execute(select(User.id).where(User.username == u)).first()], batch)
+    return dict(n, ton_kho=len(ton_rows), hoa_don_xuat=total, dieu_chuyen_ct=len(cts))
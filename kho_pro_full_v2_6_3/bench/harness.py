@@ -0,0 +1,152 @@
+"""Chạy mọi route GET qua Flask test client, đo độ trễ p50 / p95 và số câu SQL.
+
+Route GET không tham số đường dẫn được lấy tự động từ app.url_map, cộng thêm
+EXTRA (các truy vấn nặng có tham số). Mỗi route chạy với từng tài khoản
+(admin + nhân viên) `repeat` lần sau `warmup` lần chạy bỏ qua.
+Kết quả là dict lưu được ra JSON; compare() so hai lần chạy (vd. hai phiên bản).
+"""
+import subprocess
+import threading
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import event, select, func
+from sqlalchemy.engine import Engine
+
+from models import db, SanPham, KhachHang, TonKho, HoaDonNhap, HoaDonXuat
+
+# route không đo: tĩnh, đăng nhập / đăng xuất, luồng SSE không kết thúc, chính /metrics
+EXCLUDE = {"static", "auth.login", "auth.logout", "inventory.su_kien_ton_kho", "reports.metrics_view"}
+
+# (tên, url) — {d365}/{d30}: ngày bắt đầu, {today}: hôm nay, {skus}: 50 mã SP đầu tiên
+EXTRA = [
+    ("doanh_thu_view 365 ngày", "/doanh-thu?from={d365}&to={today}"),
+    ("stock trang 10", "/stock?page=10"),
+    ("products tìm 'ban'", "/products?q=ban"),
+    ("nhap_kho 30 ngày", "/nhap-kho?from={d30}&to={today}"),
+    ("xuat_kho 30 ngày", "/xuat-kho?from={d30}&to={today}"),
+    ("goi_y_san_pham", "/api/goi-y/san-pham?q=ban"),
+    ("api_ton_kho 50 SP", "/api/ton-kho?sp={skus}"),
+    ("export xuat.csv 30 ngày", "/export/xuat.csv?from={d30}&to={today}"),
+]
+
+USERS = [("admin", "admin123"), ("nv1", "123456")]
+
+
+class _QueryCounter:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, *args):
+        self.n += 1
+
+    def __enter__(self):
+        event.listen(Engine, "before_cursor_execute", self)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(Engine, "before_cursor_execute", self)
+
+
+def _pct(sorted_vals, q):
+    return sorted_vals[min(len(sorted_vals) - 1, round(q * (len(sorted_vals) - 1)))]
+
+
+def routes(app):
+    """[(tên, url)] cần đo."""
+    today = date.today()
+    with app.app_context():
+        skus = db.session.execute(select(SanPham.id_san_pham).order_by(SanPham.id_san_pham).limit(50)).scalars().all()
+    fill = dict(today=today, d30=today - timedelta(days=30), d365=today - timedelta(days=365), skus=",".join(skus))
+    out = []
+    for rule in sorted(app.url_map.iter_rules(), key=lambda r: r.rule):
+        if "GET" in rule.methods and not rule.arguments and rule.endpoint not in EXCLUDE:
+            out.append((rule.endpoint, rule.rule))
+    out += [(name, url.format(**fill)) for name, url in EXTRA]
+    return out
+
+
+def _git_rev():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def run(app, repeat=20, warmup=2, users=USERS, progress=print):
+    """Đo mọi route với từng tài khoản; trả về dict kết quả (ghi được ra JSON).
+
+    Chạy trong luồng riêng: luồng mới không thừa hưởng app context của lệnh CLI,
+    nên mỗi request có app context + phiên DB riêng như khi chạy thật.
+    """
+    box = {}
+
+    def work():
+        try:
+            box["res"] = _run(app, repeat, warmup, users, progress)
+        except BaseException as e:
+            box["err"] = e
+
+    t = threading.Thread(target=work, name="bench")
+    t.start()
+    t.join()
+    if "err" in box:
+        raise box["err"]
+    return box["res"]
+
+
+def _run(app, repeat, warmup, users, progress):
+    targets = routes(app)
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        rows = {m.__tablename__: db.session.execute(select(func.count()).select_from(m)).scalar()
+                for m in (SanPham, KhachHang, TonKho, HoaDonNhap, HoaDonXuat)}
+    results = {}
+    for username, password in users:
+        client = app.test_client()
+        r = client.post("/login", data={"username": username, "password": password})
+        if r.status_code != 302:
+            raise RuntimeError(f"Không đăng nhập được bằng {username} (HTTP {r.status_code})")
+        for name, url in targets:
+            times, queries, status = [], [], None
+            for i in range(warmup + repeat):
+                with _QueryCounter() as qc:
+                    t0 = time.perf_counter()
+                    resp = client.get(url)
+                    resp.get_data()  # đọc hết body (response dạng stream)
+                    dt = time.perf_counter() - t0
+                status = resp.status_code
+                if i >= warmup:
+                    times.append(dt * 1000)
+                    queries.append(qc.n)
+            times.sort()
+            queries.sort()
+            key = f"{username} {name}"
+            results[key] = dict(
+                url=url, status=status, n=len(times),
+                p50_ms=round(_pct(times, 0.5), 2), p95_ms=round(_pct(times, 0.95), 2),
+                mean_ms=round(sum(times) / len(times), 2),
+                queries=_pct(queries, 0.5), queries_max=queries[-1],
+            )
+            progress(f"  {key:45s} {status}  p50 {results[key]['p50_ms']:9.2f} ms  "
+                     f"p95 {results[key]['p95_ms']:9.2f} ms  {results[key]['queries']} SQL")
+    return dict(
+        meta=dict(time=time.strftime("%Y-%m-%dT%H:%M:%S"), git=_git_rev(), dialect=dialect, rows=rows,
+                  repeat=repeat, warmup=warmup),
+        routes=results,
+    )
+
+
+def compare(old, new):
+    """Các dòng so sánh p50 / p95 / số SQL giữa hai kết quả run()."""
+    lines = [f"{'route':45s} {'p50 cũ':>9s} {'p50 mới':>9s} {'Δ%':>7s} {'p95 mới':>9s} {'SQL':>9s}"]
+    for key, b in new["routes"].items():
+        a = old["routes"].get(key)
+        if a is None:
+            lines.append(f"{key:45s} {'-':>9s} {b['p50_ms']:9.2f} {'mới':>7s} {b['p95_ms']:9.2f} {b['queries']:>9}")
+            continue
+        delta = (b["p50_ms"] - a["p50_ms"]) / a["p50_ms"] * 100 if a["p50_ms"] else 0.0
+        lines.append(f"{key:45s} {a['p50_ms']:9.2f} {b['p50_ms']:9.2f} {delta:+6.1f}% {b['p95_ms']:9.2f} "
+                     f"{a['queries']:>4}→{b['queries']:<4}")
+    return lines
@@ -0,0 +1,157 @@
+"""Chuẩn bị DB: tạo bảng / chỉ mục còn thiếu, tính lại dữ liệu dẫn xuất, tạo user mặc định.
+
+Trước đây chạy mỗi lần import app.py (mỗi worker khởi động đều chạm DB); nay
+chỉ chạy khi gọi `flask bootstrap` (một lần sau khi nạp schema / nâng cấp bản).
+schema() và users() tách riêng để chạy lẻ được; cần app context.
+"""
+from contextlib import contextmanager
+
+from flask import current_app
+from sqlalchemy import MetaData, Table, inspect
+
+from models import (
+    db,
+    SanPham,
+    HoaDonNhap,
+    HoaDonXuat,
+    TonKho,
+    User,
+    KhachHang,
+    MaSo,
+    PhienBanDuLieu,
+    DoanhThuNgay,
+    CanhBaoTon,
+)
+from search import ensure_search_schema, reindex
+from rollup import rebuild as rebuild_doanh_thu
+import costing
+import kpi
+import alerts
+import jobs
+import passwords
+
+# index một cột đã nằm trong index ghép mới (cột đầu): bỏ trên DB cũ để bớt chi phí ghi
+SUPERSEDED_INDEXES = {
+    "hoa_don_nhap": ("ix_hdn_kho", "ix_hdn_ngay"),    # -> ix_hdn_kho_ngay, ix_hdn_ngay_id
+    "hoa_don_xuat": ("ix_hdx_kho", "ix_hdx_ngay"),    # -> ix_hdx_kho_ngay, ix_hdx_ngay_id
+}
+
+# lỗi "đã có / đã bỏ rồi" khi hai tiến trình cùng chạy bootstrap (checkfirst không khóa):
+# MySQL 1050 bảng đã có, 1060 cột trùng, 1061 index trùng, 1091 index / cột không còn để bỏ
+MYSQL_ALREADY_DONE_CODES = (1050, 1060, 1061, 1091)
+SQLITE_ALREADY_DONE = ("already exists", "duplicate column name", "no such index")
+
+
+def _already_done(exc):
+    """Lỗi do bước tạo / bỏ đã được làm xong (bởi tiến trình khác)?"""
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", ())
+    if args and args[0] in MYSQL_ALREADY_DONE_CODES:
+        return True
+    return orig is not None and any(m in str(orig).lower() for m in SQLITE_ALREADY_DONE)
+
+
+@contextmanager
+def _step(name):
+    """Một bước của schema(): lỗi "đã có rồi" thì ghi log và đi tiếp, lỗi khác thì log + ném ra."""
+    try:
+        yield
+    except Exception as e:
+        db.session.rollback()
+        if not _already_done(e):
+            current_app.logger.exception("Bootstrap: lỗi bước %s", name)
+            raise
+        current_app.logger.info("Bootstrap: bước %s đã được làm (%s)", name, e.orig)
+
+
+def schema():
+    """Tạo bảng / index bổ sung trên DB tạo từ bản schema cũ và điền dữ liệu dẫn xuất lần đầu."""
+    with _step("bảng / index bổ sung"):
+        User.__table__.create(bind=db.engine, checkfirst=True)
+        MaSo.__table__.create(bind=db.engine, checkfirst=True)
+        PhienBanDuLieu.__table__.create(bind=db.engine, checkfirst=True)
+        kpi.ensure_kpi_schema(db.engine)
+        jobs.ensure_jobs_schema(db.engine)
+        # index bổ sung (gợi ý SP / KH, giá vốn, lịch sử nhập / xuất) trên DB tạo từ bản schema cũ
+        insp = inspect(db.engine)
+        for ix in (*SanPham.__table__.indexes, *KhachHang.__table__.indexes,
+                   *HoaDonNhap.__table__.indexes, *HoaDonXuat.__table__.indexes):
+            if insp.has_table(ix.table.name):
+                ix.create(bind=db.engine, checkfirst=True)
+        # tạo index mới trước rồi mới bỏ index cũ (InnoDB cần một index cho khóa ngoại id_kho)
+        for name, old in SUPERSEDED_INDEXES.items():
+            if insp.has_table(name) and {ix["name"] for ix in insp.get_indexes(name)} & set(old):
+                for ix in Table(name, MetaData(), autoload_with=db.engine).indexes:
+                    if ix.name in old:
+                        ix.drop(bind=db.engine)
+
+    # giá vốn: DB cũ / nạp từ SQL chưa có trạng thái giá vốn thì phát lại lịch sử để điền don_gia_von
+    with _step("giá vốn"):
+        if costing.ensure_costing_schema(db.engine):
+            print("ℹ️ Đã tính giá vốn cho", costing.rebuild(), "dòng xuất")
+            if inspect(db.engine).has_table(DoanhThuNgay.__tablename__):
+                rebuild_doanh_thu()
+
+    # cảnh báo tồn thấp: lần đầu tạo bảng thì mở cảnh báo cho các dòng đang dưới ngưỡng
+    with _step("cảnh báo tồn"):
+        insp = inspect(db.engine)
+        if not insp.has_table(CanhBaoTon.__tablename__) and insp.has_table(TonKho.__tablename__):
+            CanhBaoTon.__table__.create(bind=db.engine)
+            alerts.sync()
+
+    # bảng tổng hợp doanh thu: lần đầu tạo trên DB đã có hóa đơn thì tính lại từ đầu
+    with _step("doanh thu ngày"):
+        insp = inspect(db.engine)
+        if not insp.has_table(DoanhThuNgay.__tablename__) and insp.has_table(HoaDonXuat.__tablename__):
+            DoanhThuNgay.__table__.create(bind=db.engine)
+            print("ℹ️ Đã tạo doanh_thu_ngay:", rebuild_doanh_thu(), "dòng tổng hợp")
+
+    # cột tim_kiem + chỉ mục toàn văn; điền các dòng nạp bằng SQL chưa có tim_kiem
+    with _step("tìm kiếm"):
+        for name in ensure_search_schema(db.engine):
+            reindex(name, only_missing=True)
+
+
+def users():
+    """Tạo admin + nhân viên mặc định (DEFAULT_ADMIN_* / DEFAULT_STAFF_ACCOUNTS) nếu chưa có."""
+    cfg = current_app.config
+    if not cfg.get("BOOTSTRAP_ADMIN", True):
+        return
+    created = []
+
+    def ensure_user(username, password, full_name, role, assigned_kho=None):
+        uname = (username or "").strip().lower()
+        if not uname:
+            return
+        u = User.query.filter_by(username=uname).first()
+        if u:
+            return
+        u = User(
+            username=uname,
+            full_name=full_name,
+            role=role,
+            assigned_kho=assigned_kho
+        )
+        u.password_hash = passwords.hash_password(password)
+        db.session.add(u)
+        created.append(uname)
+
+    try:
+        ensure_user(cfg["DEFAULT_ADMIN_USER"], cfg["DEFAULT_ADMIN_PASS"], cfg["DEFAULT_ADMIN_NAME"], "admin", None)
+        for acc in cfg.get("DEFAULT_STAFF_ACCOUNTS", []):
+            ensure_user(acc["username"], acc["password"], acc["full_name"], "staff", acc.get("assigned_kho"))
+
+        if created:
+            db.session.commit()
+            print("✅ Đã bootstrap user:", ", ".join(created))
+        else:
+            print("ℹ️ User đã tồn tại, bỏ qua bootstrap.")
+    except Exception:
+        db.session.rollback()
+        current_app.logger.exception("Bootstrap: lỗi tạo user mặc định")
+        raise
+
+
+def run():
+    schema()
+    users()
@@ -0,0 +1,324 @@
+"""Nhập hàng loạt hóa đơn nhập/xuất từ CSV hoặc Excel.
+
+File được đọc theo từng khối (chunk) cố định nên bộ nhớ không phụ thuộc
+kích thước file. Mỗi khối:
+  * kiểm tra mã SP / kho / NCC / KH ... bằng một truy vấn IN cho các mã chưa gặp,
+  * loại các dòng trùng khóa hóa đơn đã có trong DB (một truy vấn IN theo mã hóa
+    đơn) và, với hóa đơn xuất, các dòng vượt tồn (một SELECT ... FOR UPDATE các
+    dòng ton_kho của khối): dòng lỗi vào báo cáo, phần còn lại vẫn được ghi,
+  * chèn các dòng hợp lệ bằng một executemany,
+  * gộp delta tồn theo (id_kho, id_san_pham) -> một upsert cho mỗi khóa,
+  * ghi nhận giá vốn (costing.py: nhập -> thêm lớp giá, xuất -> gán don_gia_von),
+  * cộng vào bảng tổng hợp doanh_thu_ngay và chỉ số trang chủ (kpi.py),
+và được commit riêng (khối lỗi bị rollback, các khối khác vẫn giữ).
+
+Tên cột trong file trùng tên cột của bảng hoa_don_nhap / hoa_don_xuat.
+"""
+import time
+
+from flask import current_app
+from sqlalchemy import select, insert, tuple_
+
+from models import (
+    db,
+    SanPham,
+    Kho,
+    NhanVien,
+    NhaCungCap,
+    XeVanChuyen,
+    KhachHang,
+    HoaDonNhap,
+    HoaDonXuat,
+    TonKho,
+)
+from stock_engine import apply_deltas, run_tx
+from sequences import claim
+from rollup import record_nhap, record_xuat
+import costing
+import kpi
+
+
+def _cost_nhap(records):
+    costing.receive(
+        (r["id_kho"], r["id_san_pham"], r["so_san_pham_nhap"], r["gia_nhap"], r["ngay_nhap"]) for r in records
+    )
+
+
+def _cost_xuat(records):
+    gia_von = costing.issue((r["id_kho"], r["id_san_pham"], r["so_san_pham_xuat"]) for r in records)
+    for r in records:
+        r["don_gia_von"] = gia_von[(r["id_kho"], r["id_san_pham"])]
+
+
+SPECS = {
+    "nhap": dict(
+        model=HoaDonNhap,
+        id_col="id_hoa_don_nhap",
+        prefix="N",
+        qty="so_san_pham_nhap",
+        price="gia_nhap",
+        date="ngay_nhap",
+        sign=+1,
+        cost=_cost_nhap,
+        rollup=record_nhap,
+        refs={
+            "id_san_pham": SanPham.id_san_pham,
+            "id_kho": Kho.id_kho,
+            "id_nhan_vien": NhanVien.id_nhan_vien,
+            "id_nha_cung_cap": NhaCungCap.id_nha_cung_cap,
+        },
+    ),
+    "xuat": dict(
+        model=HoaDonXuat,
+        id_col="id_hoa_don_xuat",
+        prefix="X",
+        qty="so_san_pham_xuat",
+        price="gia_ban",
+        date="ngay_xuat",
+        sign=-1,
+        cost=_cost_xuat,
+        rollup=record_xuat,
+        refs={
+            "id_san_pham": SanPham.id_san_pham,
+            "id_kho": Kho.id_kho,
+            "id_nhan_vien": NhanVien.id_nhan_vien,
+            "id_xe_van_chuyen": XeVanChuyen.id_xe_van_chuyen,
+            "id_khach_hang": KhachHang.id_khach_hang,
+        },
+    ),
+}
+
+# Cột bắt buộc phải có giá trị (ngoài số lượng / giá / ngày)
+REQUIRED_REFS = ("id_san_pham", "id_kho")
+MAX_ERROR_SAMPLES = 20
+
+
+def iter_chunks(src, filename, chunk_size):
+    """Sinh DataFrame từng khối từ file CSV (pandas) hoặc XLSX (openpyxl read-only)."""
+    import pandas as pd
+
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(src, read_only=True, data_only=True)
+        try:
+            rows = wb.active.iter_rows(values_only=True)
+            header = [str(c).strip() if c is not None else "" for c in next(rows, ())]
+            buf = []
+            for row in rows:
+                buf.append(row)
+                if len(buf) >= chunk_size:
+                    yield pd.DataFrame(buf, columns=header)
+                    buf = []
+            if buf:
+                yield pd.DataFrame(buf, columns=header)
+        finally:
+            wb.close()
+        return
+
+    yield from pd.read_csv(
+        src, chunksize=chunk_size, dtype=str, keep_default_na=False, encoding="utf-8-sig"
+    )
+
+
+def _clean_str(series):
+    """Chuẩn hóa cột mã: bỏ khoảng trắng; rỗng / NaN -> None."""
+    def _norm(v):
+        if v is None or v != v:  # v != v: NaN
+            return None
+        v = str(v).strip()
+        return None if v in ("", "nan", "None", "NaT") else v
+    return series.astype(object).map(_norm)
+
+
+class _RefChecker:
+    """Nhớ các mã đã kiểm tra để mỗi mã chỉ bị tra DB một lần cho cả file."""
+
+    def __init__(self, refs):
+        self.refs = refs
+        self.known = {col: set() for col in refs}
+
+    def valid_mask(self, df, col):
+        values = df[col]
+        present = values.notna()
+        uniq = set(values[present].unique()) - self.known[col]
+        if uniq:
+            pk = self.refs[col]
+            found = db.session.execute(select(pk).where(pk.in_(list(uniq)))).scalars()
+            self.known[col].update(found)
+        return ~present | values.isin(self.known[col])
+
+
+def _prepare(df, spec, checker, line_offset, report):
+    """Chuẩn hóa + kiểm tra một khối (không cần DB ngoài mã danh mục); trả về DataFrame các dòng hợp lệ."""
+    import pandas as pd
+
+    df = df.rename(columns=lambda c: str(c).strip())
+    cols = [spec["id_col"], *spec["refs"], spec["qty"], spec["price"], spec["date"]]
+    missing = [c for c in cols if c not in df.columns]
+    if missing:
+        raise ValueError(f"File thiếu cột: {', '.join(missing)}")
+    df = df[cols].copy()
+
+    for c in (spec["id_col"], *spec["refs"]):
+        df[c] = _clean_str(df[c])
+    df[spec["qty"]] = pd.to_numeric(df[spec["qty"]], errors="coerce")
+    df[spec["price"]] = pd.to_numeric(df[spec["price"]], errors="coerce")
+    df[spec["date"]] = pd.to_datetime(df[spec["date"]], errors="coerce", format="mixed")
+
+    checks = {
+        "thiếu mã hóa đơn / SP / kho": df[spec["id_col"]].isna()
+            | df[list(REQUIRED_REFS)].isna().any(axis=1),
+        "số lượng không hợp lệ": df[spec["qty"]].isna() | (df[spec["qty"]] <= 0)
+            | (df[spec["qty"]] % 1 != 0),
+        "giá không hợp lệ": df[spec["price"]].isna() | (df[spec["price"]] < 0),
+        "ngày không hợp lệ": df[spec["date"]].isna(),
+    }
+    for col in spec["refs"]:
+        checks[f"{col} không tồn tại"] = ~checker.valid_mask(df, col)
+
+    # trùng khóa giữa các khối / với DB: _db_checks trong giao dịch ghi
+    checks["trùng khóa hóa đơn trong khối"] = df.duplicated([spec["id_col"], "id_san_pham", "id_kho"])
+
+    bad = _skip(df, checks, line_offset, report)
+    good = df[~bad].copy()
+    if not good.empty:
+        good[spec["qty"]] = good[spec["qty"]].astype(int)
+    return good
+
+
+def _skip(df, checks, line_offset, report):
+    """Ghi các dòng lỗi vào báo cáo (mỗi dòng một lỗi đầu tiên); trả về mask các dòng bị loại."""
+    import pandas as pd
+
+    bad = pd.Series(False, index=df.index)
+    for reason, mask in checks.items():
+        mask = mask & ~bad
+        n = int(mask.sum())
+        if n:
+            report["skipped"] += n
+            report["reasons"][reason] = report["reasons"].get(reason, 0) + n
+            for idx in df.index[mask][: MAX_ERROR_SAMPLES - len(report["errors"])]:
+                # +2: dòng tiêu đề + đánh số từ 1
+                report["errors"].append(f"Dòng {line_offset + idx + 2}: {reason}")
+        bad |= mask
+    return bad
+
+
+def _db_checks(good, spec):
+    """Kiểm tra theo DB cho cả khối, mỗi loại một truy vấn; gọi trong giao dịch ghi.
+
+    * khóa (mã hóa đơn, SP, kho) đã có trong DB;
+    * xuất: khóa các dòng ton_kho của khối (SELECT ... FOR UPDATE theo khóa chính,
+      như stock_engine.transfer) rồi nhận các dòng theo thứ tự file trong phạm vi
+      tồn còn lại; dòng vượt tồn bị loại, nên phần trừ tồn sau đó không thể thiếu hàng.
+    """
+    import pandas as pd
+
+    model, id_col = spec["model"], spec["id_col"]
+    existing = [tuple(r) for r in db.session.execute(
+        select(getattr(model, id_col), model.id_san_pham, model.id_kho)
+        .where(getattr(model, id_col).in_(good[id_col].unique().tolist()))
+    )]
+    trung = pd.MultiIndex.from_frame(good[[id_col, "id_san_pham", "id_kho"]]).isin(existing)
+    checks = {"khóa hóa đơn đã có trong DB": pd.Series(trung, index=good.index)}
+
+    if spec["sign"] < 0:
+        ton_kho = TonKho.__table__
+        keys = sorted(set(zip(good["id_kho"], good["id_san_pham"])))
+        ton = {
+            (k, sp): int(v or 0) for k, sp, v in db.session.execute(
+                select(ton_kho.c.id_kho, ton_kho.c.id_san_pham, ton_kho.c.so_luong)
+                .where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(keys))
+                .order_by(ton_kho.c.id_kho, ton_kho.c.id_san_pham)
+                .with_for_update()
+            )
+        }
+        # dòng bị loại (trùng / vượt tồn) không giữ chỗ tồn cho các dòng sau
+        thieu = []
+        for k, sp, q, dup in zip(good["id_kho"], good["id_san_pham"], good[spec["qty"]], trung):
+            ok = not dup and ton.get((k, sp), 0) >= q
+            if ok:
+                ton[(k, sp)] -= q
+            thieu.append(not dup and not ok)
+        checks["không đủ tồn kho"] = pd.Series(thieu, index=good.index)
+    return checks
+
+
+def _records(good, spec):
+    """(records, deltas) để ghi: dict theo dòng + delta tồn gộp theo (kho, SP)."""
+    import pandas as pd
+
+    good = good.copy()
+    good[spec["qty"]] = good[spec["qty"]].astype(int).astype(object)
+    good[spec["price"]] = good[spec["price"]].astype(float).astype(object)
+    # list(): pandas 3 trả to_pydatetime() dạng Series đánh lại index từ 0 -> lệch khi khối đã lọc dòng
+    good[spec["date"]] = pd.Series(
+        list(good[spec["date"]].dt.to_pydatetime()), index=good.index, dtype=object
+    )
+    records = good.to_dict("records")
+
+    sums = good.groupby(["id_kho", "id_san_pham"])[spec["qty"]].sum()
+    deltas = [(k, sp, spec["sign"] * int(v)) for (k, sp), v in sums.items()]
+    return records, deltas
+
+
+def import_invoices(kind, src, filename, chunk_size=None, progress=None):
+    """Nhập file hóa đơn `kind` ('nhap' | 'xuat'); trả về dict báo cáo.
+
+    progress(report) được gọi sau mỗi khối (dùng cho CLI in tiến độ).
+    """
+    import pandas as pd
+
+    spec = SPECS[kind]
+    chunk_size = chunk_size or current_app.config.get("IMPORT_CHUNK_SIZE", 5000)
+    checker = _RefChecker(spec["refs"])
+    report = dict(kind=kind, rows=0, inserted=0, skipped=0, chunks=0,
+                  failed_chunks=0, reasons={}, errors=[], seconds=0.0, rows_per_sec=0.0)
+    started = time.perf_counter()
+    line_offset = 0
+
+    for df in iter_chunks(src, filename, chunk_size):
+        df.index = range(len(df))
+        report["rows"] += len(df)
+        report["chunks"] += 1
+        good = _prepare(df, spec, checker, line_offset, report)
+
+        if not good.empty:
+            def _ghi_khoi():
+                # loại dòng trùng DB / vượt tồn trước, rồi: xuất trừ tồn, tính giá vốn, ghi hóa đơn
+                checks = _db_checks(good, spec)
+                keep = good[~pd.concat(checks, axis=1).any(axis=1)]
+                records, deltas = _records(keep, spec)
+                if records:
+                    # mã hóa đơn trong file không qua bộ đếm: đẩy ma_so lên cùng giao dịch
+                    claim(spec["prefix"], keep[spec["id_col"]].unique())
+                    apply_deltas(deltas)
+                    spec["cost"](records)
+                    kpi.on_invoices(kind, records)
+                    db.session.execute(insert(spec["model"]), records)
+                    spec["rollup"]((r[spec["id_col"]], r["id_san_pham"], r["id_kho"]) for r in records)
+                return checks, len(records)
+
+            try:
+                checks, n = run_tx(_ghi_khoi)
+                # báo cáo sau khi commit: lần chạy lại của run_tx không bị đếm hai lần
+                _skip(good, checks, line_offset, report)
+                report["inserted"] += n
+            except Exception as e:
+                db.session.rollback()
+                report["failed_chunks"] += 1
+                report["skipped"] += len(good)
+                if len(report["errors"]) < MAX_ERROR_SAMPLES:
+                    report["errors"].append(
+                        f"Khối dòng {line_offset + 2}-{line_offset + len(df) + 1} bị hủy: {getattr(e, 'orig', e)}"
+                    )
+
+        line_offset += len(df)
+        elapsed = time.perf_counter() - started
+        report["seconds"] = round(elapsed, 3)
+        report["rows_per_sec"] = round(report["rows"] / elapsed, 1) if elapsed else 0.0
+        if progress:
+            progress(report)
+
+    return report
@@ -0,0 +1,196 @@
+"""Lệnh `flask ...` (bảo trì DB, bootstrap, đo hiệu năng); đăng ký qua register(app)."""
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+from models import db, User, CanhBaoTon
+from bulk_import import import_invoices
+from search import SEARCH_FIELDS, ensure_search_schema, reindex
+from rollup import rebuild as rebuild_doanh_thu
+import bootstrap
+import costing
+import kpi
+import alerts
+import jobs
+import passwords
+
+
+@click.command("bootstrap")
+@click.option("--skip-users", is_flag=True, help="Chỉ chuẩn bị schema, không tạo user mặc định")
+@with_appcontext
+def bootstrap_cli(skip_users):
+    """Tạo bảng / index còn thiếu, tính dữ liệu dẫn xuất lần đầu và tạo user mặc định."""
+    bootstrap.schema()
+    if not skip_users:
+        bootstrap.users()
+
+@click.command("set-password")
+@with_appcontext
+@click.argument("username")
+@click.argument("password")
+def set_password(username, password):
+    u = User.query.filter_by(username=username).first()
+    if not u:
+        print("User không tồn tại:", username)
+        return
+    u.password_hash = passwords.hash_password(password)
+    db.session.commit()
+    print("Đã đổi mật khẩu cho", username)
+
+@click.command("import-hoa-don")
+@with_appcontext
+@click.argument("kind", type=click.Choice(["nhap", "xuat"]))
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--chunk-size", type=int, default=None, help="Số dòng mỗi khối")
+def import_hoa_don_cli(kind, path, chunk_size):
+    """Nhập file CSV/XLSX hóa đơn nhập/xuất theo từng khối."""
+    def _progress(r):
+        print(f"  khối {r['chunks']}: {r['rows']} dòng, {r['rows_per_sec']} dòng/giây")
+
+    with open(path, "rb") as fh:
+        r = import_invoices(kind, fh, path, chunk_size=chunk_size, progress=_progress)
+
+    print(f"Đã nhập {r['inserted']}/{r['rows']} dòng, bỏ qua {r['skipped']}, "
+          f"{r['failed_chunks']} khối lỗi, {r['seconds']}s ({r['rows_per_sec']} dòng/giây)")
+    for reason, n in r["reasons"].items():
+        print(f"  - {reason}: {n}")
+    for err in r["errors"]:
+        print("  !", err)
+
+@click.command("rebuild-doanh-thu")
+@with_appcontext
+@click.option("--from", "date_from", type=click.DateTime(["%Y-%m-%d"]), default=None)
+@click.option("--to", "date_to", type=click.DateTime(["%Y-%m-%d"]), default=None)
+def rebuild_doanh_thu_cli(date_from, date_to):
+    """Tính lại bảng tổng hợp doanh_thu_ngay (mặc định: toàn bộ lịch sử)."""
+    def _progress(start, end, n):
+        print(f"  {start} → {end}: {n} dòng")
+
+    n = rebuild_doanh_thu(date_from.date() if date_from else None,
+                          date_to.date() if date_to else None, progress=_progress)
+    print(f"Đã tính lại {n} dòng tổng hợp.")
+
+@click.command("rebuild-gia-von")
+@with_appcontext
+def rebuild_gia_von_cli():
+    """Phát lại nhập / điều chuyển / xuất theo COSTING_METHOD, ghi lại giá vốn rồi tính lại doanh_thu_ngay."""
+    def _progress(start, end, n):
+        print(f"  {start} → {end}: {n} dòng xuất")
+
+    costing.ensure_costing_schema(db.engine)
+    print(f"Đã tính giá vốn ({costing.method()}) cho {costing.rebuild(progress=_progress)} dòng xuất.")
+    print(f"Đã tính lại {rebuild_doanh_thu()} dòng tổng hợp.")
+
+@click.command("sync-canh-bao")
+@with_appcontext
+def sync_canh_bao_cli():
+    """Đối chiếu bảng canh_bao_ton với ton_kho (sau khi sửa tồn / ngưỡng bằng SQL)."""
+    CanhBaoTon.__table__.create(bind=db.engine, checkfirst=True)
+    n = alerts.sync()
+    print(f"Đã đối chiếu {n} dòng tồn; đang mở {alerts.count_active()} cảnh báo.")
+
+@click.command("reindex-search")
+@with_appcontext
+@click.option("--table", "tables", multiple=True, type=click.Choice(list(SEARCH_FIELDS)),
+              help="Chỉ tính lại bảng này (mặc định: tất cả)")
+def reindex_search_cli(tables):
+    """Tạo chỉ mục toàn văn (nếu thiếu) và tính lại cột tim_kiem."""
+    ensure_search_schema(db.engine)
+    for name in tables or SEARCH_FIELDS:
+        print(f"{name}: {reindex(name)} dòng")
+
+@click.command("explain-lich-su")
+@with_appcontext
+@click.option("--verbose", "-v", is_flag=True, help="In cả kế hoạch truy vấn của câu đạt")
+def explain_lich_su_cli(verbose):
+    """EXPLAIN các kiểu lọc của trang lịch sử nhập / xuất; lỗi nếu câu nào còn filesort."""
+    import ledger
+
+    bad = 0
+    for kind, label, trang, sorts, plan in ledger.explain_pages():
+        bad += sorts
+        print(f"{'FILESORT' if sorts else 'ok':8} {kind} / {label} / trang {trang}")
+        if sorts or verbose:
+            print("         ", plan)
+    if bad:
+        raise click.ClickException(f"{bad} truy vấn lịch sử phải sắp xếp riêng (thiếu / sai index?)")
+
+@click.command("bench-data")
+@with_appcontext
+@click.option("--scale", type=float, default=1.0, show_default=True, help="Hệ số quy mô (1 ~ 1 triệu dòng hóa đơn)")
+@click.option("--days", type=int, default=730, show_default=True, help="Số ngày lịch sử")
+@click.option("--seed", type=int, default=42, show_default=True)
+@click.option("--reset", is_flag=True, help="Xóa sạch dữ liệu hiện có trước khi sinh")
+def bench_data_cli(scale, days, seed, reset):
+    """Sinh dữ liệu giả lập để đo hiệu năng (KHÔNG chạy trên DB thật)."""
+    from bench import datagen
+
+    db.create_all()
+    kpi.ensure_kpi_schema(db.engine)
+    jobs.ensure_jobs_schema(db.engine)
+    if reset:
+        datagen.reset()
+    t0 = time.perf_counter()
+    counts = datagen.generate(scale=scale, days=days, seed=seed)
+    print(f"Đã sinh xong trong {time.perf_counter() - t0:.1f}s:",
+          ", ".join(f"{k}={v}" for k, v in counts.items()))
+
+@click.command("bench-run")
+@with_appcontext
+@click.option("--repeat", type=int, default=20, show_default=True, help="Số lần đo mỗi route")
+@click.option("--warmup", type=int, default=2, show_default=True)
+@click.option("--out", type=click.Path(dir_okay=False), default=None, help="Ghi kết quả ra file JSON")
+@click.option("--compare", "compare_path", type=click.Path(exists=True, dir_okay=False), default=None,
+              help="So với một file kết quả trước")
+def bench_run_cli(repeat, warmup, out, compare_path):
+    """Đo p50 / p95 và số câu SQL của mọi route GET (admin + nhân viên)."""
+    import json
+    from bench import harness
+
+    res = harness.run(current_app._get_current_object(), repeat=repeat, warmup=warmup)
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, ensure_ascii=False, indent=2)
+        print("Đã ghi", out)
+    if compare_path:
+        with open(compare_path, encoding="utf-8") as fh:
+            old = json.load(fh)
+        print("\n".join(harness.compare(old, res)))
+
+@click.command("bench-startup")
+@click.option("--repeat", type=int, default=5, show_default=True, help="Số tiến trình đo")
+@click.option("--unreachable-url", default=None,
+              help="URL DB không kết nối được dùng cho lần đo thứ hai (mặc định: MySQL cổng 9)")
+@click.option("--out", type=click.Path(dir_okay=False), default=None, help="Ghi kết quả ra file JSON")
+def bench_startup_cli(repeat, unreachable_url, out):
+    """Đo thời gian import app / create_app() / request đầu tiên của một worker mới."""
+    import json
+    from bench import startup
+
+    res = startup.run(repeat=repeat, unreachable_url=unreachable_url or startup.UNREACHABLE_URL)
+    if out:
+        with open(out, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, ensure_ascii=False, indent=2)
+        print("Đã ghi", out)
+
+
+COMMANDS = (
+    bootstrap_cli,
+    set_password,
+    import_hoa_don_cli,
+    rebuild_doanh_thu_cli,
+    rebuild_gia_von_cli,
+    sync_canh_bao_cli,
+    reindex_search_cli,
+    explain_lich_su_cli,
+    bench_data_cli,
+    bench_run_cli,
+    bench_startup_cli,
+)
+
+
+def register(app):
+    for cmd in COMMANDS:
+        app.cli.add_command(cmd)
@@ -12,6 +12,106 @@ class Config:
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # ===== Pool kết nối / bản sao đọc =====
+    # Áp cho mọi engine (primary + replica)
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.environ.get("DB_POOL_SIZE", 10)),
+        "max_overflow": int(os.environ.get("DB_MAX_OVERFLOW", 20)),
+        "pool_recycle": int(os.environ.get("DB_POOL_RECYCLE", 1800)),  # < wait_timeout của MySQL
+        "pool_pre_ping": True,
+    }
+    # Bản sao chỉ đọc cho request GET (db_routing.py); không đặt = đọc / ghi cùng primary
+    SQLALCHEMY_BINDS = (
+        {"replica": os.environ["DATABASE_REPLICA_URL"]} if os.environ.get("DATABASE_REPLICA_URL") else {}
+    )
+    REPLICA_STICKY_SECONDS = 5   # sau khi người dùng ghi, đọc primary thêm chừng này giây (trễ sao chép)
+    REPLICA_RETRY_SECONDS = 30   # bản sao lỗi kết nối thì bỏ qua chừng này giây
+
+    # ===== Ghi tồn kho =====
+    # Số lần chạy lại giao dịch khi gặp deadlock / lock wait timeout
+    STOCK_TX_RETRIES = 3
+    STOCK_TX_BACKOFF = 0.05  # giây, tăng dần theo số lần thử
+
+    # ===== Cấp mã chứng từ / danh mục =====
+    SEQ_BLOCK_SIZE = 20  # số mã mỗi worker đặt trước trong một lần ghi bảng ma_so
+
+    # ===== Cache dữ liệu danh mục (NV, NCC, KH, xe, địa điểm, kho) =====
+    REF_CACHE_TTL = 300           # giây; hết hạn thì đọc lại dù phiên bản chưa đổi
+    REF_CACHE_VERSION_TTL = 2     # giây giữa hai lần đọc phien_ban_du_lieu (như STOCK_API_VERSION_TTL)
+    REF_CACHE_MAX_ENTRIES = 32    # số bảng/khóa giữ trong cache (LRU)
+    REF_CACHE_MAX_ROWS = 20000    # bảng lớn hơn không được cache
+
+    # ===== Gợi ý (typeahead) SP / KH trong form =====
+    TYPEAHEAD_LIMIT = 20       # số gợi ý mặc định mỗi lần gõ
+    TYPEAHEAD_MAX_LIMIT = 50   # trần cho tham số ?limit=
+
+    # ===== Tìm kiếm toàn văn (SP / KH / NCC) =====
+    SEARCH_PAGE_SIZE = 50      # số dòng mỗi trang kết quả
+
+    # ===== Trang tồn kho (ma trận SP × kho) =====
+    STOCK_PAGE_SIZE = 100      # số SP mỗi trang
+
+    # ===== Lịch sử nhập / xuất kho (ledger.py) =====
+    LEDGER_PAGE_SIZE = 50      # số dòng hóa đơn mỗi trang (keyset theo ngày + mã HĐ + mã SP)
+
+    # ===== Lịch sử điều chuyển =====
+    TRANSFER_PAGE_SIZE = 50    # số phiếu mỗi trang (keyset theo ngày + mã phiếu)
+
+    # ===== Chỉ số trang chủ (ảnh chụp theo kho) =====
+    KPI_SNAPSHOT_TTL = 900     # giây; quá hạn thì tính lại từ ton_kho / hóa đơn
+
+    # ===== Cảnh báo tồn thấp =====
+    CANH_BAO_POLL_SECONDS = 60  # chu kỳ badge trên menu hỏi /api/canh-bao/dem
+
+    # ===== Luồng sự kiện tồn kho (SSE) =====
+    SSE_BUFFER_SIZE = 2000      # số sự kiện gần nhất giữ lại để client nối lại (Last-Event-ID)
+    SSE_CLIENT_QUEUE = 500      # hàng đợi mỗi client; tràn -> gửi `reset`
+    SSE_HEARTBEAT_SECONDS = 15
+    SSE_MAX_SECONDS = 300       # đóng luồng định kỳ để trả worker; trình duyệt tự nối lại
+    SSE_RETRY_MS = 3000
+
+    # ===== API tra tồn kho theo lô (JSON) =====
+    STOCK_API_MAX_SKUS = 5000     # số mã SP tối đa mỗi lần gọi
+    STOCK_API_VERSION_TTL = 2     # giây giữa hai lần đọc phien_ban các kho từ DB (ETag)
+
+    # ===== Đo SQL / thời gian theo endpoint (/metrics) =====
+    METRICS_SLOW_QUERY_MS = 200     # câu SQL chậm hơn -> ghi log kèm câu lệnh
+    METRICS_N_PLUS_ONE = 10         # một câu lệnh lặp từ chừng này lần trong 1 request -> cảnh báo N+1
+    METRICS_ALLOWED_IPS = ("127.0.0.1", "::1")  # máy được đọc /metrics không cần đăng nhập
+
+    # ===== Công việc chạy nền (báo cáo / export lớn) =====
+    JOB_WORKERS = 2             # số luồng chạy công việc mỗi tiến trình
+    JOB_RESULT_DIR = os.environ.get("JOB_RESULT_DIR")  # mặc định: <instance>/jobs
+    JOB_RESULT_TTL = 900        # giây giữ file kết quả để dùng chung cho cùng tham số
+    JOB_STALE_SECONDS = 600     # công việc dở dang không báo tiến độ quá lâu -> coi là hỏng
+    JOB_PROGRESS_EVERY = 5000   # ghi tiến độ mỗi N dòng
+    JOB_POLL_MS = 2000          # chu kỳ trang trạng thái hỏi /api/cong-viec/<id>
+
+    # ===== Giá vốn hàng bán =====
+    COSTING_METHOD = "average"  # "average" (bình quân di động) | "fifo"
+
+    # ===== Nhập hàng loạt từ CSV / Excel =====
+    IMPORT_CHUNK_SIZE = 5000  # số dòng mỗi khối (mỗi khối = 1 giao dịch)
+
+    # ===== Xuất CSV / XLSX =====
+    EXPORT_BATCH_SIZE = 1000  # số dòng mỗi lần đọc từ server-side cursor
+
+    # ===== Mật khẩu / đăng nhập =====
+    # Thuật toán băm theo cú pháp werkzeug: "scrypt", "scrypt:32768:8:1", "pbkdf2:sha256:600000"...
+    # Đổi giá trị này thì hash cũ được băm lại ở lần đăng nhập đúng kế tiếp
+    PASSWORD_HASH_METHOD = os.environ.get("PASSWORD_HASH_METHOD", "scrypt")
+    PASSWORD_SALT_LENGTH = 16
+    PASSWORD_HASH_WORKERS = int(os.environ.get("PASSWORD_HASH_WORKERS", 2))  # tiến trình băm; 0 = băm trong luồng request
+    PASSWORD_HASH_QUEUE = 32     # số lần băm chờ cùng lúc tối đa mỗi tiến trình web
+    PASSWORD_HASH_TIMEOUT = 10   # giây chờ pool băm trước khi báo bận
+    LOGIN_FAIL_LIMIT = 5         # sai chừng này lần ...
+    LOGIN_FAIL_WINDOW = 300      # ... trong chừng này giây thì chặn (tên đăng nhập, địa chỉ) tới hết cửa sổ
+
+    # ===== Cache người dùng đăng nhập (load_user) =====
+    USER_CACHE_TTL = 300            # giây; hết hạn thì đọc lại user dù phiên bản chưa đổi
+    USER_CACHE_CHECK_SECONDS = 5    # chu kỳ đọc phiên bản "users" (độ trễ tối đa giữa các worker)
+    USER_CACHE_MAX_ENTRIES = 1000   # số user giữ trong cache mỗi tiến trình (LRU)
+
     # ===== Bootstrap tài khoản mặc định =====
     BOOTSTRAP_ADMIN = True  # bật tính năng tự tạo user mặc định nếu trống
 
@@ -0,0 +1,405 @@
+"""Giá vốn theo từng (id_kho, id_san_pham): bình quân gia quyền di động hoặc FIFO.
+
+Chính sách chọn bằng config COSTING_METHOD ("average" | "fifo"):
+  * average: bảng gia_von_tb giữ (số lượng, đơn giá bình quân) cho mỗi kho/SP;
+    nhập -> trộn giá bằng một UPSERT, xuất -> lấy đơn giá hiện tại.
+  * fifo   : bảng lop_gia_von giữ các lớp (ngày nhập, số lượng còn, đơn giá);
+    xuất tiêu thụ lớp cũ nhất trước.
+
+Được gọi trong cùng giao dịch với nhập / xuất / điều chuyển, SAU khi ton_kho đã
+được trừ (dòng ton_kho đang bị khóa nên các lần xuất cùng mã được tuần tự hóa).
+Đơn giá vốn lưu trên từng dòng hoa_don_xuat / dieu_chuyen_ct nên báo cáo lợi
+nhuận chỉ còn là phép cộng. rebuild() phát lại toàn bộ lịch sử để điền lại.
+
+Tiền tính bằng Decimal, đơn giá làm tròn về 4 chữ số như cột NUMERIC(18, 4)
+(cả trong UPSERT trộn giá), nên phát lại trong bộ nhớ cho cùng kết quả với
+ghi trực tiếp và lớp giá không tích lũy sai số nhị phân của float.
+"""
+from collections import defaultdict, deque
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import current_app
+from sqlalchemy import (
+    select, update, delete, insert, func, case, and_, tuple_, bindparam, literal, union_all, inspect, text,
+)
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import db, GiaVonTB, LopGiaVon, HoaDonNhap, HoaDonXuat, DieuChuyen, DieuChuyenCT
+
+METHODS = ("average", "fifo")
+SCALE = 4                     # số chữ số thập phân của don_gia / don_gia_von
+UNIT = Decimal(1).scaleb(-SCALE)
+ZERO = Decimal(0)
+
+tb = GiaVonTB.__table__
+lop = LopGiaVon.__table__
+
+
+def _dec(v):
+    """Decimal từ giá trị DB / form (Decimal, float, int, chuỗi); None -> 0."""
+    if v is None:
+        return ZERO
+    return v if isinstance(v, Decimal) else Decimal(str(v))
+
+
+def _unit(v):
+    """Làm tròn đơn giá về thang của cột (ROUND_HALF_UP như ROUND() của MySQL với DECIMAL)."""
+    return v.quantize(UNIT, rounding=ROUND_HALF_UP)
+
+
+def method():
+    m = current_app.config.get("COSTING_METHOD", "average")
+    if m not in METHODS:
+        raise ValueError(f"COSTING_METHOD không hợp lệ: {m}")
+    return m
+
+
+def _dialect():
+    return db.session.get_bind(mapper=GiaVonTB).dialect
+
+
+def _fallback_costs(keys):
+    """Đơn giá khi chưa có lớp giá (tồn đầu kỳ / dữ liệu cũ): giá nhập gần nhất của SP, ưu tiên cùng kho.
+
+    Một truy vấn cho mọi khóa: dòng nhập mới nhất theo từng (kho, SP) của các SP cần tính.
+    """
+    rn = func.row_number().over(
+        partition_by=(HoaDonNhap.id_kho, HoaDonNhap.id_san_pham), order_by=HoaDonNhap.ngay_nhap.desc()
+    ).label("rn")
+    sub = (
+        select(HoaDonNhap.id_kho, HoaDonNhap.id_san_pham, HoaDonNhap.gia_nhap, HoaDonNhap.ngay_nhap, rn)
+        .where(HoaDonNhap.id_san_pham.in_({sp for _, sp in keys}))
+        .subquery()
+    )
+    by_kho, by_sp = {}, {}
+    for k, sp, gia, ngay in db.session.execute(
+        select(sub.c.id_kho, sub.c.id_san_pham, sub.c.gia_nhap, sub.c.ngay_nhap).where(sub.c.rn == 1)
+    ):
+        by_kho[(k, sp)] = gia
+        if sp not in by_sp or ngay > by_sp[sp][0]:
+            by_sp[sp] = (ngay, gia)
+    return {(k, sp): _dec(by_kho.get((k, sp), by_sp.get(sp, (None, 0))[1])) for k, sp in keys}
+
+
+def ensure_costing_schema(engine):
+    """Tạo bảng giá vốn + cột don_gia_von trên DB cũ.
+
+    Trả về True nếu cần phát lại lịch sử: chưa có trạng thái giá vốn nào nhưng
+    đã có dòng xuất chưa được tính giá (DB cũ / dữ liệu nạp bằng SQL).
+    """
+    insp = inspect(engine)
+    if not insp.has_table(HoaDonXuat.__tablename__):
+        return False
+    for model in (HoaDonXuat, DieuChuyenCT):
+        t = model.__tablename__
+        if insp.has_table(t) and "don_gia_von" not in {c["name"] for c in insp.get_columns(t)}:
+            with engine.begin() as conn:
+                conn.execute(text(f"ALTER TABLE {t} ADD COLUMN don_gia_von NUMERIC(18, 4)"))
+    tb.create(bind=engine, checkfirst=True)
+    lop.create(bind=engine, checkfirst=True)
+    hdx = HoaDonXuat.__table__
+    with engine.connect() as conn:
+        has_state = conn.execute(select(tb.c.id_kho).limit(1)).first() or conn.execute(select(lop.c.id).limit(1)).first()
+        pending = conn.execute(select(hdx.c.id_hoa_don_xuat).where(hdx.c.don_gia_von.is_(None)).limit(1)).first()
+    return bool(pending and not has_state)
+
+
+# -----------------------------------------------------------------------------
+# Nhập
+# -----------------------------------------------------------------------------
+def receive(items):
+    """Ghi nhận hàng vào: items = (id_kho, id_sp, qty, don_gia, ngay)."""
+    items = [(k, sp, int(q), _unit(_dec(c)), ngay) for k, sp, q, c, ngay in items if int(q) > 0]
+    if not items:
+        return
+    if method() == "fifo":
+        db.session.execute(insert(lop), [
+            dict(id_kho=k, id_san_pham=sp, ngay=ngay, so_luong_con=q, don_gia=c)
+            for k, sp, q, c, ngay in items
+        ])
+        return
+
+    # bình quân: gộp các dòng cùng khóa thành (tổng SL, đơn giá bình quân của lô)
+    agg = defaultdict(lambda: [0, ZERO])
+    for k, sp, q, c, _ in items:
+        agg[(k, sp)][0] += q
+        agg[(k, sp)][1] += q * c
+    rows = [dict(id_kho=k, id_san_pham=sp, so_luong=q, don_gia=_unit(v / q)) for (k, sp), (q, v) in agg.items()]
+
+    d = _dialect()
+    if d.name == "mysql":
+        stmt = mysql.insert(tb).values(rows)
+        new_q = tb.c.so_luong + stmt.inserted.so_luong
+        blended = case(
+            (and_(tb.c.so_luong > 0, new_q > 0),
+             func.round((tb.c.so_luong * tb.c.don_gia + stmt.inserted.so_luong * stmt.inserted.don_gia) / new_q, SCALE)),
+            else_=stmt.inserted.don_gia,
+        )
+        # MySQL gán lần lượt: don_gia phải tính trước khi so_luong bị cộng
+        stmt = stmt.on_duplicate_key_update([("don_gia", blended), ("so_luong", new_q)])
+    elif d.name in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if d.name == "sqlite" else postgresql.insert)(tb).values(rows)
+        new_q = tb.c.so_luong + stmt.excluded.so_luong
+        blended = case(
+            (and_(tb.c.so_luong > 0, new_q > 0),
+             func.round((tb.c.so_luong * tb.c.don_gia + stmt.excluded.so_luong * stmt.excluded.don_gia) / new_q, SCALE)),
+            else_=stmt.excluded.don_gia,
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[tb.c.id_kho, tb.c.id_san_pham],
+            set_={"don_gia": blended, "so_luong": new_q},
+        )
+    else:
+        for r in rows:
+            key = (tb.c.id_kho == r["id_kho"]) & (tb.c.id_san_pham == r["id_san_pham"])
+            cur = db.session.execute(select(tb.c.so_luong, tb.c.don_gia).where(key)).first()
+            if cur is None:
+                db.session.execute(insert(tb).values(**r))
+                continue
+            q0, c0 = int(cur[0]), _dec(cur[1])
+            q1 = q0 + r["so_luong"]
+            c1 = _unit((q0 * c0 + r["so_luong"] * r["don_gia"]) / q1) if q0 > 0 and q1 > 0 else r["don_gia"]
+            db.session.execute(update(tb).where(key).values(so_luong=q1, don_gia=c1))
+        return
+    db.session.execute(stmt)
+
+
+# -----------------------------------------------------------------------------
+# Xuất
+# -----------------------------------------------------------------------------
+def issue(items):
+    """Ghi nhận hàng ra: items = (id_kho, id_sp, qty); trả về {(id_kho, id_sp): đơn giá vốn}."""
+    agg = defaultdict(int)
+    for k, sp, q in items:
+        agg[(k, sp)] += int(q)
+    agg = {key: q for key, q in agg.items() if q > 0}
+    if not agg:
+        return {}
+    return _fifo_issue(agg) if method() == "fifo" else _avg_issue(agg)
+
+
+def _avg_issue(agg):
+    keys = list(agg)
+    cur = dict(
+        ((k, sp), _dec(c)) for k, sp, c in db.session.execute(
+            select(tb.c.id_kho, tb.c.id_san_pham, tb.c.don_gia)
+            .where(tuple_(tb.c.id_kho, tb.c.id_san_pham).in_(keys))
+            .with_for_update()
+        )
+    )
+    known = [key for key in keys if key in cur]
+    if known:
+        amount = case(
+            *[(and_(tb.c.id_kho == k, tb.c.id_san_pham == sp), agg[(k, sp)]) for k, sp in known],
+            else_=0,
+        )
+        db.session.execute(
+            update(tb)
+            .where(tuple_(tb.c.id_kho, tb.c.id_san_pham).in_(known))
+            .values(so_luong=tb.c.so_luong - amount)
+        )
+    missing = [key for key in keys if key not in cur]
+    if missing:
+        # chưa có trạng thái (bán trước lần nhập đầu): ghi (-SL, giá dự phòng) như _Book.issue,
+        # để lần nhập sau trộn giá giống hệt khi phát lại. Dòng ton_kho của khóa đang bị
+        # khóa trong giao dịch này nên không có giao dịch khác chèn cùng khóa.
+        fallback = _fallback_costs(missing)
+        db.session.execute(insert(tb), [
+            dict(id_kho=k, id_san_pham=sp, so_luong=-agg[(k, sp)], don_gia=fallback[(k, sp)])
+            for k, sp in missing
+        ])
+        cur.update(fallback)
+    return {key: cur[key] for key in keys}
+
+
+def _fifo_issue(agg):
+    keys = list(agg)
+    layers = defaultdict(list)
+    for lid, k, sp, q, c in db.session.execute(
+        select(lop.c.id, lop.c.id_kho, lop.c.id_san_pham, lop.c.so_luong_con, lop.c.don_gia)
+        .where(tuple_(lop.c.id_kho, lop.c.id_san_pham).in_(keys), lop.c.so_luong_con > 0)
+        .order_by(lop.c.id_kho, lop.c.id_san_pham, lop.c.ngay, lop.c.id)
+        .with_for_update()
+    ):
+        layers[(k, sp)].append([lid, int(q), _dec(c)])
+
+    costs, changed, emptied, short = {}, [], [], {}
+    for key, need in agg.items():
+        total, left, last_price = ZERO, need, None
+        for lid, q, c in layers.get(key, ()):
+            if left == 0:
+                break
+            take = min(q, left)
+            total += take * c
+            left -= take
+            last_price = c
+            if take == q:
+                emptied.append(lid)
+            else:
+                changed.append({"b_id": lid, "b_q": q - take})
+        if left:
+            # bán vượt số lượng có lớp giá (tồn đầu kỳ): phần thiếu tính theo giá cuối / giá dự phòng
+            short[key] = (left, last_price)
+        costs[key] = total
+
+    if short:
+        fallback = _fallback_costs([key for key, (_, p) in short.items() if p is None])
+        for key, (left, p) in short.items():
+            costs[key] += left * (p if p is not None else fallback[key])
+    if changed:
+        db.session.execute(
+            update(lop).where(lop.c.id == bindparam("b_id")).values(so_luong_con=bindparam("b_q")),
+            changed,
+        )
+    if emptied:
+        db.session.execute(delete(lop).where(lop.c.id.in_(emptied)))
+    return {key: _unit(costs[key] / agg[key]) for key in agg}
+
+
+# -----------------------------------------------------------------------------
+# Phát lại lịch sử
+# -----------------------------------------------------------------------------
+class _Book:
+    """Trạng thái giá vốn trong bộ nhớ khi phát lại (cùng quy tắc với receive / issue)."""
+
+    def __init__(self, fifo):
+        self.fifo = fifo
+        self.avg = {}                      # key -> [qty, don_gia]
+        self.layers = defaultdict(deque)   # key -> deque([ngay, qty, don_gia])
+        self.last_key = {}                 # key -> giá nhập cuối
+        self.last_sp = {}                  # id_sp -> giá nhập cuối (mọi kho)
+
+    def receive(self, key, q, c, ngay):
+        self.last_key[key] = c
+        self.last_sp[key[1]] = c
+        if self.fifo:
+            self.layers[key].append([ngay, q, c])
+            return
+        q0, c0 = self.avg.get(key, (0, ZERO))
+        q1 = q0 + q
+        self.avg[key] = [q1, _unit((q0 * c0 + q * c) / q1) if q0 > 0 and q1 > 0 else c]
+
+    def _fallback(self, key):
+        return self.last_key.get(key, self.last_sp.get(key[1], ZERO))
+
+    def issue(self, key, q):
+        if not self.fifo:
+            st = self.avg.get(key)
+            if st is None:
+                st = self.avg[key] = [0, self._fallback(key)]
+            st[0] -= q
+            return st[1]
+        total, left, last = ZERO, q, None
+        dq = self.layers[key]
+        while left and dq:
+            layer = dq[0]
+            take = min(layer[1], left)
+            total += take * layer[2]
+            left -= take
+            last = layer[2]
+            layer[1] -= take
+            if layer[1] == 0:
+                dq.popleft()
+        if left:
+            total += left * (last if last is not None else self._fallback(key))
+        return _unit(total / q)
+
+
+def _events(t0, t1):
+    """Nhập / điều chuyển / xuất trong [t0, t1) theo thời gian; cùng thời điểm thì nhập trước."""
+    n = select(
+        HoaDonNhap.ngay_nhap.label("ngay"), literal(0).label("loai"),
+        HoaDonNhap.id_hoa_don_nhap.label("ma"), HoaDonNhap.id_san_pham.label("sp"),
+        HoaDonNhap.id_kho.label("kho"), HoaDonNhap.so_san_pham_nhap.label("sl"),
+        HoaDonNhap.gia_nhap.label("gia"), literal(None).label("kho_dich"),
+    ).where(HoaDonNhap.ngay_nhap >= t0, HoaDonNhap.ngay_nhap < t1)
+    dc = select(
+        DieuChuyen.ngay_dc, literal(1), DieuChuyen.id_dieu_chuyen, DieuChuyenCT.id_san_pham,
+        DieuChuyen.kho_nguon, DieuChuyenCT.so_luong, literal(None), DieuChuyen.kho_dich,
+    ).join(DieuChuyenCT, DieuChuyenCT.id_dieu_chuyen == DieuChuyen.id_dieu_chuyen)\
+     .where(DieuChuyen.ngay_dc >= t0, DieuChuyen.ngay_dc < t1)
+    x = select(
+        HoaDonXuat.ngay_xuat, literal(2), HoaDonXuat.id_hoa_don_xuat, HoaDonXuat.id_san_pham,
+        HoaDonXuat.id_kho, HoaDonXuat.so_san_pham_xuat, literal(None), literal(None),
+    ).where(HoaDonXuat.ngay_xuat >= t0, HoaDonXuat.ngay_xuat < t1)
+    u = union_all(n, dc, x).subquery()
+    return select(u).order_by(u.c.ngay, u.c.loai, u.c.ma, u.c.sp)
+
+
+def rebuild(step_days=31, progress=None):
+    """Xóa trạng thái giá vốn rồi phát lại toàn bộ nhập / điều chuyển / xuất theo từng khoảng ngày.
+
+    Ghi lại don_gia_von cho mọi dòng hoa_don_xuat / dieu_chuyen_ct và trạng thái cuối
+    vào gia_von_tb / lop_gia_von. Trả về số dòng xuất đã tính giá.
+    """
+    book = _Book(method() == "fifo")
+    lo = [v for v in (
+        db.session.execute(select(func.min(HoaDonNhap.ngay_nhap))).scalar(),
+        db.session.execute(select(func.min(HoaDonXuat.ngay_xuat))).scalar(),
+        db.session.execute(select(func.min(DieuChuyen.ngay_dc))).scalar(),
+    ) if v]
+    hi = [v for v in (
+        db.session.execute(select(func.max(HoaDonNhap.ngay_nhap))).scalar(),
+        db.session.execute(select(func.max(HoaDonXuat.ngay_xuat))).scalar(),
+        db.session.execute(select(func.max(DieuChuyen.ngay_dc))).scalar(),
+    ) if v]
+
+    upd_x = (
+        update(HoaDonXuat.__table__)
+        .where(
+            HoaDonXuat.__table__.c.id_hoa_don_xuat == bindparam("b_ma"),
+            HoaDonXuat.__table__.c.id_san_pham == bindparam("b_sp"),
+            HoaDonXuat.__table__.c.id_kho == bindparam("b_kho"),
+        )
+        .values(don_gia_von=bindparam("b_gia"))
+    )
+    upd_dc = (
+        update(DieuChuyenCT.__table__)
+        .where(
+            DieuChuyenCT.__table__.c.id_dieu_chuyen == bindparam("b_ma"),
+            DieuChuyenCT.__table__.c.id_san_pham == bindparam("b_sp"),
+        )
+        .values(don_gia_von=bindparam("b_gia"))
+    )
+
+    n_x = 0
+    if lo:
+        start = min(lo).replace(hour=0, minute=0, second=0, microsecond=0)
+        end_all = max(hi)
+        while start <= end_all:
+            stop = start + timedelta(days=step_days)
+            xs, dcs = [], []
+            for ngay, loai, ma, sp, kho, sl, gia, kho_dich in db.session.execute(_events(start, stop)):
+                sl = int(sl)
+                if loai == 0:
+                    book.receive((kho, sp), sl, _unit(_dec(gia)), ngay)
+                elif loai == 1:
+                    c = book.issue((kho, sp), sl)
+                    book.receive((kho_dich, sp), sl, c, ngay)
+                    dcs.append({"b_ma": ma, "b_sp": sp, "b_gia": c})
+                else:
+                    xs.append({"b_ma": ma, "b_sp": sp, "b_kho": kho, "b_gia": book.issue((kho, sp), sl)})
+            if xs:
+                db.session.execute(upd_x, xs)
+            if dcs:
+                db.session.execute(upd_dc, dcs)
+            db.session.commit()
+            n_x += len(xs)
+            if progress:
+                progress(start.date(), (stop - timedelta(days=1)).date(), len(xs))
+            start = stop
+
+    db.session.execute(delete(tb))
+    db.session.execute(delete(lop))
+    if book.fifo:
+        rows = [dict(id_kho=k, id_san_pham=sp, ngay=ngay, so_luong_con=q, don_gia=c)
+                for (k, sp), dq in book.layers.items() for ngay, q, c in dq if q > 0]
+        if rows:
+            db.session.execute(insert(lop), rows)
+    else:
+        rows = [dict(id_kho=k, id_san_pham=sp, so_luong=q, don_gia=c) for (k, sp), (q, c) in book.avg.items()]
+        if rows:
+            db.session.execute(insert(tb), rows)
+    db.session.commit()
+    return n_x
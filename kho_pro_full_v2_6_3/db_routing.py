@@ -0,0 +1,106 @@
+"""Chia đọc sang bản sao (bind "replica") cho request GET chỉ đọc.
+
+* SQLALCHEMY_BINDS["replica"] có cấu hình thì before_request của app bật
+  use_replica() cho GET / HEAD; SELECT (không FOR UPDATE) của phiên khi đó đi
+  sang bản sao, mọi lệnh ghi vẫn đi primary.
+* Phiên vừa ghi / vừa SELECT ... FOR UPDATE thì ghim vào primary tới hết request
+  (đọc ngay sau khi ghi phải thấy dữ liệu của chính mình).
+* Người dùng vừa ghi (commit) thì các request kế tiếp trong REPLICA_STICKY_SECONDS
+  giây vẫn đọc primary: mốc thời gian nằm trong session cookie, vì sau POST là
+  redirect sang trang GET đọc lại dữ liệu vừa ghi mà bản sao có thể chưa kịp nhận.
+* Bản sao lỗi kết nối (OperationalError) thì câu lệnh được chạy lại trên primary
+  và bản sao bị bỏ qua REPLICA_RETRY_SECONDS giây.
+"""
+import time
+
+from flask import current_app, has_app_context, has_request_context, session as http_session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql import Select, CompoundSelect
+
+REPLICA = "replica"
+_USE = "use_replica"
+_PIN = "pin_primary"
+_WROTE = "wrote"
+_COOKIE = "_ghi_luc"
+
+
+def _is_read(clause):
+    return isinstance(clause, (Select, CompoundSelect)) and clause._for_update_arg is None
+
+
+def _down_until():
+    return current_app.extensions.get("replica_down_until", 0.0)
+
+
+class RoutingSession(Session):
+    """Session của Flask-SQLAlchemy, thêm định tuyến SELECT sang bind replica."""
+
+    def _replica(self, clause):
+        if not self.info.get(_USE) or self.info.get(_PIN) or self._flushing or not _is_read(clause):
+            return None
+        if time.monotonic() < _down_until():
+            return None
+        return self._db.engines.get(REPLICA)
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            engine = self._replica(clause)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _routed(self, run, statement, *args, **kwargs):
+        if not _is_read(statement):
+            # ghi / khóa dòng: các câu đọc sau trong request phải thấy kết quả này
+            self.info[_PIN] = True
+            return run(statement, *args, **kwargs)
+        if self._replica(statement) is None:
+            return run(statement, *args, **kwargs)
+        try:
+            return run(statement, *args, **kwargs)
+        except OperationalError as e:
+            current_app.extensions["replica_down_until"] = (
+                time.monotonic() + current_app.config.get("REPLICA_RETRY_SECONDS", 30))
+            current_app.logger.warning("Bản sao đọc lỗi, chuyển sang primary: %s", e.orig)
+            self.info[_PIN] = True
+            return run(statement, *args, **kwargs)
+
+    def execute(self, statement, *args, **kwargs):
+        return self._routed(super().execute, statement, *args, **kwargs)
+
+    def scalar(self, statement, *args, **kwargs):
+        return self._routed(super().scalar, statement, *args, **kwargs)
+
+    def scalars(self, statement, *args, **kwargs):
+        return self._routed(super().scalars, statement, *args, **kwargs)
+
+
+def use_replica(session):
+    """Bật đọc từ bản sao cho phiên (nếu có cấu hình bind replica)."""
+    if REPLICA in current_app.config.get("SQLALCHEMY_BINDS", {}):
+        session.info[_USE] = True
+
+
+def recently_wrote():
+    """Người dùng hiện tại vừa ghi trong REPLICA_STICKY_SECONDS giây gần đây?"""
+    ts = http_session.get(_COOKIE)
+    return ts is not None and time.time() - ts < current_app.config.get("REPLICA_STICKY_SECONDS", 5)
+
+
+@event.listens_for(RoutingSession, "after_flush")
+def _note_flush(session, flush_context):
+    session.info[_WROTE] = session.info[_PIN] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _stick_after_write(session):
+    if session.info.pop(_WROTE, False) and has_app_context() and has_request_context():
+        http_session[_COOKIE] = time.time()
+
+
+@event.listens_for(RoutingSession, "do_orm_execute")
+def _note_orm_write(state):
+    if not state.is_select:
+        state.session.info[_WROTE] = True
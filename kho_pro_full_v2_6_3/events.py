@@ -0,0 +1,152 @@
+"""Bus sự kiện trong tiến trình cho thay đổi tồn kho (đẩy ra màn hình qua SSE).
+
+stock_engine gọi stage() sau mỗi lần ghi ton_kho; sự kiện chỉ được phát khi
+giao dịch COMMIT thành công (rollback / chạy lại run_tx thì bỏ). Bus giữ:
+  * một nhật ký vòng (SSE_BUFFER_SIZE sự kiện gần nhất) để client nối lại
+    bằng Last-Event-ID mà không mất sự kiện;
+  * một hàng đợi giới hạn (SSE_CLIENT_QUEUE) cho mỗi client: client chậm bị
+    tràn thì nhận sự kiện `reset` (tải lại dữ liệu) thay vì làm phình bộ nhớ.
+Mã sự kiện = "<boot>-<seq>": tiến trình khởi động lại thì client cũ nhận `reset`.
+Bus chỉ nằm trong MỘT tiến trình: chạy nhiều worker thì mỗi worker chỉ thấy
+các thay đổi do chính nó ghi.
+"""
+import json
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+RESET = object()
+_INFO_KEY = "ton_kho_events"
+
+
+class Subscription:
+    def __init__(self, khos, maxsize):
+        self.khos = khos              # set id_kho hoặc None = mọi kho
+        self.q = queue.Queue(maxsize)
+        self.overflow = False
+
+    def wants(self, kho):
+        return self.khos is None or kho in self.khos
+
+    def offer(self, ev):
+        if self.overflow:
+            return
+        try:
+            self.q.put_nowait(ev)
+        except queue.Full:
+            self.overflow = True
+            # báo ngay cho luồng đang chờ; phần còn lại bị bỏ
+            try:
+                self.q.get_nowait()
+            except queue.Empty:
+                pass
+            self.q.put_nowait(RESET)
+
+    def get(self, timeout):
+        """Sự kiện kế tiếp, RESET, hoặc None khi hết thời gian chờ."""
+        try:
+            return self.q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventBus:
+    def __init__(self, buffer_size=2000, client_queue=500):
+        self.boot = f"{os.getpid():x}{int(time.time()):x}"
+        self.client_queue = client_queue
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._log = deque(maxlen=buffer_size)  # (seq, kho, data)
+        self._subs = set()
+        self._kho_seq = {}  # id_kho -> seq của sự kiện gần nhất (phiên bản tồn trong tiến trình)
+
+    def event_id(self, seq):
+        return f"{self.boot}-{seq}"
+
+    def head_id(self):
+        with self._lock:
+            return self.event_id(self._seq)
+
+    def publish(self, items):
+        """items: (id_kho, dict dữ liệu)."""
+        with self._lock:
+            for kho, data in items:
+                self._seq += 1
+                ev = (self._seq, kho, data)
+                self._log.append(ev)
+                self._kho_seq[kho] = self._seq
+                for sub in self._subs:
+                    if sub.wants(kho):
+                        sub.offer(ev)
+
+    def kho_marks(self, khos):
+        """{id_kho: seq} của lần ghi tồn gần nhất mà tiến trình này đã commit."""
+        with self._lock:
+            return {k: self._kho_seq.get(k, 0) for k in khos}
+
+    def subscribe(self, khos=None, last_id=None):
+        """Đăng ký nhận sự kiện; có last_id thì phát lại phần còn trong nhật ký (hoặc RESET nếu đã trôi mất)."""
+        sub = Subscription(set(khos) if khos is not None else None, self.client_queue)
+        with self._lock:
+            if last_id:
+                boot, _, seq = last_id.rpartition("-")
+                try:
+                    seq = int(seq)
+                except ValueError:
+                    seq = -1
+                oldest = self._log[0][0] if self._log else self._seq + 1
+                if boot != self.boot or seq < oldest - 1 or seq > self._seq:
+                    sub.offer(RESET)
+                else:
+                    for ev in self._log:
+                        if ev[0] > seq and sub.wants(ev[1]):
+                            sub.offer(ev)
+            self._subs.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            self._subs.discard(sub)
+
+
+def bus():
+    ext = current_app.extensions
+    if "event_bus" not in ext:
+        cfg = current_app.config
+        ext["event_bus"] = EventBus(cfg.get("SSE_BUFFER_SIZE", 2000), cfg.get("SSE_CLIENT_QUEUE", 500))
+    return ext["event_bus"]
+
+
+def stage(session, rows):
+    """Ghi nhớ thay đổi tồn (id_kho, id_sp, so_luong, nguong) của giao dịch hiện tại; phát khi commit."""
+    session.info.setdefault(_INFO_KEY, []).extend(
+        (k, {"kho": k, "sp": sp, "so_luong": int(q), "nguong": int(n), "canh_bao": int(q) <= int(n)})
+        for k, sp, q, n in rows
+    )
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_on_commit(session):
+    items = session.info.pop(_INFO_KEY, None)
+    if items and has_app_context():
+        bus().publish(items)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def _drop_on_rollback(session, previous_transaction):
+    if not previous_transaction.nested:
+        session.info.pop(_INFO_KEY, None)
+
+
+def sse_format(bus_, ev):
+    """Một sự kiện theo định dạng text/event-stream."""
+    if ev is RESET:
+        return f"id: {bus_.head_id()}\nevent: reset\ndata: {{}}\n\n"
+    seq, _, data = ev
+    return f"id: {bus_.event_id(seq)}\nevent: ton\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
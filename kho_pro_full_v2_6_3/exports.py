@@ -0,0 +1,121 @@
+"""Xuất dữ liệu ra CSV / XLSX theo luồng, bộ nhớ không đổi theo số dòng.
+
+* Dữ liệu đọc bằng server-side cursor (stream_results + yield_per).
+* CSV: generator trả từng khối ~64KB về client ngay khi có.
+* XLSX: XlsxWriter ở chế độ constant_memory ghi ra file tạm, sau đó file
+  được gửi theo từng khối rồi xoá.
+* write_csv / write_xlsx ghi thẳng ra file cho công việc chạy nền (jobs.py).
+"""
+import csv
+import os
+import tempfile
+from io import StringIO
+
+from flask import Response, current_app, stream_with_context
+
+from models import db
+
+CHUNK_BYTES = 64 * 1024
+XLSX_MAX_ROWS = 1_048_576  # giới hạn số dòng một sheet của Excel
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+
+def stream_rows(stmt, batch=None):
+    """Đọc kết quả theo lô từ server-side cursor, trả về từng tuple."""
+    batch = batch or current_app.config.get("EXPORT_BATCH_SIZE", 1000)
+    result = db.session.execute(stmt.execution_options(stream_results=True, yield_per=batch))
+    for row in result:
+        yield tuple(row)
+
+
+def _attachment(filename):
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+def csv_response(filename, header, rows):
+    """Response CSV dạng generator (có BOM để Excel đọc đúng tiếng Việt)."""
+    def generate():
+        buf = StringIO()
+        w = csv.writer(buf)
+        buf.write("\ufeff")
+        w.writerow(header)
+        for row in rows:
+            w.writerow(row)
+            if buf.tell() >= CHUNK_BYTES:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/csv; charset=utf-8",
+        headers=_attachment(f"{filename}.csv"),
+    )
+
+
+def write_csv(path, header, rows):
+    """Ghi CSV (có BOM) ra file; trả về số dòng dữ liệu."""
+    n = 0
+    with open(path, "w", encoding="utf-8", newline="") as fh:
+        fh.write("\ufeff")
+        w = csv.writer(fh)
+        w.writerow(header)
+        for row in rows:
+            w.writerow(row)
+            n += 1
+    return n
+
+
+def write_xlsx(path, header, rows, sheet="Data"):
+    """Ghi XLSX ở chế độ constant_memory (mỗi lần chỉ giữ 1 dòng); trả về số dòng dữ liệu."""
+    import xlsxwriter
+
+    wb = xlsxwriter.Workbook(path, {
+        "constant_memory": True,
+        "default_date_format": "yyyy-mm-dd hh:mm",
+    })
+    bold = wb.add_format({"bold": True})
+    ws, r, n_sheet, n = None, XLSX_MAX_ROWS, 0, 0
+    for row in rows:
+        if r >= XLSX_MAX_ROWS:
+            # quá giới hạn một sheet -> sang sheet mới
+            n_sheet += 1
+            ws = wb.add_worksheet(sheet if n_sheet == 1 else f"{sheet}_{n_sheet}")
+            ws.write_row(0, 0, header, bold)
+            r = 1
+        ws.write_row(r, 0, row)
+        r += 1
+        n += 1
+    if ws is None:
+        wb.add_worksheet(sheet).write_row(0, 0, header, bold)
+    wb.close()
+    return n
+
+
+def xlsx_response(filename, header, rows, sheet="Data"):
+    """Ghi XLSX ra file tạm (write_xlsx) rồi stream file."""
+    fd, path = tempfile.mkstemp(suffix=".xlsx")
+    os.close(fd)
+    try:
+        write_xlsx(path, header, rows, sheet)
+    except Exception:
+        os.remove(path)
+        raise
+
+    def generate():
+        try:
+            with open(path, "rb") as fh:
+                while True:
+                    chunk = fh.read(CHUNK_BYTES)
+                    if not chunk:
+                        break
+                    yield chunk
+        finally:
+            os.remove(path)
+
+    return Response(
+        generate(),
+        mimetype=XLSX_MIME,
+        headers={**_attachment(f"{filename}.xlsx"), "Content-Length": str(os.path.getsize(path))},
+    )
@@ -0,0 +1,182 @@
+"""Công việc chạy nền cho báo cáo / xuất file lớn: bảng cong_viec + thread pool.
+
+Request chỉ dựng sẵn câu truy vấn (đã áp quyền của người dùng) rồi submit();
+luồng nền ghi kết quả ra file trong JOB_RESULT_DIR và cập nhật tiến độ, trang
+trạng thái hỏi lại qua API cho tới khi có link tải về. Vì thế request không
+giữ worker / kết nối DB suốt thời gian chạy báo cáo.
+
+Kết quả được dùng chung theo băm tham số hiệu lực (loại, định dạng, bộ lọc,
+phạm vi quyền): công việc trùng tham số đang chờ / đang chạy, hoặc đã xong và
+chưa quá JOB_RESULT_TTL giây, được trả lại thay vì chạy lần nữa.
+Pool nằm trong tiến trình: khởi động lại thì công việc dở dang không còn ai
+chạy; chúng bị coi là hỏng khi nhịp sống (cap_nhat) quá JOB_STALE_SECONDS.
+"""
+import hashlib
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, update, delete
+
+from models import db, CongViec
+from exports import write_csv, write_xlsx
+import db_routing
+
+cv = CongViec.__table__
+
+CHO, DANG_CHAY, XONG, LOI = "cho", "dang_chay", "xong", "loi"
+WRITERS = {"csv": write_csv, "xlsx": write_xlsx}
+
+
+def ensure_jobs_schema(engine):
+    cv.create(bind=engine, checkfirst=True)
+
+
+def _pool():
+    ext = current_app.extensions
+    if "job_pool" not in ext:
+        ext["job_pool"] = ThreadPoolExecutor(
+            max_workers=current_app.config.get("JOB_WORKERS", 2), thread_name_prefix="cong-viec")
+        ext["job_submit_lock"] = threading.Lock()
+    return ext["job_pool"]
+
+
+def _result_dir():
+    path = current_app.config.get("JOB_RESULT_DIR") or os.path.join(current_app.instance_path, "jobs")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def params_hash(loai, params):
+    raw = json.dumps([loai, params], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _check_stale(job, now):
+    """Công việc dở dang mất nhịp sống (tiến trình chạy nó đã dừng) -> đánh dấu lỗi."""
+    stale = timedelta(seconds=current_app.config.get("JOB_STALE_SECONDS", 600))
+    if job.trang_thai in (CHO, DANG_CHAY) and job.cap_nhat < now - stale:
+        job.trang_thai = LOI
+        job.thong_bao = "Tiến trình chạy công việc đã dừng, hãy chạy lại."
+        job.ket_thuc = job.cap_nhat = now
+        job.het_han = now + timedelta(seconds=current_app.config.get("JOB_RESULT_TTL", 900))
+        db.session.commit()
+
+
+def _reusable(job, now):
+    _check_stale(job, now)
+    if job.trang_thai in (CHO, DANG_CHAY):
+        return True
+    return (job.trang_thai == XONG and job.het_han and job.het_han > now
+            and job.duong_dan and os.path.exists(job.duong_dan))
+
+
+def get(job_id):
+    job = db.session.get(CongViec, job_id)
+    if job is not None:
+        _check_stale(job, datetime.now())
+    return job
+
+
+def purge(now=None):
+    """Xóa công việc đã hết hạn cùng file kết quả."""
+    now = now or datetime.now()
+    old = db.session.execute(select(cv.c.id, cv.c.duong_dan).where(cv.c.het_han < now)).all()
+    for _id, path in old:
+        if path and os.path.exists(path):
+            os.remove(path)
+    if old:
+        db.session.execute(delete(cv).where(cv.c.id.in_([r[0] for r in old])))
+        db.session.commit()
+
+
+def submit(loai, params, pham_vi, fmt, header, produce, filename, user=None):
+    """Trả về CongViec trùng tham số còn dùng được, hoặc tạo mới và đưa vào pool.
+
+    produce(): trả về iterable các dòng; được gọi trong luồng nền (có app context,
+    KHÔNG có request / current_user) nên mọi bộ lọc quyền phải nằm sẵn trong nó.
+    """
+    if fmt not in WRITERS:
+        raise ValueError(f"Định dạng không hỗ trợ: {fmt}")
+    pool = _pool()
+    h = params_hash(loai, dict(params, fmt=fmt, pham_vi=pham_vi))
+    now = datetime.now()
+    # khóa trong tiến trình: hai admin bấm cùng lúc chỉ tạo một công việc
+    with current_app.extensions["job_submit_lock"]:
+        purge(now)
+        job = db.session.execute(
+            select(CongViec).where(CongViec.tham_so_hash == h)
+            .order_by(CongViec.tao_luc.desc()).limit(1)
+        ).scalar_one_or_none()
+        if job is not None and _reusable(job, now):
+            return job
+        job = CongViec(
+            id=uuid.uuid4().hex, loai=loai, tham_so_hash=h,
+            tham_so=json.dumps(params, ensure_ascii=False, default=str),
+            pham_vi=pham_vi, trang_thai=CHO, tien_do=0, nguoi_tao=user,
+            ten_file=f"{filename}.{fmt}", tao_luc=now, cap_nhat=now,
+        )
+        db.session.add(job)
+        db.session.commit()
+    pool.submit(_run, current_app._get_current_object(), job.id, fmt, header, produce)
+    return job
+
+
+def _set(job_id, **values):
+    """Ghi trạng thái bằng kết nối riêng: phiên của luồng nền có thể đang giữ server-side cursor."""
+    values.setdefault("cap_nhat", datetime.now())
+    with db.engine.begin() as conn:
+        conn.execute(update(cv).where(cv.c.id == job_id).values(**values))
+
+
+def _counted(rows, job_id, every):
+    n = 0
+    for row in rows:
+        yield row
+        n += 1
+        if n % every == 0:
+            _set(job_id, tien_do=n)
+
+
+def _run(app, job_id, fmt, header, produce):
+    with app.app_context():
+        path = None
+        try:
+            status = db.session.execute(select(cv.c.trang_thai).where(cv.c.id == job_id)).scalar()
+            db.session.rollback()
+            if status != CHO:  # đã bị coi là hỏng / bị xóa khi còn trong hàng đợi
+                return
+            _set(job_id, trang_thai=DANG_CHAY)
+            db_routing.use_replica(db.session)  # báo cáo chỉ đọc: chạy trên bản sao nếu có
+            path = os.path.join(_result_dir(), f"{job_id}.{fmt}")
+            rows = _counted(produce(), job_id, app.config.get("JOB_PROGRESS_EVERY", 5000))
+            n = WRITERS[fmt](path, header, rows)
+            now = datetime.now()
+            _set(job_id, trang_thai=XONG, tien_do=n, duong_dan=path, ket_thuc=now,
+                 het_han=now + timedelta(seconds=app.config.get("JOB_RESULT_TTL", 900)))
+        except Exception as e:
+            db.session.rollback()
+            if path and os.path.exists(path):
+                os.remove(path)
+            now = datetime.now()
+            _set(job_id, trang_thai=LOI, thong_bao=str(e)[:500], ket_thuc=now,
+                 het_han=now + timedelta(seconds=app.config.get("JOB_RESULT_TTL", 900)))
+        finally:
+            db.session.remove()
+
+
+def to_dict(job):
+    return {
+        "id": job.id,
+        "loai": job.loai,
+        "trang_thai": job.trang_thai,
+        "tien_do": job.tien_do,
+        "thong_bao": job.thong_bao,
+        "ten_file": job.ten_file,
+        "tao_luc": job.tao_luc.isoformat(timespec="seconds") if job.tao_luc else None,
+        "ket_thuc": job.ket_thuc.isoformat(timespec="seconds") if job.ket_thuc else None,
+    }
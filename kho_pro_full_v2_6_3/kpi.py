@@ -0,0 +1,260 @@
+"""Ảnh chụp chỉ số trang chủ theo kho: chi_so_kho(id_kho) + chi_so_kho_delta.
+
+Mỗi kho một dòng: số mã còn hàng, tổng tồn, số đơn xuất, lần nhập / xuất cuối,
+và phien_ban tăng mỗi lần tồn của kho đổi (ETag cho API tồn kho).
+Giao dịch ghi tồn / ghi hóa đơn KHÔNG sửa dòng của kho (dòng nóng: mọi phiếu
+của một kho sẽ phải chờ nhau tới commit), mà chỉ INSERT phần cộng dồn của nó
+vào chi_so_kho_delta:
+  * stock_engine gọi on_stock() sau mỗi lần cộng / trừ tồn (biết tồn mới và
+    delta nên suy ra được mã vừa hết / vừa có hàng, không phải đếm lại);
+  * route nhập / xuất và nhập hàng loạt gọi on_invoices() trước khi chèn dòng.
+Đọc = dòng chi_so_kho + tổng các dòng delta của kho. Dòng chưa từng tính đầy đủ
+(cap_nhat NULL) hoặc quá KPI_SNAPSHOT_TTL giây thì refresh() tính lại từ
+ton_kho / hóa đơn và xóa các delta đã có trong kết quả đó (cũng là lưới an toàn
+cho dữ liệu ghi ngoài app). Trang chủ chỉ đọc vài dòng này; "Tất cả kho" = cộng.
+"""
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import select, func, case, tuple_, inspect, text
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+
+from models import db, ChiSoKho, ChiSoKhoDelta, TonKho, HoaDonNhap, HoaDonXuat
+
+csk = ChiSoKho.__table__
+cskd = ChiSoKhoDelta.__table__
+
+SUM_COLS = ("so_sp_con", "tong_ton", "so_don_xuat")
+MAX_COLS = ("nhap_cuoi", "xuat_cuoi")
+IN_CHUNK = 1000  # số mã delta mỗi câu DELETE
+
+
+def ensure_kpi_schema(engine):
+    """Tạo chi_so_kho + chi_so_kho_delta; bảng tạo từ bản cũ thì thêm cột phien_ban."""
+    csk.create(bind=engine, checkfirst=True)
+    cskd.create(bind=engine, checkfirst=True)
+    if "phien_ban" not in {c["name"] for c in inspect(engine).get_columns(csk.name)}:
+        with engine.begin() as conn:
+            conn.execute(text(f"ALTER TABLE {csk.name} ADD COLUMN phien_ban BIGINT NOT NULL DEFAULT 0"))
+
+
+def _lock():
+    ext = current_app.extensions
+    if "kpi_refresh_lock" not in ext:
+        ext["kpi_refresh_lock"] = threading.Lock()
+    return ext["kpi_refresh_lock"]
+
+
+def _upsert(rows):
+    """Ghi đè dòng chi_so_kho bằng kết quả tính lại đầy đủ; phien_ban += r["phien_ban"]."""
+    if not rows:
+        return
+    d = db.session.get_bind(mapper=ChiSoKho).dialect
+    cols = (*SUM_COLS, *MAX_COLS, "cap_nhat")
+    if d.name == "mysql":
+        stmt = mysql.insert(csk).values(rows)
+        new = stmt.inserted
+    elif d.name in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if d.name == "sqlite" else postgresql.insert)(csk).values(rows)
+        new = stmt.excluded
+    else:
+        for r in rows:
+            cur = db.session.get(ChiSoKho, r["id_kho"])
+            if cur is None:
+                db.session.add(ChiSoKho(**r))
+                continue
+            cur.phien_ban = (cur.phien_ban or 0) + r["phien_ban"]
+            for c in cols:
+                setattr(cur, c, r[c])
+        db.session.flush()
+        return
+
+    values = {c: new[c] for c in cols}
+    values["phien_ban"] = csk.c.phien_ban + new.phien_ban
+    if d.name == "mysql":
+        stmt = stmt.on_duplicate_key_update(**values)
+    else:
+        stmt = stmt.on_conflict_do_update(index_elements=[csk.c.id_kho], set_=values)
+    db.session.execute(stmt)
+
+
+def _record(agg):
+    """agg: id_kho -> dict cột; chèn một dòng delta mỗi kho (theo thứ tự mã kho)."""
+    rows = []
+    for kho in sorted(agg):
+        r = dict(id_kho=kho, phien_ban=0, **dict.fromkeys(SUM_COLS, 0), **dict.fromkeys(MAX_COLS))
+        r.update(agg[kho])
+        rows.append(r)
+    if rows:
+        db.session.execute(cskd.insert(), rows)
+
+
+def _deltas(kho_ids):
+    """{id_kho: (tổng các delta, [mã delta])} của các delta đã commit."""
+    out = {}
+    for r in db.session.execute(select(cskd).where(cskd.c.id_kho.in_(kho_ids)).order_by(cskd.c.id)):
+        acc, ids = out.setdefault(r.id_kho, (dict(phien_ban=0, **dict.fromkeys(SUM_COLS, 0),
+                                                   **dict.fromkeys(MAX_COLS)), []))
+        for c in (*SUM_COLS, "phien_ban"):
+            acc[c] += int(getattr(r, c) or 0)
+        for c in MAX_COLS:
+            v = getattr(r, c)
+            if v is not None and (acc[c] is None or acc[c] < v):
+                acc[c] = v
+        ids.append(r.id)
+    return out
+
+
+# -----------------------------------------------------------------------------
+# Ghi: gọi trong giao dịch nhập / xuất / điều chuyển
+# -----------------------------------------------------------------------------
+def on_stock(changes):
+    """changes: (id_kho, id_sp, delta, tồn_mới) của các dòng ton_kho vừa ghi."""
+    agg = defaultdict(lambda: dict.fromkeys(SUM_COLS, 0))
+    for kho, _sp, delta, new in changes:
+        old = new - delta
+        agg[kho]["tong_ton"] += delta
+        agg[kho]["so_sp_con"] += (new > 0) - (old > 0)
+        agg[kho]["phien_ban"] = 1
+    _record(agg)
+
+
+def on_invoices(kind, rows):
+    """Gọi TRƯỚC khi chèn các dòng hoa_don_nhap / hoa_don_xuat (dict theo tên cột)."""
+    if not rows:
+        return
+    agg = defaultdict(dict)
+    if kind == "nhap":
+        for r in rows:
+            a = agg[r["id_kho"]]
+            if a.get("nhap_cuoi") is None or a["nhap_cuoi"] < r["ngay_nhap"]:
+                a["nhap_cuoi"] = r["ngay_nhap"]
+    else:
+        pairs = {(r["id_hoa_don_xuat"], r["id_kho"]) for r in rows}
+        # mã đơn đã có dòng (thêm SP vào đơn cũ) thì không đếm lại
+        seen = set(db.session.execute(
+            select(HoaDonXuat.id_hoa_don_xuat, HoaDonXuat.id_kho)
+            .where(tuple_(HoaDonXuat.id_hoa_don_xuat, HoaDonXuat.id_kho).in_(list(pairs)))
+            .distinct()
+        ).all())
+        for id_hd, kho in pairs - {tuple(p) for p in seen}:
+            agg[kho]["so_don_xuat"] = agg[kho].get("so_don_xuat", 0) + 1
+        for r in rows:
+            a = agg[r["id_kho"]]
+            if a.get("xuat_cuoi") is None or a["xuat_cuoi"] < r["ngay_xuat"]:
+                a["xuat_cuoi"] = r["ngay_xuat"]
+    _record(agg)
+
+
+# -----------------------------------------------------------------------------
+# Tính lại đầy đủ + đọc
+# -----------------------------------------------------------------------------
+def refresh(kho_ids):
+    """Tính lại các dòng của kho_ids từ ton_kho / hóa đơn, xóa các delta đã gộp, rồi commit.
+
+    Delta và ton_kho / hóa đơn được đọc trong cùng một giao dịch (MySQL REPEATABLE
+    READ: cùng một ảnh chụp), nên delta nào đã nằm trong kết quả tính lại thì bị
+    xóa, delta của giao dịch chưa commit thì còn lại và được cộng khi đọc.
+    """
+    kho_ids = sorted(kho_ids)
+    if not kho_ids:
+        return
+    # khóa dòng ảnh chụp: hai lần tính lại cùng kho chờ nhau thay vì xóa delta hai lần
+    db.session.execute(select(csk.c.id_kho).where(csk.c.id_kho.in_(kho_ids))
+                       .order_by(csk.c.id_kho).with_for_update())
+    deltas = _deltas(kho_ids)
+    res = {k: dict(id_kho=k, phien_ban=1, **dict.fromkeys(SUM_COLS, 0), **dict.fromkeys(MAX_COLS)) for k in kho_ids}
+    for kho, con, ton in db.session.execute(
+        select(TonKho.id_kho, func.sum(case((TonKho.so_luong > 0, 1), else_=0)), func.sum(TonKho.so_luong))
+        .where(TonKho.id_kho.in_(kho_ids)).group_by(TonKho.id_kho)
+    ):
+        res[kho].update(so_sp_con=int(con or 0), tong_ton=int(ton or 0))
+    for kho, n, last in db.session.execute(
+        select(HoaDonXuat.id_kho, func.count(func.distinct(HoaDonXuat.id_hoa_don_xuat)), func.max(HoaDonXuat.ngay_xuat))
+        .where(HoaDonXuat.id_kho.in_(kho_ids)).group_by(HoaDonXuat.id_kho)
+    ):
+        res[kho].update(so_don_xuat=int(n or 0), xuat_cuoi=last)
+    for kho, last in db.session.execute(
+        select(HoaDonNhap.id_kho, func.max(HoaDonNhap.ngay_nhap))
+        .where(HoaDonNhap.id_kho.in_(kho_ids)).group_by(HoaDonNhap.id_kho)
+    ):
+        res[kho]["nhap_cuoi"] = last
+    now = datetime.now()
+    for kho, r in res.items():
+        r["cap_nhat"] = now
+        # phien_ban không lùi: cộng cả số lần ghi của các delta sắp xóa
+        r["phien_ban"] += deltas[kho][0]["phien_ban"] if kho in deltas else 0
+    _upsert(list(res.values()))
+    ids = [i for _, (_, part) in sorted(deltas.items()) for i in part]
+    for i in range(0, len(ids), IN_CHUNK):
+        db.session.execute(cskd.delete().where(cskd.c.id.in_(ids[i:i + IN_CHUNK])))
+    db.session.commit()
+
+
+def _read(kho_ids):
+    """{id_kho: dict cột} = dòng chi_so_kho + tổng delta; kho chưa có dòng thì không có mặt."""
+    rows = {r.id_kho: dict(r._mapping) for r in db.session.execute(select(csk).where(csk.c.id_kho.in_(kho_ids)))}
+    for kho, (acc, _) in _deltas([k for k in kho_ids if k in rows]).items():
+        r = rows[kho]
+        for c in (*SUM_COLS, "phien_ban"):
+            r[c] = int(r[c] or 0) + acc[c]
+        for c in MAX_COLS:
+            if acc[c] is not None and (r[c] is None or r[c] < acc[c]):
+                r[c] = acc[c]
+    return rows
+
+
+def snapshot(kho_ids):
+    """Trả về {id_kho: dict cột}; dòng thiếu / quá hạn được tính lại trước khi trả."""
+    kho_ids = list(kho_ids)
+    if not kho_ids:
+        return {}
+    ttl = current_app.config.get("KPI_SNAPSHOT_TTL", 900)
+    rows = _read(kho_ids)
+    limit = datetime.now() - timedelta(seconds=ttl)
+    stale = [k for k in kho_ids if k not in rows or rows[k]["cap_nhat"] is None or rows[k]["cap_nhat"] < limit]
+    if not stale:
+        return rows
+    lock = _lock()
+    # nhiều request cùng thấy quá hạn: một request tính lại, các request khác
+    # dùng tạm số cũ nếu đã có (chỉ chờ khi kho chưa có dòng nào)
+    blocking = any(k not in rows for k in stale)
+    if lock.acquire(blocking=blocking):
+        try:
+            refresh(stale)
+        except Exception:
+            db.session.rollback()
+            raise
+        finally:
+            lock.release()
+        rows = _read(kho_ids)
+    return rows
+
+
+def versions(kho_ids=None):
+    """{id_kho: phien_ban} (dòng chi_so_kho + delta); None = mọi kho có dòng, kho chưa có dòng = 0."""
+    base, part = select(csk.c.id_kho, csk.c.phien_ban), select(cskd.c.id_kho, func.sum(cskd.c.phien_ban))
+    if kho_ids is not None:
+        base, part = base.where(csk.c.id_kho.in_(kho_ids)), part.where(cskd.c.id_kho.in_(kho_ids))
+    rows = {k: int(v or 0) for k, v in db.session.execute(base)}
+    for kho, n in db.session.execute(part.group_by(cskd.c.id_kho)):
+        rows[kho] = rows.get(kho, 0) + int(n or 0)
+    if kho_ids is not None:
+        rows = {k: rows.get(k, 0) for k in kho_ids}
+    return rows
+
+
+def totals(kho_ids):
+    """Cộng các dòng của kho_ids: dict(so_sp_con, tong_ton, so_don_xuat, nhap_cuoi, xuat_cuoi)."""
+    out = dict.fromkeys(SUM_COLS, 0)
+    out.update(dict.fromkeys(MAX_COLS))
+    for r in snapshot(kho_ids).values():
+        for c in SUM_COLS:
+            out[c] += int(r[c] or 0)
+        for c in MAX_COLS:
+            v = r[c]
+            if v is not None and (out[c] is None or out[c] < v):
+                out[c] = v
+    return out
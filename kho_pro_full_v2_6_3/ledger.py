@@ -0,0 +1,160 @@
+"""Lịch sử hóa đơn nhập / xuất: phân trang keyset + kiểm tra kế hoạch truy vấn.
+
+Bảng hóa đơn lưu theo dòng (hóa đơn × SP), nên con trỏ là bộ (ngày, mã hóa đơn,
+mã SP) của dòng cuối trang: trang sau bắt đầu đúng sau dòng đó, không bỏ sót
+dòng còn lại của một hóa đơn bị cắt giữa hai trang, và trang thứ 1000 tốn như
+trang đầu (không OFFSET).
+
+Mỗi bộ lọc trên trang có một index (cột lọc, ngày, mã hóa đơn, mã SP) trong
+models.py, kho + một bộ lọc khác có thêm (kho, cột lọc, ngày, ...), nên MySQL đọc
+index theo đúng thứ tự ORDER BY rồi dừng ở LIMIT thay vì sắp xếp cả tập đã lọc.
+Các tổ hợp khác (vd NV + NCC, hay 3 bộ lọc trở lên) dùng index của một cột bằng
+rồi lọc phần còn lại trên từng dòng: vẫn không filesort, chỉ đọc nhiều dòng hơn.
+`flask explain-lich-su` chạy EXPLAIN cho mọi tổ hợp tham số mà
+_nhap_hist_filters / _xuat_hist_filters sinh ra và báo lỗi nếu câu nào filesort.
+"""
+from datetime import datetime, timedelta
+from itertools import combinations
+
+from flask import current_app, request
+from sqlalchemy import select, or_, and_, true
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from models import db, HoaDonNhap, HoaDonXuat
+
+# kind -> (model, cột ngày, cột mã hóa đơn)
+LEDGERS = {
+    "nhap": (HoaDonNhap, HoaDonNhap.ngay_nhap, HoaDonNhap.id_hoa_don_nhap),
+    "xuat": (HoaDonXuat, HoaDonXuat.ngay_xuat, HoaDonXuat.id_hoa_don_xuat),
+}
+CURSOR_ARGS = ("after", "after_id", "after_sp")
+
+
+def parse_cursor(args):
+    """(ngày, mã hóa đơn, mã SP) từ ?after=&after_id=&after_sp=; None nếu thiếu / sai."""
+    after_id, after_sp = args.get("after_id"), args.get("after_sp")
+    if not after_id or not after_sp:
+        return None
+    try:
+        return datetime.fromisoformat(args.get("after", "")), after_id, after_sp
+    except ValueError:
+        return None
+
+
+def page_stmt(kind, conds, cursor=None, size=None):
+    """SELECT một trang lịch sử, mới nhất trước; cursor = dòng cuối trang trước."""
+    model, ngay, id_hd = LEDGERS[kind]
+    stmt = select(model).where(*conds)
+    if cursor:
+        t, hd, sp = cursor
+        # (ngay, id_hd, id_sp) < (t, hd, sp), viết tách để MySQL dùng range trên index
+        stmt = stmt.where(ngay <= t, or_(ngay < t, id_hd < hd,
+                                         (id_hd == hd) & (model.id_san_pham < sp)))
+    stmt = stmt.order_by(ngay.desc(), id_hd.desc(), model.id_san_pham.desc())
+    return stmt.limit(size) if size else stmt
+
+
+def page(kind, conds, args):
+    """(items, next_cursor, paged) cho trang lịch sử; cỡ trang LEDGER_PAGE_SIZE."""
+    _, ngay, id_hd = LEDGERS[kind]
+    size = current_app.config.get("LEDGER_PAGE_SIZE", 50)
+    cursor = parse_cursor(args)
+    items = db.session.execute(page_stmt(kind, conds, cursor, size + 1)).scalars().all()
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        last = items[-1]
+        next_cursor = (getattr(last, ngay.key).isoformat(), getattr(last, id_hd.key), last.id_san_pham)
+    return items, next_cursor, cursor is not None
+
+
+# -----------------------------------------------------------------------------
+# EXPLAIN cho các kiểu lọc của trang lịch sử
+# -----------------------------------------------------------------------------
+class _Explain(Executable, ClauseElement):
+    inherit_cache = False
+
+    def __init__(self, stmt):
+        self.stmt = stmt
+
+
+@compiles(_Explain)
+def _explain(element, compiler, **kw):
+    return "EXPLAIN " + compiler.process(element.stmt, **kw)
+
+
+@compiles(_Explain, "sqlite")
+def _explain_sqlite(element, compiler, **kw):
+    return "EXPLAIN QUERY PLAN " + compiler.process(element.stmt, **kw)
+
+
+def _sample(col):
+    """Một giá trị có thật của cột (để optimizer ước lượng như lúc chạy thật)."""
+    return db.session.execute(select(col).where(col.isnot(None)).limit(1)).scalar() or "?"
+
+
+# tham số lọc của trang lịch sử -> cột lấy giá trị mẫu ("from" = khoảng ngày from / to)
+FILTER_ARGS = {
+    "nhap": {"f_kho": HoaDonNhap.id_kho, "f_nv": HoaDonNhap.id_nhan_vien,
+             "f_ncc": HoaDonNhap.id_nha_cung_cap, "from": None},
+    "xuat": {"f_kho": HoaDonXuat.id_kho, "f_nv": HoaDonXuat.id_nhan_vien,
+             "f_xe": HoaDonXuat.id_xe_van_chuyen, "f_kh": HoaDonXuat.id_khach_hang, "from": None},
+}
+
+
+def _shapes():
+    """(kind, tên, điều kiện) cho MỌI tổ hợp tham số lọc, admin và nhân viên.
+
+    Điều kiện do chính _nhap_hist_filters / _xuat_hist_filters sinh ra (trong một
+    request giả với người dùng giả), nên kiểm tra luôn khớp với trang thật; các tổ
+    hợp cho ra cùng câu WHERE (staff bỏ qua f_kho / f_nv) chỉ được kiểm một lần.
+    """
+    from flask_login import login_user
+    from user_cache import CachedUser
+    from views.common import USERNAME_TO_NV, _nhap_hist_filters, _xuat_hist_filters
+
+    helpers = {"nhap": _nhap_hist_filters, "xuat": _xuat_hist_filters}
+    kho = _sample(HoaDonXuat.id_kho)
+    staff_name = next(iter(USERNAME_TO_NV), "nv")
+    users = {
+        "admin": CachedUser(0, "admin", None, "admin", None),
+        "staff": CachedUser(0, staff_name, None, "staff", kho),
+    }
+    since = (datetime.now() - timedelta(days=30)).strftime("%Y-%m-%d")
+    out, seen = [], set()
+    for kind, params in FILTER_ARGS.items():
+        values = {p: ({"from": since, "to": datetime.now().strftime("%Y-%m-%d")} if col is None
+                      else {p: _sample(col)}) for p, col in params.items()}
+        for role, user in users.items():
+            for r in range(len(params) + 1):
+                for combo in combinations(params, r):
+                    args = {k: v for p in combo for k, v in values[p].items()}
+                    with current_app.test_request_context(query_string=args):
+                        login_user(user)
+                        conds, _ = helpers[kind](request.args)
+                    where = str(and_(true(), *conds).compile(dialect=db.engine.dialect))
+                    if (kind, where) in seen:
+                        continue
+                    seen.add((kind, where))
+                    out.append((kind, f"{role}: {' + '.join(combo) or 'không lọc'}", conds))
+    return out
+
+
+def _sorts(plan_rows):
+    """Kế hoạch có bước sắp xếp riêng? MySQL: "Using filesort"; SQLite: "TEMP B-TREE FOR ... ORDER BY"."""
+    text = " | ".join(" ".join(str(v) for v in r if v is not None) for r in plan_rows)
+    return "filesort" in text.lower() or "TEMP B-TREE" in text, text
+
+
+def explain_pages():
+    """EXPLAIN trang đầu + trang sau của mọi kiểu lọc -> [(kind, tên, trang, có_sắp_xếp, kế_hoạch)]."""
+    size = current_app.config.get("LEDGER_PAGE_SIZE", 50)
+    cursor = (datetime.now(), "~", "~")
+    out = []
+    for kind, label, conds in _shapes():
+        for trang, cur in (("đầu", None), ("sau", cursor)):
+            rows = db.session.execute(_Explain(page_stmt(kind, conds, cur, size + 1))).all()
+            sorts, text = _sorts(rows)
+            out.append((kind, label, trang, sorts, text))
+    return out
@@ -0,0 +1,173 @@
+"""Đo số câu SQL / thời gian SQL / thời gian xử lý theo endpoint, xuất dạng Prometheus.
+
+* Sự kiện before/after_cursor_execute của mọi Engine (primary + replica) cộng
+  dồn vào bộ đếm của request hiện tại (flask.g); câu chạy ngoài request bỏ qua.
+* Cuối request (after_request) ghi ba histogram theo endpoint: thời gian xử lý,
+  số câu SQL, tổng thời gian SQL; và bộ đếm request theo mã trạng thái.
+* Câu chậm hơn METRICS_SLOW_QUERY_MS được ghi log kèm câu lệnh; cùng một câu
+  lệnh (cùng chuỗi SQL, khác tham số) lặp từ METRICS_N_PLUS_ONE lần trong một
+  request thì ghi log cảnh báo N+1.
+* render() trả về text format 0.0.4 cho route /metrics.
+Số liệu nằm trong bộ nhớ của từng tiến trình.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from flask import current_app, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PREFIX = "kho"
+TIME_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+SQL_PREVIEW = 500  # số ký tự câu SQL đưa vào log
+
+
+class Histogram:
+    def __init__(self, name, help_, buckets, labels):
+        self.name, self.help, self.buckets, self.labels = name, help_, buckets, labels
+        self._data = {}  # giá trị nhãn -> [đếm theo bucket..., sum, count]
+
+    def observe(self, label_values, v):
+        d = self._data.get(label_values)
+        if d is None:
+            d = self._data[label_values] = [0] * len(self.buckets) + [0.0, 0]
+        for i, b in enumerate(self.buckets):
+            if v <= b:
+                d[i] += 1
+        d[-2] += v
+        d[-1] += 1
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for lv, d in sorted(self._data.items()):
+            base = _labels(self.labels, lv)
+            for i, b in enumerate(self.buckets):
+                yield f'{self.name}_bucket{{{base},le="{b}"}} {d[i]}'
+            yield f'{self.name}_bucket{{{base},le="+Inf"}} {d[-1]}'
+            yield f"{self.name}_sum{{{base}}} {d[-2]:.6f}"
+            yield f"{self.name}_count{{{base}}} {d[-1]}"
+
+
+class CounterMetric:
+    def __init__(self, name, help_, labels):
+        self.name, self.help, self.labels = name, help_, labels
+        self._data = defaultdict(int)
+
+    def inc(self, label_values, n=1):
+        self._data[label_values] += n
+
+    def lines(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for lv, n in sorted(self._data.items()):
+            yield f"{self.name}{{{_labels(self.labels, lv)}}} {n}"
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names, values):
+    return ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values))
+
+
+class Registry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        ep = ("endpoint", "method")
+        self.req_seconds = Histogram(f"{PREFIX}_request_duration_seconds",
+                                     "Thời gian xử lý request.", TIME_BUCKETS, ep)
+        self.req_queries = Histogram(f"{PREFIX}_request_sql_queries",
+                                     "Số câu SQL mỗi request.", COUNT_BUCKETS, ep)
+        self.req_sql_seconds = Histogram(f"{PREFIX}_request_sql_seconds",
+                                         "Tổng thời gian SQL mỗi request.", TIME_BUCKETS, ep)
+        self.requests = CounterMetric(f"{PREFIX}_requests_total", "Số request theo mã trạng thái.",
+                                      ("endpoint", "method", "status"))
+        self.slow = CounterMetric(f"{PREFIX}_slow_queries_total", "Số câu SQL chậm.", ("endpoint",))
+        self.n_plus_one = CounterMetric(f"{PREFIX}_repeated_queries_total",
+                                        "Số request có câu SQL lặp (nghi N+1).", ("endpoint",))
+
+    def render(self):
+        with self.lock:
+            out = []
+            for m in (self.req_seconds, self.req_queries, self.req_sql_seconds,
+                      self.requests, self.slow, self.n_plus_one):
+                out.extend(m.lines())
+        return "\n".join(out) + "\n"
+
+
+def registry():
+    ext = current_app.extensions
+    if "metrics" not in ext:
+        ext["metrics"] = Registry()
+    return ext["metrics"]
+
+
+def _endpoint():
+    return request.endpoint or "404"
+
+
+# -----------------------------------------------------------------------------
+# Gắn vào request (gọi từ before_request / after_request của app)
+# -----------------------------------------------------------------------------
+def start_request():
+    g._metrics = {"t0": time.perf_counter(), "n": 0, "sql": 0.0, "stmts": Counter()}
+
+
+def finish_request(response):
+    st = g.pop("_metrics", None)
+    if st is None:
+        return response
+    cfg = current_app.config
+    key = (_endpoint(), request.method)
+    reg = registry()
+    with reg.lock:
+        reg.req_seconds.observe(key, time.perf_counter() - st["t0"])
+        reg.req_queries.observe(key, st["n"])
+        reg.req_sql_seconds.observe(key, st["sql"])
+        reg.requests.inc((*key, response.status_code))
+    limit = cfg.get("METRICS_N_PLUS_ONE", 10)
+    repeated = [(stmt, n) for stmt, n in st["stmts"].items() if n >= limit]
+    if repeated:
+        with reg.lock:
+            reg.n_plus_one.inc((key[0],))
+        for stmt, n in repeated:
+            current_app.logger.warning("N+1? %s %s: %d lần: %s", request.method, request.path, n,
+                                       " ".join(stmt.split())[:SQL_PREVIEW])
+    return response
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and "_metrics" in g:
+        conn.info.setdefault("_metrics_t0", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get("_metrics_t0")
+    if not starts or not has_request_context():
+        return
+    st = g.get("_metrics")
+    dt = time.perf_counter() - starts.pop()
+    if st is None:
+        return
+    st["n"] += 1
+    st["sql"] += dt
+    st["stmts"][statement] += 1
+    if dt * 1000 >= current_app.config.get("METRICS_SLOW_QUERY_MS", 200):
+        reg = registry()
+        with reg.lock:
+            reg.slow.inc((_endpoint(),))
+        current_app.logger.warning("SQL chậm %.0f ms (%s): %s", dt * 1000, _endpoint(),
+                                   " ".join(statement.split())[:SQL_PREVIEW])
+
+
+@event.listens_for(Engine, "handle_error")
+def _on_error(ctx):
+    starts = ctx.connection.info.get("_metrics_t0") if ctx.connection is not None else None
+    if starts:
+        starts.pop()
@@ -2,7 +2,10 @@ from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from sqlalchemy import Enum
 
-db = SQLAlchemy()
+from db_routing import RoutingSession
+
+# RoutingSession: SELECT của request GET có thể đi sang bind "replica" (db_routing.py)
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # =========================
 # Users (đăng nhập) + quyền
@@ -63,14 +66,23 @@ class KhachHang(db.Model):
     ten = db.Column(db.String(100))
     so_dien_thoai = db.Column(db.String(20))
     id_dia_chi = db.Column(db.String(100), db.ForeignKey('dia_diem.id_dia_diem'))
+    tim_kiem = db.Column(db.Text)  # mã KH + họ tên + SĐT, bỏ dấu, viết thường (search.py)
     dia_diem = db.relationship("DiaDiem")
 
+    # tìm theo tiền tố tên / SĐT ở ô gợi ý khách hàng
+    __table_args__ = (
+        db.Index('ix_kh_ten', 'ten'),
+        db.Index('ix_kh_ho', 'ho'),
+        db.Index('ix_kh_sdt', 'so_dien_thoai'),
+    )
+
 class NhaCungCap(db.Model):
     __tablename__ = 'nha_cung_cap'
     id_nha_cung_cap = db.Column(db.String(100), primary_key=True)
     ten_nha_cung_cap = db.Column(db.String(255), nullable=False)
     so_dien_thoai_nha_cung_cap = db.Column(db.String(20))
     id_dia_chi = db.Column(db.String(100), db.ForeignKey('dia_diem.id_dia_diem'))
+    tim_kiem = db.Column(db.Text)  # mã NCC + tên + SĐT, bỏ dấu, viết thường (search.py)
     dia_diem = db.relationship("DiaDiem")
 
 class XeVanChuyen(db.Model):
@@ -110,6 +122,11 @@ class SanPham(db.Model):
     ten_san_pham = db.Column(db.String(255), nullable=False)
     chat_lieu = db.Column(db.String(100))
     mau = db.Column(db.String(100))
+    tim_kiem = db.Column(db.Text)  # mã SP + tên + chất liệu + màu, bỏ dấu, viết thường (search.py)
+
+    __table_args__ = (
+        db.Index('ix_sp_ten', 'ten_san_pham'),
+    )
 
 
 class TonKho(db.Model):
@@ -139,8 +156,15 @@ class HoaDonNhap(db.Model):
 
     __table_args__ = (
         db.Index('ix_hdn_sp', 'id_san_pham'),
-        db.Index('ix_hdn_kho', 'id_kho'),
-        db.Index('ix_hdn_ngay', 'ngay_nhap'),
+        db.Index('ix_hdn_kho_sp_ngay', 'id_kho', 'id_san_pham', 'ngay_nhap'),  # giá nhập gần nhất (giá vốn)
+        # lịch sử nhập (ledger.py): (cột lọc, ngày, mã HĐ, mã SP) = đúng thứ tự ORDER BY, không filesort
+        db.Index('ix_hdn_ngay_id', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
+        db.Index('ix_hdn_kho_ngay', 'id_kho', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
+        db.Index('ix_hdn_nv_ngay', 'id_nhan_vien', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
+        db.Index('ix_hdn_ncc_ngay', 'id_nha_cung_cap', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
+        # kho + một bộ lọc khác (admin chọn kho rồi lọc thêm)
+        db.Index('ix_hdn_kho_nv_ngay', 'id_kho', 'id_nhan_vien', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
+        db.Index('ix_hdn_kho_ncc_ngay', 'id_kho', 'id_nha_cung_cap', 'ngay_nhap', 'id_hoa_don_nhap', 'id_san_pham'),
     )
 
 
@@ -159,10 +183,19 @@ class HoaDonXuat(db.Model):
     id_xe_van_chuyen = db.Column(db.String(100), db.ForeignKey('xe_van_chuyen.id_xe_van_chuyen'))
     id_khach_hang    = db.Column(db.String(100), db.ForeignKey('khach_hang.id_khach_hang'))
 
+    don_gia_von      = db.Column(db.Numeric(18, 4))  # giá vốn / đơn vị tại thời điểm bán (costing.py)
+
     __table_args__ = (
         db.Index('ix_hdx_sp', 'id_san_pham'),
-        db.Index('ix_hdx_kho', 'id_kho'),
-        db.Index('ix_hdx_ngay', 'ngay_xuat'),
+        # lịch sử xuất (ledger.py), như hoa_don_nhap
+        db.Index('ix_hdx_ngay_id', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_kho_ngay', 'id_kho', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_nv_ngay', 'id_nhan_vien', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_xe_ngay', 'id_xe_van_chuyen', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_kh_ngay', 'id_khach_hang', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_kho_nv_ngay', 'id_kho', 'id_nhan_vien', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_kho_xe_ngay', 'id_kho', 'id_xe_van_chuyen', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
+        db.Index('ix_hdx_kho_kh_ngay', 'id_kho', 'id_khach_hang', 'ngay_xuat', 'id_hoa_don_xuat', 'id_san_pham'),
     )
 
 
@@ -189,3 +222,144 @@ class DieuChuyenCT(db.Model):
     id_dieu_chuyen = db.Column(db.String(100), db.ForeignKey('dieu_chuyen.id_dieu_chuyen'), primary_key=True)
     id_san_pham    = db.Column(db.String(100), db.ForeignKey('san_pham.id_san_pham'), primary_key=True)
     so_luong       = db.Column(db.Integer, nullable=False)
+    don_gia_von    = db.Column(db.Numeric(18, 4))  # giá vốn chuyển từ kho nguồn sang kho đích
+
+
+# =========================
+# Bộ đếm cấp mã (N/X/DC/SP/KH/NCC/VC)
+# =========================
+class MaSo(db.Model):
+    __tablename__ = 'ma_so'
+    tien_to = db.Column(db.String(20), primary_key=True)
+    gia_tri = db.Column(db.BigInteger, nullable=False, default=0)  # số cuối cùng đã cấp
+
+
+# =========================
+# Phiên bản dữ liệu danh mục (vô hiệu cache giữa các worker)
+# =========================
+class PhienBanDuLieu(db.Model):
+    __tablename__ = 'phien_ban_du_lieu'
+    ten_bang = db.Column(db.String(64), primary_key=True)
+    phien_ban = db.Column(db.BigInteger, nullable=False, default=0)
+
+
+# =========================
+# Tổng hợp bán hàng theo ngày (rollup.py)
+# =========================
+class DoanhThuNgay(db.Model):
+    __tablename__ = 'doanh_thu_ngay'
+    ngay         = db.Column(db.Date, primary_key=True)
+    id_kho       = db.Column(db.String(50), primary_key=True)
+    id_san_pham  = db.Column(db.String(100), primary_key=True)
+
+    sl_xuat      = db.Column(db.Integer, nullable=False, default=0)
+    doanh_thu    = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    gia_von      = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+    sl_nhap      = db.Column(db.Integer, nullable=False, default=0)
+    gia_tri_nhap = db.Column(db.Numeric(18, 2), nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_dtn_kho_ngay', 'id_kho', 'ngay'),
+    )
+
+
+# =========================
+# Chỉ số trang chủ theo kho (kpi.py)
+# =========================
+class ChiSoKho(db.Model):
+    __tablename__ = 'chi_so_kho'
+    id_kho      = db.Column(db.String(50), primary_key=True)
+    so_sp_con   = db.Column(db.Integer, nullable=False, default=0)   # số mã có tồn > 0
+    tong_ton    = db.Column(db.BigInteger, nullable=False, default=0)
+    so_don_xuat = db.Column(db.Integer, nullable=False, default=0)   # số mã hóa đơn xuất
+    nhap_cuoi   = db.Column(db.DateTime)
+    xuat_cuoi   = db.Column(db.DateTime)
+    cap_nhat    = db.Column(db.DateTime)  # lần tính lại đầy đủ gần nhất (NULL = chưa tính)
+    phien_ban   = db.Column(db.BigInteger, nullable=False, default=0)  # tăng mỗi lần ton_kho của kho đổi
+
+
+class ChiSoKhoDelta(db.Model):
+    """Phần cộng dồn của từng giao dịch ghi; chỉ INSERT, refresh() gộp vào chi_so_kho rồi xóa."""
+    __tablename__ = 'chi_so_kho_delta'
+    id          = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    id_kho      = db.Column(db.String(50), nullable=False)
+    so_sp_con   = db.Column(db.Integer, nullable=False, default=0)
+    tong_ton    = db.Column(db.BigInteger, nullable=False, default=0)
+    so_don_xuat = db.Column(db.Integer, nullable=False, default=0)
+    nhap_cuoi   = db.Column(db.DateTime)
+    xuat_cuoi   = db.Column(db.DateTime)
+    phien_ban   = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.Index('ix_cskd_kho', 'id_kho', 'id'),
+    )
+
+
+# =========================
+# Cảnh báo tồn thấp (alerts.py): dong_luc NULL = đang mở
+# =========================
+class CanhBaoTon(db.Model):
+    __tablename__ = 'canh_bao_ton'
+    id          = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    id_kho      = db.Column(db.String(50), nullable=False)
+    id_san_pham = db.Column(db.String(100), nullable=False)
+    so_luong    = db.Column(db.Integer, nullable=False)  # tồn lúc ghi gần nhất
+    nguong      = db.Column(db.Integer, nullable=False)
+    mo_luc      = db.Column(db.DateTime, nullable=False)
+    dong_luc    = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_cbt_mo', 'dong_luc', 'id_kho', 'id_san_pham'),
+        db.Index('ix_cbt_kho_sp', 'id_kho', 'id_san_pham'),
+    )
+
+
+# =========================
+# Giá vốn (costing.py): bình quân di động / lớp FIFO
+# =========================
+class GiaVonTB(db.Model):
+    __tablename__ = 'gia_von_tb'
+    id_kho      = db.Column(db.String(50), primary_key=True)
+    id_san_pham = db.Column(db.String(100), primary_key=True)
+    so_luong    = db.Column(db.Integer, nullable=False, default=0)
+    don_gia     = db.Column(db.Numeric(18, 4), nullable=False, default=0)
+
+
+class LopGiaVon(db.Model):
+    __tablename__ = 'lop_gia_von'
+    id           = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    id_kho       = db.Column(db.String(50), nullable=False)
+    id_san_pham  = db.Column(db.String(100), nullable=False)
+    ngay         = db.Column(db.DateTime, nullable=False)
+    so_luong_con = db.Column(db.Integer, nullable=False)
+    don_gia      = db.Column(db.Numeric(18, 4), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_lgv_kho_sp_ngay', 'id_kho', 'id_san_pham', 'ngay', 'id'),
+    )
+
+
+# =========================
+# Công việc chạy nền (jobs.py): báo cáo / xuất file lớn
+# =========================
+class CongViec(db.Model):
+    __tablename__ = 'cong_viec'
+    id          = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    loai        = db.Column(db.String(50), nullable=False)    # vd. "xuat:doanh-thu.xlsx"
+    tham_so_hash = db.Column(db.String(64), nullable=False)   # băm tham số hiệu lực (dùng chung kết quả)
+    tham_so     = db.Column(db.Text)                          # JSON tham số, để hiển thị
+    pham_vi     = db.Column(db.String(100), nullable=False)   # "admin" | "staff:<kho>:<nv>"
+    trang_thai  = db.Column(db.String(20), nullable=False, default="cho")  # cho | dang_chay | xong | loi
+    tien_do     = db.Column(db.Integer, nullable=False, default=0)         # số dòng đã ghi
+    thong_bao   = db.Column(db.String(500))
+    ten_file    = db.Column(db.String(255))
+    duong_dan   = db.Column(db.String(500))
+    nguoi_tao   = db.Column(db.String(100))
+    tao_luc     = db.Column(db.DateTime, nullable=False)
+    cap_nhat    = db.Column(db.DateTime, nullable=False)      # nhịp sống: đổi mỗi lần báo tiến độ
+    ket_thuc    = db.Column(db.DateTime)
+    het_han     = db.Column(db.DateTime)
+
+    __table_args__ = (
+        db.Index('ix_cv_hash', 'tham_so_hash', 'tao_luc'),
+    )
@@ -0,0 +1,140 @@
+"""Băm / kiểm tra mật khẩu trong pool tiến trình, nâng cấp hash khi đăng nhập.
+
+* check_password_hash / generate_password_hash (scrypt, PBKDF2) tốn CPU và giữ
+  GIL; chạy trong luồng request thì cả ca đăng nhập cùng lúc làm các trang khác
+  đứng. Ở đây chúng chạy trong ProcessPoolExecutor (PASSWORD_HASH_WORKERS tiến
+  trình, tạo khi cần); tối đa PASSWORD_HASH_QUEUE việc chờ cùng lúc, quá thì
+  request đợi tối đa PASSWORD_HASH_TIMEOUT giây rồi báo bận (HashBusy).
+  PASSWORD_HASH_WORKERS = 0: băm ngay trong luồng request (dev / CLI).
+  Tiến trình con khởi động kiểu spawn và import lại script chính dưới tên
+  __mp_main__: script tự viết gọi app phải có `if __name__ == "__main__":`.
+* Thuật toán / tham số lấy từ PASSWORD_HASH_METHOD; hash cũ khác tham số được
+  băm lại sau lần đăng nhập đúng kế tiếp (needs_rehash).
+* Sai mật khẩu LOGIN_FAIL_LIMIT lần trong LOGIN_FAIL_WINDOW giây thì cặp (tên
+  đăng nhập, địa chỉ máy khách) bị chặn tới hết cửa sổ mà không băm thêm (bộ đếm
+  trong bộ nhớ tiến trình). Khóa theo cả địa chỉ để người khác không thể cố ý gõ
+  sai mà khóa tài khoản của một nhân viên; đoán mật khẩu từ nhiều địa chỉ thì mỗi
+  địa chỉ vẫn chỉ được LOGIN_FAIL_LIMIT lần. Sau reverse proxy phải bọc app bằng
+  werkzeug ProxyFix, nếu không mọi request cùng địa chỉ proxy và khóa lại thành
+  theo tên đăng nhập.
+"""
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash
+
+_lock = threading.Lock()
+FAIL_CACHE_MAX = 10000  # số khóa (tên, địa chỉ) giữ trong bộ đếm sai
+
+
+class HashBusy(Exception):
+    """Pool băm mật khẩu đang đầy / quá thời gian chờ."""
+
+
+def _state():
+    ext = current_app.extensions
+    if "password_pool" not in ext:
+        with _lock:
+            cfg = current_app.config
+            if "password_fails" not in ext:
+                ext["password_slots"] = threading.BoundedSemaphore(cfg.get("PASSWORD_HASH_QUEUE", 32))
+                ext["password_fails"] = {}
+                ext["password_fails_lock"] = threading.Lock()
+            if "password_pool" not in ext:
+                workers = cfg.get("PASSWORD_HASH_WORKERS", 2)
+                # spawn: tiến trình con không thừa hưởng luồng / kết nối DB của worker web
+                ext["password_pool"] = ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("spawn")) if workers else None
+    return ext
+
+
+def _call(fn, *args):
+    ext = _state()
+    pool = ext["password_pool"]
+    if pool is None:
+        return fn(*args)
+    timeout = current_app.config.get("PASSWORD_HASH_TIMEOUT", 10)
+    if not ext["password_slots"].acquire(timeout=timeout):
+        raise HashBusy()
+    try:
+        return pool.submit(fn, *args).result(timeout=timeout)
+    except FutureTimeout:
+        raise HashBusy()
+    except BrokenProcessPool:
+        # tiến trình con chết (OOM...): bỏ pool hỏng, lần sau tạo lại; lần này băm tại chỗ
+        with _lock:
+            if ext.get("password_pool") is pool:
+                ext.pop("password_pool")
+        current_app.logger.warning("Pool băm mật khẩu hỏng, tạo lại ở lần gọi sau")
+        return fn(*args)
+    finally:
+        ext["password_slots"].release()
+
+
+def _method():
+    cfg = current_app.config
+    return cfg.get("PASSWORD_HASH_METHOD", "scrypt"), cfg.get("PASSWORD_SALT_LENGTH", 16)
+
+
+def hash_password(password):
+    return _call(generate_password_hash, password, *_method())
+
+
+def verify(pwhash, password):
+    return _call(check_password_hash, pwhash, password)
+
+
+def needs_rehash(pwhash):
+    """Hash được tạo bằng thuật toán / tham số khác PASSWORD_HASH_METHOD?"""
+    ext = _state()
+    method, salt_length = _method()
+    if ext.get("password_method_key") != method:
+        # werkzeug điền tham số mặc định vào hash ("scrypt" -> "scrypt:32768:8:1"): lấy dạng đầy đủ một lần
+        ext["password_method_full"] = _call(generate_password_hash, "", method, 1).partition("$")[0]
+        ext["password_method_key"] = method
+    stored, _, rest = (pwhash or "").partition("$")
+    return stored != ext["password_method_full"] or len(rest.partition("$")[0]) != salt_length
+
+
+# -----------------------------------------------------------------------------
+# Bộ đếm đăng nhập sai theo khóa (tên đăng nhập, địa chỉ) - xem fail_key
+# -----------------------------------------------------------------------------
+def fail_key(username, remote_addr):
+    """Khóa của bộ đếm sai: tên đăng nhập (không phân biệt hoa thường) + địa chỉ máy khách."""
+    return f"{username.lower()}|{remote_addr or ''}"
+
+
+def blocked_for(key):
+    """Số giây còn bị chặn (0 = được thử)."""
+    ext = _state()
+    window = current_app.config.get("LOGIN_FAIL_WINDOW", 300)
+    with ext["password_fails_lock"]:
+        entry = ext["password_fails"].get(key)
+        if entry is None:
+            return 0
+        n, first = entry
+        left = first + window - time.monotonic()
+        if left <= 0:
+            del ext["password_fails"][key]
+            return 0
+    return int(left) + 1 if n >= current_app.config.get("LOGIN_FAIL_LIMIT", 5) else 0
+
+
+def record_failure(key):
+    ext = _state()
+    fails = ext["password_fails"]
+    with ext["password_fails_lock"]:
+        n, first = fails.pop(key, (0, time.monotonic()))
+        fails[key] = (n + 1, first)
+        while len(fails) > FAIL_CACHE_MAX:
+            del fails[next(iter(fails))]  # dict giữ thứ tự chèn: bỏ khóa cũ nhất
+
+
+def record_success(key):
+    ext = _state()
+    with ext["password_fails_lock"]:
+        ext["password_fails"].pop(key, None)
@@ -0,0 +1,151 @@
+"""Cache trong tiến trình cho dữ liệu danh mục dùng ở mọi form.
+
+NV, NCC, xe, KH, địa điểm, kho hầu như không đổi nhưng trước đây mỗi GET đều
+`.query.all()` và dựng lại object ORM. Ở đây mỗi bảng được giữ dưới dạng
+tuple gọn (namedtuple: template vẫn dùng `nv.id_nhan_vien`...) với:
+  * phiên bản theo bảng trong `phien_ban_du_lieu`, tăng bởi các route CRUD
+    (bump_version) -> worker khác thấy thay đổi ở request kế tiếp;
+  * TTL + giới hạn số khóa (LRU) + bỏ qua bảng quá lớn.
+Phiên bản của mọi bảng được đọc bằng MỘT truy vấn, tối đa một lần mỗi
+REF_CACHE_VERSION_TTL giây cho cả tiến trình (worker khác đổi dữ liệu -> thấy
+chậm nhất sau chừng đó; đổi trong tiến trình này -> thấy ngay).
+"""
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import current_app, g, has_app_context, has_request_context
+from sqlalchemy import event, select, update, insert
+from sqlalchemy.exc import IntegrityError
+
+from db_routing import RoutingSession
+from models import db, PhienBanDuLieu, NhanVien, NhaCungCap, XeVanChuyen, KhachHang, DiaDiem, Kho
+
+phien_ban = PhienBanDuLieu.__table__
+_BUMPED = "ref_versions_bumped"
+
+# tên bảng -> (model, các cột giữ trong cache)
+REF_TABLES = {
+    "nhan_vien": (NhanVien, ("id_nhan_vien", "ho", "ten_dem", "ten")),
+    "nha_cung_cap": (NhaCungCap, ("id_nha_cung_cap", "ten_nha_cung_cap",
+                                  "so_dien_thoai_nha_cung_cap", "id_dia_chi")),
+    "xe_van_chuyen": (XeVanChuyen, ("id_xe_van_chuyen", "bien_so", "ho", "ten_dem", "ten",
+                                    "so_dien_thoai_tai_xe")),
+    "khach_hang": (KhachHang, ("id_khach_hang", "ho", "ten_dem", "ten", "so_dien_thoai",
+                               "id_dia_chi")),
+    "dia_diem": (DiaDiem, ("id_dia_diem", "ten_dia_diem")),
+    "kho": (Kho, ("id_kho", "ten_kho", "id_dia_diem")),
+}
+
+_ROW_TYPES = {name: namedtuple(f"{model.__name__}Row", cols)
+              for name, (model, cols) in REF_TABLES.items()}
+
+
+class RefCache:
+    """LRU + TTL; mỗi mục gắn với phiên bản bảng lúc nạp."""
+
+    def __init__(self, ttl=300, max_entries=32, max_rows=20000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._data = OrderedDict()  # key -> (version, expires_at, rows)
+
+    def get(self, key, version):
+        with self._lock:
+            hit = self._data.get(key)
+            if not hit:
+                return None
+            ver, expires_at, rows = hit
+            if ver != version or expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return rows
+
+    def put(self, key, version, rows):
+        if len(rows) > self.max_rows:
+            return
+        with self._lock:
+            self._data[key] = (version, time.monotonic() + self.ttl, rows)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+def _cache():
+    ext = current_app.extensions
+    if "ref_cache" not in ext:
+        cfg = current_app.config
+        ext["ref_cache"] = RefCache(
+            ttl=cfg.get("REF_CACHE_TTL", 300),
+            max_entries=cfg.get("REF_CACHE_MAX_ENTRIES", 32),
+            max_rows=cfg.get("REF_CACHE_MAX_ROWS", 20000),
+        )
+    return ext["ref_cache"]
+
+
+def _versions():
+    """Phiên bản mọi bảng danh mục: MỘT truy vấn, tối đa một lần mỗi REF_CACHE_VERSION_TTL
+    giây cho cả tiến trình (ghi trong tiến trình này xóa ngay), cố định trong một request."""
+    if has_request_context() and "_ref_versions" in g:
+        return g._ref_versions
+    ext = current_app.extensions
+    now = time.monotonic()
+    hit = ext.get("ref_versions")
+    if hit is not None and now - hit[0] < current_app.config.get("REF_CACHE_VERSION_TTL", 2):
+        vers = hit[1]
+    else:
+        vers = dict(db.session.execute(select(phien_ban.c.ten_bang, phien_ban.c.phien_ban)).all())
+        ext["ref_versions"] = (now, vers)
+    if has_request_context():
+        g._ref_versions = vers
+    return vers
+
+
+def ref_rows(name):
+    """Danh sách namedtuple của bảng danh mục `name`, sắp theo khóa chính."""
+    model, cols = REF_TABLES[name]
+    version = _versions().get(name, 0)
+    cache = _cache()
+    rows = cache.get(name, version)
+    if rows is None:
+        pk = getattr(model, cols[0])
+        row_type = _ROW_TYPES[name]
+        stmt = select(*(getattr(model, c) for c in cols)).order_by(pk)
+        rows = tuple(row_type(*r) for r in db.session.execute(stmt))
+        cache.put(name, version, rows)
+    return rows
+
+
+def bump_version(*names, session=None):
+    """Tăng phiên bản bảng trong giao dịch hiện tại (commit cùng thay đổi dữ liệu)."""
+    session = session or db.session
+    for name in names:
+        key = phien_ban.c.ten_bang == name
+        res = session.execute(
+            update(phien_ban).where(key).values(phien_ban=phien_ban.c.phien_ban + 1)
+        )
+        if res.rowcount == 0:
+            try:
+                with session.begin_nested():
+                    session.execute(insert(phien_ban).values(ten_bang=name, phien_ban=1))
+            except IntegrityError:
+                session.execute(
+                    update(phien_ban).where(key).values(phien_ban=phien_ban.c.phien_ban + 1)
+                )
+    session.info[_BUMPED] = True
+    current_app.extensions.pop("ref_versions", None)
+    if has_request_context():
+        g.pop("_ref_versions", None)
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _forget_versions(session):
+    # request khác có thể đã đọc lại phiên bản cũ trong lúc giao dịch chưa commit
+    if session.info.pop(_BUMPED, False) and has_app_context():
+        current_app.extensions.pop("ref_versions", None)
@@ -0,0 +1,192 @@
+"""Bảng tổng hợp bán hàng theo ngày: doanh_thu_ngay(ngay, id_kho, id_san_pham).
+
+Mỗi dòng giữ số lượng xuất, doanh thu, giá vốn và số lượng / giá trị nhập
+của một SP tại một kho trong một ngày. Bảng được cộng dồn NGAY TRONG giao
+dịch ghi hóa đơn (record_xuat / record_nhap: một SELECT gộp theo ngày trên
+các dòng vừa ghi + một UPSERT nhiều dòng), nên trang doanh thu chỉ phải đọc
+vài nghìn dòng tổng hợp thay vì quét hoa_don_xuat.
+
+Giá vốn = số lượng × don_gia_von ghi trên dòng xuất (costing.py); dòng cũ
+chưa có thì lấy giá nhập gần nhất (ngay_nhap <= ngay_xuat) của cùng kho/SP.
+rebuild() tính lại từ đầu cho một khoảng ngày.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from sqlalchemy import select, delete, insert, func, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.orm import aliased
+
+from models import db, HoaDonNhap, HoaDonXuat, DoanhThuNgay
+
+dtn = DoanhThuNgay.__table__
+
+SUM_COLS = ("sl_xuat", "doanh_thu", "gia_von", "sl_nhap", "gia_tri_nhap")
+MONEY_COLS = ("doanh_thu", "gia_von", "gia_tri_nhap")
+CENT = Decimal("0.01")        # thang của các cột tiền NUMERIC(18, 2)
+
+
+def _money(v):
+    """Tổng tiền từ SELECT (Decimal; SQLite có thể trả float) -> Decimal, không qua float."""
+    if v is None:
+        return Decimal(0)
+    return v if isinstance(v, Decimal) else Decimal(str(v))
+
+
+def _day(v):
+    """func.date() trả về date (MySQL) hoặc chuỗi 'YYYY-MM-DD' (SQLite)."""
+    if isinstance(v, datetime):
+        return v.date()
+    if isinstance(v, str):
+        return date.fromisoformat(v[:10])
+    return v
+
+
+def _unit_cost():
+    """Giá nhập gần nhất (trước hoặc bằng ngày xuất) của cùng kho / SP."""
+    hn = aliased(HoaDonNhap)
+    return (
+        select(hn.gia_nhap)
+        .where(
+            hn.id_kho == HoaDonXuat.id_kho,
+            hn.id_san_pham == HoaDonXuat.id_san_pham,
+            hn.ngay_nhap <= HoaDonXuat.ngay_xuat,
+        )
+        .order_by(hn.ngay_nhap.desc())
+        .limit(1)
+        .correlate(HoaDonXuat)
+        .scalar_subquery()
+    )
+
+
+def _sales_stmt(*where):
+    d = func.date(HoaDonXuat.ngay_xuat)
+    return (
+        select(
+            d, HoaDonXuat.id_kho, HoaDonXuat.id_san_pham,
+            func.sum(HoaDonXuat.so_san_pham_xuat),
+            func.sum(HoaDonXuat.so_san_pham_xuat * HoaDonXuat.gia_ban),
+            func.sum(HoaDonXuat.so_san_pham_xuat * func.coalesce(HoaDonXuat.don_gia_von, _unit_cost(), 0)),
+        )
+        .where(*where)
+        .group_by(d, HoaDonXuat.id_kho, HoaDonXuat.id_san_pham)
+    )
+
+
+def _imports_stmt(*where):
+    d = func.date(HoaDonNhap.ngay_nhap)
+    return (
+        select(
+            d, HoaDonNhap.id_kho, HoaDonNhap.id_san_pham,
+            func.sum(HoaDonNhap.so_san_pham_nhap),
+            func.sum(HoaDonNhap.so_san_pham_nhap * HoaDonNhap.gia_nhap),
+        )
+        .where(*where)
+        .group_by(d, HoaDonNhap.id_kho, HoaDonNhap.id_san_pham)
+    )
+
+
+def _collect(agg, sales=(), imports=()):
+    """Gộp kết quả SELECT vào dict (ngay, kho, sp) -> dòng doanh_thu_ngay."""
+    for d, kho, sp, qty, rev, cost in sales:
+        r = agg.setdefault((_day(d), kho, sp), dict.fromkeys(SUM_COLS, 0))
+        r["sl_xuat"] += int(qty or 0)
+        r["doanh_thu"] += _money(rev)
+        r["gia_von"] += _money(cost)
+    for d, kho, sp, qty, val in imports:
+        r = agg.setdefault((_day(d), kho, sp), dict.fromkeys(SUM_COLS, 0))
+        r["sl_nhap"] += int(qty or 0)
+        r["gia_tri_nhap"] += _money(val)
+    return agg
+
+
+def _rows(agg):
+    """Dòng doanh_thu_ngay; cột tiền làm tròn về 2 chữ số trước khi ghi (cộng dồn đúng từng xu)."""
+    return [
+        dict(ngay=d, id_kho=kho, id_san_pham=sp,
+             **{c: Decimal(x).quantize(CENT, rounding=ROUND_HALF_UP) if c in MONEY_COLS else x for c, x in v.items()})
+        for (d, kho, sp), v in agg.items()
+    ]
+
+
+def _upsert_add(agg):
+    """Một INSERT nhiều dòng; trùng khóa thì cộng dồn các cột số."""
+    if not agg:
+        return
+    rows = _rows(agg)
+    d = db.session.get_bind(mapper=DoanhThuNgay).dialect
+    if d.name == "mysql":
+        stmt = mysql.insert(dtn).values(rows)
+        stmt = stmt.on_duplicate_key_update(**{c: dtn.c[c] + stmt.inserted[c] for c in SUM_COLS})
+    elif d.name in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if d.name == "sqlite" else postgresql.insert)(dtn).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[dtn.c.ngay, dtn.c.id_kho, dtn.c.id_san_pham],
+            set_={c: dtn.c[c] + stmt.excluded[c] for c in SUM_COLS},
+        )
+    else:
+        for r in rows:
+            key = (dtn.c.ngay == r["ngay"]) & (dtn.c.id_kho == r["id_kho"]) & (dtn.c.id_san_pham == r["id_san_pham"])
+            res = db.session.execute(dtn.update().where(key).values(**{c: dtn.c[c] + r[c] for c in SUM_COLS}))
+            if res.rowcount == 0:
+                db.session.execute(insert(dtn).values(**r))
+        return
+    db.session.execute(stmt)
+
+
+def _pk_in(model, id_col, keys):
+    return tuple_(getattr(model, id_col), model.id_san_pham, model.id_kho).in_(list(keys))
+
+
+def record_xuat(keys):
+    """Cộng các dòng hoa_don_xuat vừa ghi (keys: (id_hd, id_sp, id_kho)) vào bảng tổng hợp."""
+    keys = list(keys)
+    if keys:
+        sales = db.session.execute(_sales_stmt(_pk_in(HoaDonXuat, "id_hoa_don_xuat", keys)))
+        _upsert_add(_collect({}, sales=sales))
+
+
+def record_nhap(keys):
+    """Như record_xuat cho hoa_don_nhap."""
+    keys = list(keys)
+    if keys:
+        imports = db.session.execute(_imports_stmt(_pk_in(HoaDonNhap, "id_hoa_don_nhap", keys)))
+        _upsert_add(_collect({}, imports=imports))
+
+
+def rebuild(date_from=None, date_to=None, step_days=31, progress=None):
+    """Xóa và tính lại doanh_thu_ngay theo từng khoảng step_days ngày; trả về số dòng ghi."""
+    if date_from is None or date_to is None:
+        bounds = [
+            *db.session.execute(select(func.min(HoaDonXuat.ngay_xuat), func.max(HoaDonXuat.ngay_xuat))).first(),
+            *db.session.execute(select(func.min(HoaDonNhap.ngay_nhap), func.max(HoaDonNhap.ngay_nhap))).first(),
+        ]
+        lo = [_day(v) for v in bounds[0::2] if v]
+        hi = [_day(v) for v in bounds[1::2] if v]
+        if not lo:
+            return 0
+        date_from = date_from or min(lo)
+        date_to = date_to or max(hi)
+
+    total = 0
+    start = date_from
+    while start <= date_to:
+        end = min(start + timedelta(days=step_days - 1), date_to)
+        t0 = datetime.combine(start, datetime.min.time())
+        t1 = datetime.combine(end + timedelta(days=1), datetime.min.time())
+
+        agg = _collect(
+            {},
+            sales=db.session.execute(_sales_stmt(HoaDonXuat.ngay_xuat >= t0, HoaDonXuat.ngay_xuat < t1)),
+            imports=db.session.execute(_imports_stmt(HoaDonNhap.ngay_nhap >= t0, HoaDonNhap.ngay_nhap < t1)),
+        )
+        db.session.execute(delete(dtn).where(dtn.c.ngay >= start, dtn.c.ngay <= end))
+        if agg:
+            db.session.execute(insert(dtn), _rows(agg))
+        db.session.commit()
+
+        total += len(agg)
+        if progress:
+            progress(start, end, len(agg))
+        start = end + timedelta(days=1)
+    return total
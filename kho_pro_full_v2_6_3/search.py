@@ -0,0 +1,171 @@
+"""Tìm kiếm toàn văn cho sản phẩm, khách hàng, nhà cung cấp.
+
+Mỗi bảng có cột `tim_kiem` chứa mã + tên + SĐT... đã bỏ dấu và viết thường
+(fold), nên gõ "ban go" vẫn ra "Bàn gỗ". Cột được cập nhật tự động khi
+thêm/sửa qua ORM (before_insert / before_update) và được đánh chỉ mục:
+  * MySQL : FULLTEXT ... WITH PARSER ngram (khớp cả âm tiết ngắn như "go");
+  * SQLite: bảng ảo FTS5 (external content) + trigger đồng bộ;
+  * DB khác: LIKE trên cột đã fold (không có chỉ mục).
+Kết quả được xếp theo độ liên quan và phân trang.
+"""
+import re
+import unicodedata
+
+from sqlalchemy import event, inspect, select, update, bindparam, text, literal_column, Float, Integer, and_
+from sqlalchemy.dialects.mysql import match as mysql_match
+
+from models import db, SanPham, KhachHang, NhaCungCap
+
+# tên bảng -> (model, các cột ghép vào tim_kiem)
+SEARCH_FIELDS = {
+    "san_pham": (SanPham, ("id_san_pham", "ten_san_pham", "chat_lieu", "mau")),
+    "khach_hang": (KhachHang, ("id_khach_hang", "ho", "ten_dem", "ten", "so_dien_thoai")),
+    "nha_cung_cap": (NhaCungCap, ("id_nha_cung_cap", "ten_nha_cung_cap", "so_dien_thoai_nha_cung_cap")),
+}
+
+_WORD = re.compile(r"\w+")
+
+
+def fold(s):
+    """Bỏ dấu tiếng Việt + viết thường: 'Bàn Gỗ Đỏ' -> 'ban go do'."""
+    if not s:
+        return ""
+    s = s.replace("đ", "d").replace("Đ", "D")
+    s = unicodedata.normalize("NFD", s)
+    s = "".join(ch for ch in s if unicodedata.category(ch) != "Mn")
+    return " ".join(s.lower().split())
+
+
+def tokens(q):
+    return _WORD.findall(fold(q))
+
+
+def search_text(obj, fields):
+    return fold(" ".join(str(v) for v in (getattr(obj, f) for f in fields) if v))
+
+
+def _register_listeners():
+    for model, fields in SEARCH_FIELDS.values():
+        def _sync(mapper, connection, target, fields=fields):
+            target.tim_kiem = search_text(target, fields)
+        event.listen(model, "before_insert", _sync)
+        event.listen(model, "before_update", _sync)
+
+
+_register_listeners()
+
+
+# -----------------------------------------------------------------------------
+# Schema: cột + chỉ mục
+# -----------------------------------------------------------------------------
+def _sqlite_fts_ddl(t):
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {t}_fts USING fts5("
+        f"tim_kiem, content='{t}', content_rowid='rowid', tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {t}_fts_ai AFTER INSERT ON {t} BEGIN "
+        f"INSERT INTO {t}_fts(rowid, tim_kiem) VALUES (new.rowid, new.tim_kiem); END",
+        f"CREATE TRIGGER IF NOT EXISTS {t}_fts_ad AFTER DELETE ON {t} BEGIN "
+        f"INSERT INTO {t}_fts({t}_fts, rowid, tim_kiem) VALUES ('delete', old.rowid, old.tim_kiem); END",
+        f"CREATE TRIGGER IF NOT EXISTS {t}_fts_au AFTER UPDATE OF tim_kiem ON {t} BEGIN "
+        f"INSERT INTO {t}_fts({t}_fts, rowid, tim_kiem) VALUES ('delete', old.rowid, old.tim_kiem); "
+        f"INSERT INTO {t}_fts(rowid, tim_kiem) VALUES (new.rowid, new.tim_kiem); END",
+    ]
+
+
+def ensure_search_schema(engine):
+    """Thêm cột tim_kiem + chỉ mục toàn văn cho DB tạo từ schema cũ; trả về các bảng đã sẵn sàng."""
+    insp = inspect(engine)
+    dialect = engine.dialect.name
+    ready = []
+    for t in SEARCH_FIELDS:
+        if not insp.has_table(t):
+            continue
+        cols = {c["name"] for c in insp.get_columns(t)}
+        with engine.begin() as conn:
+            if "tim_kiem" not in cols:
+                conn.execute(text(f"ALTER TABLE {t} ADD COLUMN tim_kiem TEXT"))
+            if dialect == "mysql":
+                if f"ft_{t}" not in {i["name"] for i in insp.get_indexes(t)}:
+                    conn.execute(text(f"ALTER TABLE {t} ADD FULLTEXT INDEX ft_{t} (tim_kiem) WITH PARSER ngram"))
+            elif dialect == "sqlite":
+                fresh = not insp.has_table(f"{t}_fts")
+                for ddl in _sqlite_fts_ddl(t):
+                    conn.execute(text(ddl))
+                if fresh:
+                    conn.execute(text(f"INSERT INTO {t}_fts({t}_fts) VALUES ('rebuild')"))
+        ready.append(t)
+    return ready
+
+
+def reindex(name, batch=1000, only_missing=False):
+    """Tính lại tim_kiem theo lô (keyset theo khóa chính); trả về số dòng.
+
+    only_missing=True: chỉ các dòng chưa có tim_kiem (dữ liệu nạp bằng SQL / schema cũ).
+    """
+    model, fields = SEARCH_FIELDS[name]
+    table = model.__table__
+    pk = getattr(model, fields[0])
+    cols = [getattr(model, f) for f in fields]
+    stmt_upd = (
+        update(table)
+        .where(table.c[fields[0]] == bindparam("b_pk"))
+        .values(tim_kiem=bindparam("b_tk"))
+    )
+    last, total = None, 0
+    while True:
+        q = select(*cols).order_by(pk).limit(batch)
+        if last is not None:
+            q = q.where(pk > last)
+        if only_missing:
+            q = q.where(model.tim_kiem.is_(None))
+        rows = db.session.execute(q).all()
+        if not rows:
+            break
+        params = [{"b_pk": r[0], "b_tk": fold(" ".join(str(v) for v in r if v))} for r in rows]
+        db.session.execute(stmt_upd, params)
+        db.session.commit()
+        total += len(rows)
+        last = rows[-1][0]
+    return total
+
+
+# -----------------------------------------------------------------------------
+# Truy vấn
+# -----------------------------------------------------------------------------
+def apply_search(query, name, q):
+    """Lọc ORM query theo q và sắp theo độ liên quan; q rỗng -> trả lại query như cũ.
+
+    Trả về (query, ranked): ranked=False nghĩa là caller tự sắp theo mã.
+    """
+    toks = tokens(q)
+    if not toks:
+        return query, False
+    model, _ = SEARCH_FIELDS[name]
+    dialect = db.session.get_bind(mapper=model).dialect.name
+
+    if dialect == "mysql":
+        against = " ".join(f'+"{t}"' for t in toks)
+        score = mysql_match(model.tim_kiem, against=against).in_boolean_mode()
+        return query.filter(score > 0).order_by(score.desc()), True
+
+    if dialect == "sqlite":
+        t = model.__tablename__
+        match = " ".join(f'"{tok}"*' for tok in toks)
+        hits = (
+            text(f"SELECT rowid AS rid, bm25({t}_fts) AS rank FROM {t}_fts WHERE {t}_fts MATCH :ft_q")
+            .bindparams(ft_q=match)
+            .columns(rid=Integer, rank=Float)
+            .subquery()
+        )
+        query = query.join(hits, literal_column(f"{t}.rowid") == hits.c.rid).order_by(hits.c.rank)
+        return query, True
+
+    col = model.tim_kiem
+    return query.filter(and_(*[col.like(f"%{tok}%") for tok in toks])), False
+
+
+def paginate(query, page, per_page):
+    """Lấy trang `page` (từ 1) theo limit+1; trả về (items, has_next)."""
+    page = max(1, page or 1)
+    rows = query.offset((page - 1) * per_page).limit(per_page + 1).all()
+    return rows[:per_page], len(rows) > per_page
@@ -0,0 +1,146 @@
+"""Cấp mã chứng từ / danh mục theo tiền tố (N0000001, X0000001, DC0000001, SP0000001...).
+
+Mỗi tiền tố có một dòng đếm trong bảng `ma_so`. Mỗi tiến trình giữ sẵn một
+khối SEQ_BLOCK_SIZE mã: chỉ khi dùng hết khối mới có một round trip
+(UPDATE gia_tri = gia_tri + N trong giao dịch riêng, khóa rất ngắn).
+Mã cấp ra là duy nhất giữa các worker, không cần ORDER BY id DESC trên bảng
+nghiệp vụ; giữa các worker có thể không liên tục (mỗi worker một khối).
+
+Mã không do bộ đếm cấp (nhập tay trên form, nhập hàng loạt từ file) phải được
+báo qua claim() trong cùng giao dịch ghi: bộ đếm được đẩy lên ít nhất bằng số
+lớn nhất đó, nếu không thì sau này next_code() sẽ cấp lại đúng mã ấy (hóa đơn
+có khóa (mã, SP, kho) nên dòng mới bị gộp lặng lẽ vào hóa đơn cũ). Còn hở: mã
+nhập tay rơi vào khối mà một worker KHÁC đã giữ nhưng chưa cấp hết.
+
+Phần số luôn đủ CODE_WIDTH chữ số nên thứ tự chuỗi = thứ tự số (ORDER BY mã,
+keyset theo mã); với 3 chữ số như trước thì "N1000" < "N999". Mã ngắn hơn có
+sẵn trong DB cũ (N001...) vẫn được claim() / _scan_max đọc đúng số, nhưng đứng
+sau mã mới khi sắp theo chuỗi.
+"""
+import threading
+
+from flask import current_app
+from sqlalchemy import select, update, insert, func, cast, Integer
+from sqlalchemy.exc import IntegrityError
+
+from models import (
+    db,
+    MaSo,
+    HoaDonNhap,
+    HoaDonXuat,
+    DieuChuyen,
+    SanPham,
+    KhachHang,
+    NhaCungCap,
+    XeVanChuyen,
+)
+
+ma_so = MaSo.__table__
+CODE_WIDTH = 7  # số chữ số của phần số (tới 9 999 999 mã mỗi tiền tố)
+
+# tiền tố -> cột khóa của bảng dùng mã đó (chỉ quét một lần khi khởi tạo bộ đếm)
+SEQUENCES = {
+    "N": HoaDonNhap.id_hoa_don_nhap,
+    "X": HoaDonXuat.id_hoa_don_xuat,
+    "DC": DieuChuyen.id_dieu_chuyen,
+    "SP": SanPham.id_san_pham,
+    "KH": KhachHang.id_khach_hang,
+    "NCC": NhaCungCap.id_nha_cung_cap,
+    "VC": XeVanChuyen.id_xe_van_chuyen,
+}
+
+
+def format_code(prefix, n):
+    return f"{prefix}{n:0{CODE_WIDTH}d}"
+
+
+def _scan_max(conn, prefix):
+    """Số lớn nhất đang dùng với tiền tố này (khởi tạo bộ đếm từ dữ liệu cũ)."""
+    col = SEQUENCES[prefix]
+    num = cast(func.substr(col, len(prefix) + 1), Integer)
+    return int(conn.execute(select(func.max(num)).where(col.like(f"{prefix}%"))).scalar() or 0)
+
+
+def _reserve(prefix, n):
+    """Giữ n số tiếp theo; trả về số cuối của khối. Chạy trong giao dịch riêng."""
+    key = ma_so.c.tien_to == prefix
+    with db.engine.begin() as conn:
+        res = conn.execute(update(ma_so).where(key).values(gia_tri=ma_so.c.gia_tri + n))
+        if res.rowcount == 0:
+            start = _scan_max(conn, prefix)
+            try:
+                with conn.begin_nested():
+                    conn.execute(insert(ma_so).values(tien_to=prefix, gia_tri=start + n))
+            except IntegrityError:
+                # worker khác vừa tạo dòng đếm
+                conn.execute(update(ma_so).where(key).values(gia_tri=ma_so.c.gia_tri + n))
+        return int(conn.execute(select(ma_so.c.gia_tri).where(key)).scalar())
+
+
+class SequenceAllocator:
+    """Bộ cấp mã trong tiến trình, giữ khối số đã đặt trước cho từng tiền tố."""
+
+    def __init__(self, block_size=20):
+        self.block_size = max(1, int(block_size))
+        self._lock = threading.Lock()
+        self._blocks = {}  # prefix -> [số kế tiếp, số cuối của khối]
+
+    def next_number(self, prefix):
+        if prefix not in SEQUENCES:
+            raise KeyError(f"Tiền tố mã không hỗ trợ: {prefix}")
+        with self._lock:
+            block = self._blocks.get(prefix)
+            if not block or block[0] > block[1]:
+                end = _reserve(prefix, self.block_size)
+                block = self._blocks[prefix] = [end - self.block_size + 1, end]
+            n = block[0]
+            block[0] += 1
+        return n
+
+    def next_code(self, prefix):
+        return format_code(prefix, self.next_number(prefix))
+
+    def discard(self, prefix, numbers):
+        """Bỏ khối đang giữ nếu có số trong `numbers` chưa cấp (số đó đã bị dùng bên ngoài)."""
+        with self._lock:
+            block = self._blocks.get(prefix)
+            if block and any(block[0] <= n <= block[1] for n in numbers):
+                del self._blocks[prefix]
+
+
+def _allocator():
+    ext = current_app.extensions
+    if "sequences" not in ext:
+        ext["sequences"] = SequenceAllocator(current_app.config.get("SEQ_BLOCK_SIZE", 20))
+    return ext["sequences"]
+
+
+def next_code(prefix):
+    """Mã mới, duy nhất cho tiền tố `prefix` (vd. next_code("N") -> "N0001024")."""
+    return _allocator().next_code(prefix)
+
+
+def _number(prefix, code):
+    """Phần số của mã đúng dạng <tiền tố><chữ số> (vd. "N0900" -> 900); mã khác dạng -> None."""
+    code = (code or "").strip()
+    tail = code[len(prefix):] if code.startswith(prefix) else ""
+    return int(tail) if tail.isdigit() else None
+
+
+def claim(prefix, codes):
+    """Báo các mã được ghi thẳng (không qua next_code); gọi trong giao dịch ghi của người gọi.
+
+    Đẩy bộ đếm lên GREATEST(gia_tri, số lớn nhất) bằng một UPDATE có điều kiện (chỉ
+    khóa dòng ma_so khi thật sự phải tăng) và bỏ khối tiến trình này đang giữ nếu
+    khối đó chứa một trong các số.
+    """
+    numbers = {n for n in (_number(prefix, c) for c in codes) if n is not None}
+    if not numbers:
+        return
+    top = max(numbers)
+    key = ma_so.c.tien_to == prefix
+    cur = db.session.execute(select(ma_so.c.gia_tri).where(key)).scalar()
+    # chưa có dòng đếm: _scan_max sẽ thấy các mã này khi khởi tạo
+    if cur is not None and cur < top:
+        db.session.execute(update(ma_so).where(key, ma_so.c.gia_tri < top).values(gia_tri=top))
+    _allocator().discard(prefix, numbers)
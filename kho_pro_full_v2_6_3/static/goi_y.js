@@ -0,0 +1,50 @@
+// Gợi ý (typeahead) cho ô nhập mã SP / KH.
+// <input data-goi-y="/api/goi-y/..." list="dl..." [data-kho="K1" | data-kho-from="[name=id_kho]"]>
+// Gõ tới đâu gọi API tới đó (debounce), đổ kết quả vào <datalist> dùng chung.
+(function () {
+  const DELAY = 200;
+  const timers = new WeakMap();
+  const seq = new WeakMap();
+
+  function khoOf(input) {
+    if (input.dataset.khoFrom) {
+      const el = document.querySelector(input.dataset.khoFrom);
+      return el ? el.value : '';
+    }
+    return input.dataset.kho || '';
+  }
+
+  async function load(input) {
+    const url = new URL(input.dataset.goiY, window.location.origin);
+    url.searchParams.set('q', input.value.trim());
+    const kho = khoOf(input);
+    if (kho) url.searchParams.set('kho', kho);
+
+    const n = (seq.get(input) || 0) + 1;
+    seq.set(input, n);
+    const res = await fetch(url, { headers: { 'Accept': 'application/json' } });
+    if (!res.ok || seq.get(input) !== n) return;  // bỏ kết quả cũ về trễ
+    const data = await res.json();
+
+    const dl = document.getElementById(input.getAttribute('list'));
+    if (!dl) return;
+    dl.replaceChildren(...data.items.map(it => {
+      const o = document.createElement('option');
+      o.value = it.id;
+      o.label = it.text;
+      return o;
+    }));
+  }
+
+  function schedule(input) {
+    clearTimeout(timers.get(input));
+    timers.set(input, setTimeout(() => load(input), DELAY));
+  }
+
+  document.addEventListener('input', e => {
+    if (e.target.matches('input[data-goi-y]')) schedule(e.target);
+  });
+  document.addEventListener('focusin', e => {
+    if (e.target.matches('input[data-goi-y]')) schedule(e.target);
+  });
+})();
@@ -0,0 +1,50 @@
+// Cập nhật tồn kho trực tiếp qua SSE (/api/su-kien/ton-kho).
+// <script src="ton_kho_live.js" data-url="/api/su-kien/ton-kho?kho=K1"></script>
+//  * ô [data-ton-kho="K1"][data-ton-sp="SP001"] được ghi số tồn mới;
+//    ô [data-ton-tong] cùng dòng được cộng phần chênh lệch;
+//  * mọi sự kiện được phát lại thành CustomEvent 'ton-kho' (detail = dữ liệu)
+//    để từng trang tự xử lý thêm; 'ton-kho-reset' khi phải tải lại dữ liệu.
+// EventSource tự nối lại và gửi Last-Event-ID nên không mất sự kiện giữa chừng.
+(function () {
+  const me = document.currentScript;
+  if (!me || !window.EventSource) return;
+
+  function flash(el) {
+    el.classList.remove('ton-live');
+    void el.offsetWidth;  // chạy lại hiệu ứng
+    el.classList.add('ton-live');
+  }
+
+  function apply(d) {
+    const sel = `[data-ton-kho="${CSS.escape(d.kho)}"][data-ton-sp="${CSS.escape(d.sp)}"]`;
+    document.querySelectorAll(sel).forEach(cell => {
+      const old = parseInt(cell.textContent, 10) || 0;
+      cell.textContent = d.so_luong;
+      cell.classList.toggle('ton-am', d.so_luong < 0);
+      cell.classList.toggle('ton-het', d.so_luong === 0);
+      flash(cell);
+      const tong = cell.closest('tr') && cell.closest('tr').querySelector('[data-ton-tong]');
+      if (tong) {
+        tong.textContent = (parseInt(tong.textContent, 10) || 0) + (d.so_luong - old);
+        flash(tong);
+      }
+    });
+    document.dispatchEvent(new CustomEvent('ton-kho', { detail: d }));
+  }
+
+  function notice() {
+    if (document.getElementById('tonLiveNotice')) return;
+    const n = document.createElement('div');
+    n.id = 'tonLiveNotice';
+    n.className = 'flash warning ton-live-notice';
+    n.innerHTML = 'Tồn kho đã thay đổi nhiều. <a href="">Tải lại trang</a>';
+    document.body.appendChild(n);
+  }
+
+  const es = new EventSource(me.dataset.url);
+  es.addEventListener('ton', e => apply(JSON.parse(e.data)));
+  es.addEventListener('reset', () => {
+    document.dispatchEvent(new CustomEvent('ton-kho-reset'));
+    notice();
+  });
+})();
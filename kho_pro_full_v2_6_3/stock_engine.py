@@ -0,0 +1,292 @@
+"""Ghi tồn kho nguyên tử.
+
+Mỗi thay đổi tồn là MỘT câu lệnh UPDATE/UPSERT có điều kiện trên `ton_kho`
+(không đọc - cộng trong Python - ghi lại), nên nhiều nhân viên cùng xuất
+một mã hàng sẽ không ghi đè lẫn nhau và tồn không bao giờ bị âm.
+"""
+import random
+import time
+
+from flask import current_app
+from sqlalchemy import select, update, func, case, and_, tuple_
+from sqlalchemy.dialects import mysql, postgresql, sqlite
+from sqlalchemy.exc import OperationalError
+
+from models import db, TonKho
+import alerts
+import events
+import kpi
+
+ton_kho = TonKho.__table__
+
+# Mã lỗi MySQL: 1213 = deadlock, 1205 = lock wait timeout
+MYSQL_RETRY_CODES = (1205, 1213)
+# SQLSTATE Postgres: serialization failure / deadlock
+PG_RETRY_CODES = ("40001", "40P01")
+
+
+class InsufficientStock(ValueError):
+    """Kho không đủ hàng để trừ."""
+
+    def __init__(self, id_kho, id_san_pham, ton, yeu_cau):
+        self.id_kho = id_kho
+        self.id_san_pham = id_san_pham
+        self.ton = ton
+        self.yeu_cau = yeu_cau
+        super().__init__(
+            f"Số lượng {id_san_pham} tại kho {id_kho} không đủ! "
+            f"Hiện chỉ còn {ton}, yêu cầu {yeu_cau}."
+        )
+
+
+def _dialect():
+    return db.session.get_bind(mapper=TonKho).dialect
+
+
+def _key(id_kho, id_sp):
+    return (ton_kho.c.id_kho == id_kho) & (ton_kho.c.id_san_pham == id_sp)
+
+
+def get_balance(id_kho, id_sp) -> int:
+    v = db.session.execute(select(ton_kho.c.so_luong).where(_key(id_kho, id_sp))).scalar()
+    return int(v or 0)
+
+
+def _decrement(id_kho, id_sp, delta) -> int:
+    """UPDATE ... WHERE so_luong + delta >= 0; không có dòng nào khớp = không đủ hàng."""
+    d = _dialect()
+    new_val = ton_kho.c.so_luong + delta
+    stmt = update(ton_kho).where(_key(id_kho, id_sp), new_val >= 0)
+
+    if d.update_returning:
+        row = db.session.execute(stmt.values(so_luong=new_val).returning(ton_kho.c.so_luong)).first()
+        if row is None:
+            raise InsufficientStock(id_kho, id_sp, get_balance(id_kho, id_sp), -delta)
+        return int(row[0])
+
+    if d.name == "mysql":
+        # LAST_INSERT_ID(expr) đưa giá trị mới về OK packet -> không cần SELECT lại
+        res = db.session.execute(stmt.values(so_luong=func.last_insert_id(new_val)))
+        if res.rowcount == 0:
+            raise InsufficientStock(id_kho, id_sp, get_balance(id_kho, id_sp), -delta)
+        return int(res.lastrowid or 0)
+
+    res = db.session.execute(stmt.values(so_luong=new_val))
+    if res.rowcount == 0:
+        raise InsufficientStock(id_kho, id_sp, get_balance(id_kho, id_sp), -delta)
+    return get_balance(id_kho, id_sp)
+
+
+def _increment(id_kho, id_sp, delta) -> int:
+    """INSERT ... ON DUPLICATE KEY / ON CONFLICT: tạo dòng tồn nếu chưa có."""
+    d = _dialect()
+    values = dict(id_kho=id_kho, id_san_pham=id_sp, so_luong=delta, nguong_canh_bao=10)
+    new_val = ton_kho.c.so_luong + delta
+
+    if d.name == "mysql":
+        stmt = mysql.insert(ton_kho).values(**values)
+        stmt = stmt.on_duplicate_key_update(so_luong=func.last_insert_id(new_val))
+        res = db.session.execute(stmt)
+        # insert mới: lastrowid = 0 -> tồn = delta; update: lastrowid = giá trị mới
+        if delta > 0:
+            return int(res.lastrowid or delta)
+        return get_balance(id_kho, id_sp)
+
+    if d.name in ("sqlite", "postgresql"):
+        ins = sqlite.insert if d.name == "sqlite" else postgresql.insert
+        stmt = ins(ton_kho).values(**values).on_conflict_do_update(
+            index_elements=[ton_kho.c.id_kho, ton_kho.c.id_san_pham],
+            set_={"so_luong": new_val},
+        )
+        if d.insert_returning:
+            return int(db.session.execute(stmt.returning(ton_kho.c.so_luong)).scalar())
+        db.session.execute(stmt)
+        return get_balance(id_kho, id_sp)
+
+    # dialect khác: thử UPDATE trước, chưa có dòng thì INSERT
+    res = db.session.execute(update(ton_kho).where(_key(id_kho, id_sp)).values(so_luong=new_val))
+    if res.rowcount == 0:
+        db.session.execute(ton_kho.insert().values(**values))
+    return get_balance(id_kho, id_sp)
+
+
+def apply_delta(id_kho, id_sp, delta, min_zero=True) -> int:
+    """Cộng/trừ tồn của (id_kho, id_sp) bằng một câu lệnh; trả về tồn mới.
+
+    Trừ quá số đang có -> InsufficientStock (khi min_zero=True).
+    """
+    delta = int(delta)
+    if delta == 0:
+        return get_balance(id_kho, id_sp)
+    if delta < 0 and min_zero:
+        new = _decrement(id_kho, id_sp, delta)
+    else:
+        new = _increment(id_kho, id_sp, delta)
+    _after_write({(id_kho, id_sp): delta})
+    return new
+
+
+def _aggregate(items):
+    """Gộp các dòng trùng (id_kho, id_sp) thành một delta."""
+    agg = {}
+    for id_kho, id_sp, delta in items:
+        key = (id_kho, id_sp)
+        agg[key] = agg.get(key, 0) + int(delta)
+    return agg
+
+
+def _bulk_increment(agg):
+    """Một câu INSERT nhiều dòng ... ON DUPLICATE KEY / ON CONFLICT cộng dồn."""
+    d = _dialect()
+    rows = [dict(id_kho=k, id_san_pham=sp, so_luong=v, nguong_canh_bao=10)
+            for (k, sp), v in agg.items()]
+    if d.name == "mysql":
+        stmt = mysql.insert(ton_kho).values(rows)
+        stmt = stmt.on_duplicate_key_update(so_luong=ton_kho.c.so_luong + stmt.inserted.so_luong)
+    elif d.name in ("sqlite", "postgresql"):
+        stmt = (sqlite.insert if d.name == "sqlite" else postgresql.insert)(ton_kho).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[ton_kho.c.id_kho, ton_kho.c.id_san_pham],
+            set_={"so_luong": ton_kho.c.so_luong + stmt.excluded.so_luong},
+        )
+    else:
+        for (k, sp), v in agg.items():
+            _increment(k, sp, v)
+        return
+    db.session.execute(stmt)
+
+
+def _bulk_decrement(agg):
+    """Một câu UPDATE ... CASE cho mọi dòng; thiếu hàng ở dòng nào -> InsufficientStock."""
+    keys = list(agg)
+    amount = case(
+        *[(and_(ton_kho.c.id_kho == k, ton_kho.c.id_san_pham == sp), -v) for (k, sp), v in agg.items()],
+        else_=0,
+    )
+    stmt = (
+        update(ton_kho)
+        .where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(keys))
+        .where(ton_kho.c.so_luong >= amount)
+        .values(so_luong=ton_kho.c.so_luong - amount)
+    )
+    # SAVEPOINT: thiếu hàng thì chỉ hoàn lại chính câu UPDATE này (các dòng đã trừ),
+    # không đụng tới phần người gọi đã ghi trong giao dịch; rollback cả giao dịch do run_tx / view
+    savepoint = db.session.begin_nested()
+    res = db.session.execute(stmt)
+    if res.rowcount == len(keys):
+        savepoint.commit()
+        return
+    savepoint.rollback()
+    # đọc tồn thật để báo đúng dòng thiếu
+    ton = dict(
+        ((k, sp), int(v or 0)) for k, sp, v in db.session.execute(
+            select(ton_kho.c.id_kho, ton_kho.c.id_san_pham, ton_kho.c.so_luong)
+            .where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(keys))
+        )
+    )
+    for (k, sp), v in agg.items():
+        if ton.get((k, sp), 0) < -v:
+            raise InsufficientStock(k, sp, ton.get((k, sp), 0), -v)
+    k, sp = keys[0]
+    raise InsufficientStock(k, sp, ton.get((k, sp), 0), -agg[(k, sp)])
+
+
+def apply_deltas(items):
+    """Áp nhiều delta (id_kho, id_sp, delta) theo tập: tối đa 2 câu lệnh ghi tồn cho cả phiếu.
+
+    Dòng trùng khóa được gộp trước; phần trừ dùng một UPDATE có điều kiện,
+    phần cộng dùng một UPSERT nhiều dòng.
+    """
+    agg = _aggregate(items)
+    dec = {key: v for key, v in agg.items() if v < 0}
+    inc = {key: v for key, v in agg.items() if v > 0}
+    if dec:
+        _bulk_decrement(dec)
+    if inc:
+        _bulk_increment(inc)
+    if dec or inc:
+        _after_write({**dec, **inc})
+
+
+def transfer(kho_src, kho_dst, lines):
+    """Chuyển hàng kho_src -> kho_dst theo tập; lines = [(id_sp, qty)], trả về {id_sp: qty} đã gộp.
+
+    Khóa mọi dòng ton_kho liên quan (nguồn + đích) bằng MỘT SELECT ... FOR UPDATE
+    theo thứ tự khóa chính, nên hai phiếu ngược chiều (K1 -> K2 và K2 -> K1) luôn
+    khóa theo cùng thứ tự và chờ nhau thay vì deadlock; kiểm tra đủ hàng trong bộ
+    nhớ rồi trừ / cộng bằng một UPDATE và một UPSERT nhiều dòng.
+    kho_src == kho_dst -> ValueError (trừ và cộng cùng khóa, delta cho kpi bị mất).
+    """
+    if kho_src == kho_dst:
+        raise ValueError(f"Kho nguồn và kho đích trùng nhau ({kho_src}).")
+    qty = {}
+    for sp, q in lines:
+        qty[sp] = qty.get(sp, 0) + int(q)
+    qty = {sp: q for sp, q in qty.items() if q > 0}
+    if not qty:
+        return {}
+    keys = sorted({*((kho_src, sp) for sp in qty), *((kho_dst, sp) for sp in qty)})
+    ton = dict(
+        ((k, sp), int(v or 0)) for k, sp, v in db.session.execute(
+            select(ton_kho.c.id_kho, ton_kho.c.id_san_pham, ton_kho.c.so_luong)
+            .where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(keys))
+            .order_by(ton_kho.c.id_kho, ton_kho.c.id_san_pham)
+            .with_for_update()
+        )
+    )
+    for sp in sorted(qty):
+        if ton.get((kho_src, sp), 0) < qty[sp]:
+            raise InsufficientStock(kho_src, sp, ton.get((kho_src, sp), 0), qty[sp])
+    dec = {(kho_src, sp): -q for sp, q in qty.items()}
+    inc = {(kho_dst, sp): q for sp, q in qty.items()}
+    _bulk_decrement(dec)
+    _bulk_increment(inc)
+    _after_write({**dec, **inc})
+    return qty
+
+
+def _after_write(agg):
+    """Đọc lại tồn mới + ngưỡng của các khóa vừa ghi (theo khóa chính) để cập nhật
+    chỉ số trang chủ (kpi) và cảnh báo tồn thấp (alerts) trong cùng giao dịch,
+    và xếp sự kiện cho màn hình trực tiếp (events, phát sau khi commit)."""
+    rows = db.session.execute(
+        select(ton_kho.c.id_kho, ton_kho.c.id_san_pham, ton_kho.c.so_luong, ton_kho.c.nguong_canh_bao)
+        .where(tuple_(ton_kho.c.id_kho, ton_kho.c.id_san_pham).in_(list(agg)))
+        .order_by(ton_kho.c.id_kho, ton_kho.c.id_san_pham)
+    ).all()
+    kpi.on_stock((k, sp, agg[(k, sp)], int(q)) for k, sp, q, _ in rows)
+    alerts.on_stock(rows)
+    events.stage(db.session, rows)
+
+
+def is_retryable(exc) -> bool:
+    """Deadlock / lock timeout: rollback rồi chạy lại cả giao dịch là an toàn."""
+    orig = getattr(exc, "orig", None)
+    args = getattr(orig, "args", ())
+    if args and args[0] in MYSQL_RETRY_CODES:
+        return True
+    if getattr(orig, "pgcode", None) in PG_RETRY_CODES:
+        return True
+    return "database is locked" in str(orig or exc)
+
+
+def run_tx(fn, *args, **kwargs):
+    """Chạy fn() rồi commit; gặp deadlock/lock timeout thì rollback và chạy lại.
+
+    fn phải tự dựng lại toàn bộ thay đổi của giao dịch (add bản ghi, apply_delta...)
+    vì mỗi lần thử lại bắt đầu từ session sạch.
+    """
+    retries = current_app.config.get("STOCK_TX_RETRIES", 3)
+    backoff = current_app.config.get("STOCK_TX_BACKOFF", 0.05)
+    attempt = 0
+    while True:
+        try:
+            result = fn(*args, **kwargs)
+            db.session.commit()
+            return result
+        except OperationalError as e:
+            db.session.rollback()
+            if attempt >= retries or not is_retryable(e):
+                raise
+            attempt += 1
+            time.sleep(backoff * attempt * (1 + random.random()))
@@ -0,0 +1,76 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# app.py dựng app mặc định lúc import (không kết nối): trỏ sang SQLite để không cần driver MySQL
+os.environ.setdefault("DATABASE_URL", "sqlite:///" + os.path.join(tempfile.gettempdir(), "kho_test.db"))
+os.environ.setdefault("PASSWORD_HASH_WORKERS", "0")
+
+from flask import g  # noqa: E402
+from flask.testing import FlaskClient  # noqa: E402
+
+from config import Config  # noqa: E402
+
+
+class _Client(FlaskClient):
+    """Fixture `app` giữ sẵn app context nên Flask dùng lại nó (cả `g`) cho mọi request
+    của test client; xóa `g` trước mỗi request cho giống chạy thật."""
+
+    def open(self, *args, **kwargs):
+        for k in list(g):
+            g.pop(k)
+        return super().open(*args, **kwargs)
+
+
+@pytest.fixture
+def app(tmp_path):
+    from app import create_app
+    from models import db
+
+    class TestConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'kho.db'}"
+        SQLALCHEMY_BINDS = {}
+        PASSWORD_HASH_WORKERS = 0
+        SEQ_BLOCK_SIZE = 5
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def seeded(app):
+    """Bảng phụ (bootstrap.schema) + 2 kho, 3 SP, admin và nv1 (kho K1)."""
+    import bootstrap
+    import passwords
+    from models import Kho, SanPham, User
+
+    db = app.extensions["sqlalchemy"]
+    app.test_client_class = _Client
+    bootstrap.schema()
+    db.session.add_all([Kho(id_kho=k, ten_kho=f"Kho {k}") for k in ("K1", "K2")])
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=n)
+                        for i, n in enumerate(["Bàn gỗ", "Ghế nhựa", "Dầu bóng"], 1)])
+    db.session.add(User(username="admin", password_hash=passwords.hash_password("admin123"), role="admin"))
+    db.session.add(User(username="nv1", password_hash=passwords.hash_password("123456"),
+                        role="staff", assigned_kho="K1"))
+    db.session.commit()
+    return app
+
+
+@pytest.fixture
+def login(seeded):
+    """login("admin", "admin123") -> test client đã đăng nhập."""
+    def _login(username="admin", password="admin123"):
+        c = seeded.test_client()
+        r = c.post("/login", data={"username": username, "password": password})
+        assert r.status_code == 302, r.status_code
+        return c
+    return _login
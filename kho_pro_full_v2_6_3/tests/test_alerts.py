@@ -0,0 +1,66 @@
+from sqlalchemy import select, update
+
+from models import db, Kho, SanPham, TonKho, CanhBaoTon
+import alerts
+from stock_engine import apply_deltas, transfer
+
+
+def _seed():
+    db.session.add_all([Kho(id_kho=k, ten_kho=f"Kho {k}") for k in ("K1", "K2")])
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=f"SP {i}") for i in (1, 2)])
+    db.session.commit()
+
+
+def _open():
+    """{(kho, sp): (so_luong, nguong)} của cảnh báo đang mở."""
+    return {(c.id_kho, c.id_san_pham): (c.so_luong, c.nguong) for c in db.session.execute(
+        select(CanhBaoTon).where(CanhBaoTon.dong_luc.is_(None))).scalars()}
+
+
+def _expected():
+    """Cảnh báo phải mở theo ton_kho (so_luong <= nguong_canh_bao)."""
+    return {(t.id_kho, t.id_san_pham): (t.so_luong, t.nguong_canh_bao) for t in db.session.execute(
+        select(TonKho).where(TonKho.so_luong <= TonKho.nguong_canh_bao)).scalars()}
+
+
+def _step(*deltas):
+    apply_deltas(list(deltas))
+    db.session.commit()
+    assert _open() == _expected()
+    return _open()
+
+
+def test_alert_follows_stock_across_threshold(app):
+    _seed()  # ngưỡng mặc định 10
+    assert _step(("K1", "SP001", 20), ("K1", "SP002", 3)) == {("K1", "SP002"): (3, 10)}
+    # xuống dưới ngưỡng: mở; còn dưới ngưỡng: cập nhật tồn, không mở thêm
+    assert _step(("K1", "SP001", -12)) == {("K1", "SP001"): (8, 10), ("K1", "SP002"): (3, 10)}
+    assert _step(("K1", "SP001", -1))[("K1", "SP001")] == (7, 10)
+    # đúng bằng ngưỡng vẫn là thấp; vượt lên thì đóng
+    assert _step(("K1", "SP001", 3))[("K1", "SP001")] == (10, 10)
+    assert _step(("K1", "SP001", 1), ("K1", "SP002", 30)) == {}
+    # xuống lại: mở cảnh báo mới, cảnh báo cũ giữ làm lịch sử
+    _step(("K1", "SP001", -5))
+    hist = db.session.execute(select(CanhBaoTon.dong_luc.is_(None)).where(
+        CanhBaoTon.id_kho == "K1", CanhBaoTon.id_san_pham == "SP001").order_by(CanhBaoTon.id)).scalars().all()
+    assert hist == [False, True]
+
+
+def test_transfer_updates_alerts_in_both_khos(app):
+    _seed()
+    _step(("K1", "SP001", 15), ("K2", "SP001", 2))
+    transfer("K1", "K2", [("SP001", 9)])
+    db.session.commit()
+    assert _open() == _expected() == {("K1", "SP001"): (6, 10)}
+
+
+def test_threshold_change_synced(app):
+    _seed()
+    _step(("K1", "SP001", 15))
+    db.session.execute(update(TonKho).values(nguong_canh_bao=20))
+    alerts.sync([("K1", "SP001")])
+    db.session.commit()
+    assert _open() == {("K1", "SP001"): (15, 20)}
+    db.session.execute(update(TonKho).values(nguong_canh_bao=5))
+    alerts.sync()
+    assert _open() == {}
@@ -0,0 +1,88 @@
+import threading
+import time
+
+from sqlalchemy import select
+from werkzeug.security import generate_password_hash
+
+from models import db, User
+import passwords
+
+
+def _post_login(app, password, addr="10.0.0.1", username="nv1"):
+    return app.test_client().post("/login", data={"username": username, "password": password},
+                                  environ_base={"REMOTE_ADDR": addr})
+
+
+def _nv1():
+    return db.session.execute(select(User).where(User.username == "nv1")).scalar_one()
+
+
+def test_lockout_window_per_username_and_address(seeded, monkeypatch):
+    limit = seeded.config["LOGIN_FAIL_LIMIT"]
+    for _ in range(limit):
+        assert _post_login(seeded, "sai").status_code == 200
+    # hết lượt: đúng mật khẩu cũng bị chặn, không băm thêm
+    assert _post_login(seeded, "123456").status_code == 429
+    with seeded.test_request_context("/"):
+        assert passwords.blocked_for(passwords.fail_key("NV1", "10.0.0.1")) > 0
+    # địa chỉ khác không bị khóa theo (không ai khóa được tài khoản người khác)
+    assert _post_login(seeded, "123456", addr="10.0.0.2").status_code == 302
+
+    # hết cửa sổ LOGIN_FAIL_WINDOW thì được thử lại
+    now = time.monotonic() + seeded.config["LOGIN_FAIL_WINDOW"] + 1
+    monkeypatch.setattr(passwords.time, "monotonic", lambda: now)
+    assert _post_login(seeded, "123456").status_code == 302
+
+
+def test_success_clears_failures(seeded):
+    limit = seeded.config["LOGIN_FAIL_LIMIT"]
+    for _ in range(limit - 1):
+        _post_login(seeded, "sai")
+    assert _post_login(seeded, "123456").status_code == 302
+    for _ in range(limit - 1):
+        _post_login(seeded, "sai")
+    assert _post_login(seeded, "123456").status_code == 302
+
+
+def test_old_hash_upgraded_after_login(seeded):
+    _nv1().password_hash = generate_password_hash("123456", "pbkdf2:sha256:1000")
+    db.session.commit()
+    with seeded.test_request_context("/"):
+        assert passwords.needs_rehash(_nv1().password_hash)
+
+    assert _post_login(seeded, "sai").status_code == 200
+    db.session.expire_all()
+    assert _nv1().password_hash.startswith("pbkdf2:")  # sai mật khẩu: giữ nguyên
+
+    assert _post_login(seeded, "123456").status_code == 302
+    db.session.expire_all()
+    new_hash = _nv1().password_hash
+    assert new_hash.startswith(seeded.config["PASSWORD_HASH_METHOD"])
+    with seeded.test_request_context("/"):
+        assert not passwords.needs_rehash(new_hash)
+        assert passwords.verify(new_hash, "123456")
+
+
+def test_busy_hash_pool_returns_503(login, seeded):
+    c = login("nv1", "123456")
+
+    class _Pool:
+        def submit(self, *a):
+            raise AssertionError("không được gửi việc khi đã hết chỗ")
+
+    # pool "đầy": hết chỗ chờ, chờ PASSWORD_HASH_TIMEOUT rồi báo bận
+    seeded.config["PASSWORD_HASH_TIMEOUT"] = 0.01
+    with seeded.test_request_context("/"):
+        ext = passwords._state()
+    ext["password_pool"], ext["password_slots"] = _Pool(), threading.BoundedSemaphore(1)
+    ext["password_slots"].acquire()
+
+    assert _post_login(seeded, "123456").status_code == 503
+    r = c.post("/account/password", data={"current_password": "123456", "new_password": "moi123456",
+                                          "confirm_password": "moi123456"})
+    assert r.status_code == 503
+    # bận không tính là sai mật khẩu
+    with seeded.test_request_context("/"):
+        assert passwords.blocked_for(passwords.fail_key("nv1", "10.0.0.1")) == 0
+        assert ext["password_fails"] == {}
+    ext["password_pool"] = None
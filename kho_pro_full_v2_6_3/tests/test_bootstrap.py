@@ -0,0 +1,41 @@
+import logging
+
+import pytest
+from sqlalchemy import inspect, text
+
+from models import db
+import bootstrap
+import costing
+import kpi
+
+
+def test_schema_is_idempotent(app):
+    bootstrap.schema()
+    bootstrap.schema()
+    assert inspect(db.engine).has_table("canh_bao_ton")
+
+
+def test_table_already_created_elsewhere_is_skipped(app, monkeypatch, caplog):
+    def race(engine):
+        # tiến trình khác vừa tạo bảng giữa lúc kiểm tra và lúc CREATE
+        db.session.execute(text("CREATE TABLE users (id INTEGER)"))
+
+    monkeypatch.setattr(kpi, "ensure_kpi_schema", race)
+    ran = []
+    monkeypatch.setattr(bootstrap, "ensure_search_schema", lambda engine: ran.append(engine) or [])
+    with caplog.at_level(logging.INFO, logger=app.logger.name):
+        bootstrap.schema()
+    assert "already exists" in caplog.text
+    # các bước sau vẫn chạy
+    assert ran == [db.engine]
+
+
+def test_unexpected_error_is_logged_and_raised(app, monkeypatch, caplog):
+    def boom(engine):
+        raise RuntimeError("mất kết nối")
+
+    monkeypatch.setattr(costing, "ensure_costing_schema", boom)
+    with pytest.raises(RuntimeError):
+        bootstrap.schema()
+    rec = [r for r in caplog.records if r.levelno == logging.ERROR]
+    assert rec and "giá vốn" in rec[0].getMessage() and rec[0].exc_info
@@ -0,0 +1,48 @@
+import io
+
+from sqlalchemy import select, func
+
+from models import db, Kho, SanPham, TonKho, HoaDonXuat
+from bulk_import import import_invoices
+
+NHAP = "id_hoa_don_nhap,id_san_pham,id_kho,id_nhan_vien,id_nha_cung_cap,so_san_pham_nhap,gia_nhap,ngay_nhap\n"
+XUAT = ("id_hoa_don_xuat,id_san_pham,id_kho,id_nhan_vien,id_xe_van_chuyen,id_khach_hang,"
+        "so_san_pham_xuat,gia_ban,ngay_xuat\n")
+
+
+def _csv(header, lines):
+    return io.BytesIO((header + "".join(l + "\n" for l in lines)).encode())
+
+
+def _seed():
+    db.session.add(Kho(id_kho="K1", ten_kho="Kho 1"))
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=f"SP {i}") for i in (1, 2, 3)])
+    db.session.commit()
+
+
+def test_existing_key_skips_only_that_row(app):
+    _seed()
+    assert import_invoices("nhap", _csv(NHAP, ["N500,SP001,K1,,,10,5,2026-01-01"]), "a.csv")["inserted"] == 1
+    r = import_invoices("nhap", _csv(NHAP, ["N500,SP001,K1,,,10,5,2026-01-02",
+                                            "N501,SP001,K1,,,5,5,2026-01-02"]), "a.csv")
+    assert r["inserted"] == 1 and r["failed_chunks"] == 0
+    assert r["reasons"] == {"khóa hóa đơn đã có trong DB": 1}
+
+
+def test_xuat_over_stock_skips_rows_and_writes_rest(app):
+    _seed()
+    import_invoices("nhap", _csv(NHAP, ["N1,SP001,K1,,,15,5,2026-01-01", "N1,SP002,K1,,,3,5,2026-01-01"]), "a.csv")
+    r = import_invoices("xuat", _csv(XUAT, [
+        "X1,SP001,K1,,,,10,9,2026-01-03",
+        "X2,SP001,K1,,,,4,9,2026-01-03",
+        "X3,SP001,K1,,,,4,9,2026-01-03",   # 10 + 4 + 4 > 15
+        "X4,SP002,K1,,,,5,9,2026-01-03",   # > 3
+        "X5,SP003,K1,,,,1,9,2026-01-03",   # chưa có tồn
+        "X6,SP002,K1,,,,3,9,2026-01-03",   # X4 bị loại không giữ chỗ tồn
+    ]), "b.csv")
+    assert r["inserted"] == 3 and r["failed_chunks"] == 0
+    assert r["reasons"] == {"không đủ tồn kho": 3}
+    assert "Dòng 4: không đủ tồn kho" in r["errors"]
+    ton = dict(db.session.execute(select(TonKho.id_san_pham, TonKho.so_luong)).all())
+    assert ton == {"SP001": 1, "SP002": 0}
+    assert db.session.execute(select(func.count()).select_from(HoaDonXuat)).scalar() == 3
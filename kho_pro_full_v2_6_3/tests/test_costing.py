@@ -0,0 +1,87 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+from sqlalchemy import insert, select
+
+from models import db, Kho, SanPham, HoaDonNhap, HoaDonXuat, GiaVonTB
+import costing
+
+NHAP = [(3, "10.01", 1), (7, "10.02", 2), (1, "9.99", 3)]
+XUAT = [(4, 4), (5, 5)]
+
+
+def _run(app, method):
+    app.config["COSTING_METHOD"] = method
+    costing.ensure_costing_schema(db.engine)
+    db.session.add(Kho(id_kho="K1", ten_kho="Kho 1"))
+    db.session.add(SanPham(id_san_pham="SP001", ten_san_pham="Bàn"))
+    live = []
+    for i, (q, gia, day) in enumerate(NHAP):
+        ngay = datetime(2026, 1, day)
+        db.session.execute(insert(HoaDonNhap), [dict(id_hoa_don_nhap=f"N{i}", id_san_pham="SP001", id_kho="K1",
+                                                     so_san_pham_nhap=q, gia_nhap=Decimal(gia), ngay_nhap=ngay)])
+        costing.receive([("K1", "SP001", q, Decimal(gia), ngay)])
+    for i, (q, day) in enumerate(XUAT):
+        c = costing.issue([("K1", "SP001", q)])[("K1", "SP001")]
+        live.append(c)
+        db.session.execute(insert(HoaDonXuat), [dict(id_hoa_don_xuat=f"X{i}", id_san_pham="SP001", id_kho="K1",
+                                                     so_san_pham_xuat=q, gia_ban=20, don_gia_von=c,
+                                                     ngay_xuat=datetime(2026, 1, day))])
+    db.session.commit()
+    return live
+
+
+@pytest.mark.parametrize("method", ["average", "fifo"])
+def test_unit_costs_are_decimal_at_column_scale(app, method):
+    live = _run(app, method)
+    assert all(isinstance(c, Decimal) and c == c.quantize(costing.UNIT) for c in live)
+    if method == "fifo":
+        # 3 × 10.01 + 1 × 10.02 ; 5 × 10.02
+        assert live == [Decimal("10.0125"), Decimal("10.0200")]
+
+
+@pytest.mark.parametrize("method", ["average", "fifo"])
+def test_rebuild_matches_live(app, method):
+    live = _run(app, method)
+    state = db.session.execute(select(GiaVonTB.so_luong, GiaVonTB.don_gia)).all()
+    costing.rebuild()
+    replay = db.session.execute(select(HoaDonXuat.don_gia_von).order_by(HoaDonXuat.id_hoa_don_xuat)).scalars().all()
+    assert [Decimal(c) for c in replay] == live
+    assert db.session.execute(select(GiaVonTB.so_luong, GiaVonTB.don_gia)).all() == state
+
+
+def test_average_sale_before_first_receipt_matches_rebuild(app):
+    app.config["COSTING_METHOD"] = "average"
+    costing.ensure_costing_schema(db.engine)
+    db.session.add_all([Kho(id_kho="K1", ten_kho="Kho 1"), Kho(id_kho="K2", ten_kho="Kho 2")])
+    db.session.add(SanPham(id_san_pham="SP001", ten_san_pham="Bàn"))
+
+    def nhap(i, kho, q, gia, day):
+        ngay = datetime(2026, 1, day)
+        db.session.execute(insert(HoaDonNhap), [dict(id_hoa_don_nhap=f"N{i}", id_san_pham="SP001", id_kho=kho,
+                                                     so_san_pham_nhap=q, gia_nhap=Decimal(gia), ngay_nhap=ngay)])
+        costing.receive([(kho, "SP001", q, Decimal(gia), ngay)])
+
+    def xuat(i, q, day):
+        c = costing.issue([("K1", "SP001", q)])[("K1", "SP001")]
+        db.session.execute(insert(HoaDonXuat), [dict(id_hoa_don_xuat=f"X{i}", id_san_pham="SP001", id_kho="K1",
+                                                     so_san_pham_xuat=q, gia_ban=20, don_gia_von=c,
+                                                     ngay_xuat=datetime(2026, 1, day))])
+        return c
+
+    nhap(0, "K2", 1, "8.00", 1)      # giá dự phòng của SP (kho khác)
+    live = [xuat(0, 2, 2)]           # K1 bán trước khi có lần nhập nào
+    nhap(1, "K1", 3, "10.00", 3)
+    nhap(2, "K1", 5, "12.00", 4)
+    live.append(xuat(1, 4, 5))
+    db.session.commit()
+    assert live[0] == Decimal("8.0000")
+    state = db.session.execute(select(GiaVonTB.id_kho, GiaVonTB.so_luong, GiaVonTB.don_gia)
+                               .order_by(GiaVonTB.id_kho)).all()
+
+    costing.rebuild()
+    replay = db.session.execute(select(HoaDonXuat.don_gia_von).order_by(HoaDonXuat.id_hoa_don_xuat)).scalars().all()
+    assert [Decimal(c) for c in replay] == live
+    assert db.session.execute(select(GiaVonTB.id_kho, GiaVonTB.so_luong, GiaVonTB.don_gia)
+                              .order_by(GiaVonTB.id_kho)).all() == state
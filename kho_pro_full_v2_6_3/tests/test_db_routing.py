@@ -0,0 +1,83 @@
+import shutil
+import sqlite3
+
+import pytest
+
+from config import Config
+
+
+def _make_app(tmp_path, replica_url):
+    from app import create_app
+    import bootstrap
+    import passwords
+    from models import db, SanPham, User
+
+    primary = tmp_path / "primary.db"
+
+    class ReplicaConfig(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{primary}"
+        SQLALCHEMY_BINDS = {"replica": replica_url}
+        PASSWORD_HASH_WORKERS = 0
+        REPLICA_STICKY_SECONDS = 60
+
+    app = create_app(ReplicaConfig)
+    with app.app_context():
+        db.create_all(bind_key=None)
+        bootstrap.schema()
+        db.session.add(SanPham(id_san_pham="SP001", ten_san_pham="Bàn primary"))
+        db.session.add(User(username="admin", password_hash=passwords.hash_password("admin123"), role="admin"))
+        db.session.commit()
+        db.session.remove()
+        for e in db.engines.values():
+            e.dispose()
+    return app, primary
+
+
+@pytest.fixture
+def replica(tmp_path):
+    """(app, client đã đăng nhập): primary.db + replica.db là bản chép, tên SP khác nhau."""
+    path = tmp_path / "replica.db"
+    app, primary = _make_app(tmp_path, f"sqlite:///{path}")
+    shutil.copy(primary, path)
+    con = sqlite3.connect(path)
+    con.execute("UPDATE san_pham SET ten_san_pham = 'Bàn replica'")
+    con.commit()
+    con.close()
+    c = app.test_client()
+    assert c.post("/login", data={"username": "admin", "password": "admin123"}).status_code == 302
+    yield app, c
+    with app.app_context():
+        from models import db
+        for e in db.engines.values():
+            e.dispose()
+
+
+def test_get_reads_from_replica(replica):
+    app, c = replica
+    body = c.get("/products").get_data(as_text=True)
+    assert "Bàn replica" in body and "Bàn primary" not in body
+
+
+def test_reads_stay_on_primary_after_a_write(replica):
+    app, c = replica
+    r = c.post("/products/SP001/edit", data={"ten_san_pham": "Bàn mới"})
+    assert r.status_code == 302
+    body = c.get("/products").get_data(as_text=True)
+    assert "Bàn mới" in body and "Bàn replica" not in body
+
+    # hết cửa sổ sau khi ghi -> lại đọc bản sao (chưa nhận bản ghi mới)
+    app.config["REPLICA_STICKY_SECONDS"] = 0
+    body = c.get("/products").get_data(as_text=True)
+    assert "Bàn replica" in body
+
+
+def test_replica_error_falls_back_to_primary(tmp_path):
+    app, _ = _make_app(tmp_path, f"sqlite:///{tmp_path / 'khong-co' / 'replica.db'}")
+    c = app.test_client()
+    assert c.post("/login", data={"username": "admin", "password": "admin123"}).status_code == 302
+    app.config["REPLICA_STICKY_SECONDS"] = 0
+    r = c.get("/products")
+    assert r.status_code == 200
+    assert "Bàn primary" in r.get_data(as_text=True)
+    assert app.extensions.get("replica_down_until", 0) > 0
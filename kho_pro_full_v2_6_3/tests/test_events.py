@@ -0,0 +1,60 @@
+from sqlalchemy.exc import OperationalError
+
+from models import db, Kho, SanPham
+import events
+from stock_engine import apply_deltas, run_tx
+
+
+def _seed():
+    db.session.add(Kho(id_kho="K1", ten_kho="Kho 1"))
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=f"SP {i}") for i in (1, 2)])
+    db.session.commit()
+
+
+def _drain(sub):
+    out = []
+    while (ev := sub.get(timeout=0)) is not None:
+        out.append(ev)
+    return out
+
+
+def test_events_published_only_after_commit(app):
+    _seed()
+    sub = events.bus().subscribe()
+    apply_deltas([("K1", "SP001", 5), ("K1", "SP002", 20)])
+    # đã xếp trong session nhưng chưa phát khi giao dịch chưa commit
+    assert _drain(sub) == []
+    db.session.commit()
+    evs = _drain(sub)
+    assert [(kho, d["sp"], d["so_luong"], d["canh_bao"]) for _, kho, d in evs] == [
+        ("K1", "SP001", 5, True), ("K1", "SP002", 20, False)]
+    assert events.bus().kho_marks(["K1"]) == {"K1": evs[-1][0]}
+
+
+def test_rollback_drops_staged_events(app):
+    _seed()
+    sub = events.bus().subscribe()
+    apply_deltas([("K1", "SP001", 5)])
+    db.session.rollback()
+    # commit kế tiếp không mang theo sự kiện của giao dịch đã hủy
+    apply_deltas([("K1", "SP002", 3)])
+    db.session.commit()
+    assert [d["sp"] for _, _, d in _drain(sub)] == ["SP002"]
+    assert events.bus().kho_marks(["K1"]) == {"K1": 1}
+
+
+def test_retried_transaction_publishes_once(app):
+    _seed()
+    sub = events.bus().subscribe()
+    calls = []
+
+    def nhap():
+        calls.append(1)
+        apply_deltas([("K1", "SP001", 4)])
+        if len(calls) == 1:
+            raise OperationalError("UPDATE ton_kho", {}, Exception("database is locked"))
+
+    app.config["STOCK_TX_BACKOFF"] = 0
+    run_tx(nhap)
+    assert len(calls) == 2
+    assert [(d["sp"], d["so_luong"]) for _, _, d in _drain(sub)] == [("SP001", 4)]
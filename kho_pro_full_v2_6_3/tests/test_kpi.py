@@ -0,0 +1,50 @@
+from datetime import datetime
+
+from sqlalchemy import insert, select, func
+
+from models import db, HoaDonNhap, HoaDonXuat, ChiSoKhoDelta
+from stock_engine import apply_deltas, transfer, run_tx
+import kpi
+
+COLS = (*kpi.SUM_COLS, *kpi.MAX_COLS)
+
+
+def _nhap(id_hd, kho, lines, ngay):
+    rows = [dict(id_hoa_don_nhap=id_hd, id_san_pham=sp, id_kho=kho, so_san_pham_nhap=q,
+                 gia_nhap=10, ngay_nhap=ngay) for sp, q in lines]
+    kpi.on_invoices("nhap", rows)
+    db.session.execute(insert(HoaDonNhap), rows)
+    apply_deltas((kho, sp, q) for sp, q in lines)
+
+
+def _xuat(id_hd, kho, lines, ngay):
+    rows = [dict(id_hoa_don_xuat=id_hd, id_san_pham=sp, id_kho=kho, so_san_pham_xuat=q,
+                 gia_ban=20, ngay_xuat=ngay) for sp, q in lines]
+    kpi.on_invoices("xuat", rows)
+    db.session.execute(insert(HoaDonXuat), rows)
+    apply_deltas((kho, sp, -q) for sp, q in lines)
+
+
+def test_incremental_snapshot_matches_full_refresh(seeded):
+    kpi.refresh(["K1", "K2"])
+    base = {r.id_kho: r.phien_ban for r in db.session.execute(select(kpi.csk))}
+
+    run_tx(_nhap, "N1", "K1", [("SP001", 5), ("SP002", 3)], datetime(2026, 1, 2))
+    run_tx(_xuat, "X1", "K1", [("SP002", 3), ("SP001", 1)], datetime(2026, 1, 3))
+    run_tx(transfer, "K1", "K2", [("SP001", 4)])
+    run_tx(_nhap, "N2", "K2", [("SP003", 2)], datetime(2026, 1, 4))
+
+    # ghi chỉ chèn delta, không đụng dòng chi_so_kho của kho
+    assert {r.id_kho: r.phien_ban for r in db.session.execute(select(kpi.csk))} == base
+    assert db.session.execute(select(func.count()).select_from(ChiSoKhoDelta)).scalar() > 0
+
+    live = kpi._read(["K1", "K2"])
+    kpi.refresh(["K1", "K2"])
+    full = kpi._read(["K1", "K2"])
+    for k in ("K1", "K2"):
+        assert {c: live[k][c] for c in COLS} == {c: full[k][c] for c in COLS}
+        assert full[k]["phien_ban"] > live[k]["phien_ban"]
+    assert full["K1"]["tong_ton"] == 0 and full["K1"]["so_sp_con"] == 0
+    assert (full["K2"]["tong_ton"], full["K2"]["so_sp_con"]) == (6, 2)
+    assert full["K1"]["so_don_xuat"] == 1
+    assert db.session.execute(select(func.count()).select_from(ChiSoKhoDelta)).scalar() == 0
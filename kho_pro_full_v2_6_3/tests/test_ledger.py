@@ -0,0 +1,23 @@
+from sqlalchemy import text
+
+from models import db
+import ledger
+
+
+def test_every_filter_combination_is_checked_without_sort(app):
+    rows = ledger.explain_pages()
+    labels = {(kind, label) for kind, label, *_ in rows}
+    # các tổ hợp kho + bộ lọc khác, có khoảng ngày, đều được kiểm
+    for kind, label in [("nhap", "admin: f_kho + f_nv + from"), ("nhap", "admin: f_kho + f_ncc + from"),
+                        ("xuat", "admin: f_kho + f_nv + from"), ("xuat", "admin: f_kho + f_kh + from"),
+                        ("xuat", "admin: f_kho + f_xe + from"), ("xuat", "staff: f_kh + from")]:
+        assert (kind, label) in labels
+    assert [r for r in rows if r[3]] == []
+
+
+def test_missing_index_is_reported(app):
+    db.session.execute(text("DROP INDEX ix_hdx_kh_ngay"))
+    db.session.execute(text("DROP INDEX ix_hdx_ngay_id"))
+    db.session.commit()
+    sorted_labels = {label for kind, label, _, sorts, _ in ledger.explain_pages() if sorts and kind == "xuat"}
+    assert "admin: f_kh + from" in sorted_labels
@@ -0,0 +1,31 @@
+import re
+
+from models import db, SanPham
+from search import fold
+
+
+def _ids(body):
+    return re.findall(r"<td>(SP\d+)</td>", body)
+
+
+def test_fold_strips_vietnamese_diacritics():
+    assert fold("  Dầu  Bóng ĐỎ ") == "dau bong do"
+
+
+def test_unaccented_query_matches_accented_name(login):
+    c = login()
+    assert _ids(c.get("/products?q=dau").get_data(as_text=True)) == ["SP003"]
+    assert _ids(c.get("/products?q=ban go").get_data(as_text=True)) == ["SP001"]
+
+
+def test_tim_kiem_follows_create_and_edit(login):
+    c = login()
+    c.post("/products/create", data={"id_san_pham": "SP777", "ten_san_pham": "Tủ Sắt", "mau": "Xám"})
+    assert db.session.get(SanPham, "SP777").tim_kiem == "sp777 tu sat xam"
+    assert _ids(c.get("/products?q=tu sat").get_data(as_text=True)) == ["SP777"]
+
+    c.post("/products/SP777/edit", data={"ten_san_pham": "Kệ gỗ", "mau": ""})
+    db.session.expire_all()
+    assert db.session.get(SanPham, "SP777").tim_kiem == "sp777 ke go"
+    assert _ids(c.get("/products?q=tu sat").get_data(as_text=True)) == []
+    assert _ids(c.get("/products?q=ke").get_data(as_text=True)) == ["SP777"]
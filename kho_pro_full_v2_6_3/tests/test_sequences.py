@@ -0,0 +1,68 @@
+import io
+from datetime import datetime
+
+from sqlalchemy import insert, select
+
+from models import db, MaSo, Kho, SanPham, HoaDonNhap
+from sequences import next_code, claim
+from bulk_import import import_invoices
+
+
+def _seed():
+    db.session.add(Kho(id_kho="K1", ten_kho="Kho 1"))
+    db.session.add(SanPham(id_san_pham="SP001", ten_san_pham="Bàn"))
+    db.session.commit()
+
+
+def _counter(prefix):
+    return db.session.execute(select(MaSo.gia_tri).where(MaSo.tien_to == prefix)).scalar()
+
+
+def test_import_high_id_moves_counter(app):
+    _seed()
+    assert next_code("N") == "N0000001"
+    csv = ("id_hoa_don_nhap,id_san_pham,id_kho,id_nhan_vien,id_nha_cung_cap,so_san_pham_nhap,gia_nhap,ngay_nhap\n"
+           "N900,SP001,K1,,,2,10,2026-01-05\n")
+    r = import_invoices("nhap", io.BytesIO(csv.encode()), "n.csv")
+    assert r["inserted"] == 1
+    assert _counter("N") >= 900
+    # khối đang giữ (N0000002..N0000005) vẫn dùng được, sau đó cấp tiếp trên N900
+    codes = [next_code("N") for _ in range(10)]
+    assert "N900" not in codes
+    assert all(int(c[1:]) > 900 for c in codes[4:])
+
+
+def test_claim_inside_reserved_block_discards_it(app):
+    _seed()
+    assert next_code("X") == "X0000001"      # giữ khối X0000001..X0000005
+    claim("X", ["X0000003"])
+    db.session.commit()
+    assert next_code("X") == "X0000006"
+
+
+def test_claim_never_lowers_counter(app):
+    next_code("N")
+    claim("N", ["N002", "NCC001", "abc"])
+    db.session.commit()
+    assert _counter("N") == 5
+
+
+def test_claim_rolled_back_with_caller(app):
+    _seed()
+    next_code("N")
+    db.session.execute(insert(HoaDonNhap), [dict(
+        id_hoa_don_nhap="N700", id_san_pham="SP001", id_kho="K1",
+        so_san_pham_nhap=1, gia_nhap=1, ngay_nhap=datetime(2026, 1, 1))])
+    claim("N", ["N700"])
+    db.session.rollback()
+    assert _counter("N") == 5
+
+
+def test_codes_sort_as_numbers_past_999(app):
+    next_code("N")
+    claim("N", ["N997"])                     # mã cũ 3 chữ số vẫn đọc đúng số
+    db.session.commit()
+    codes = [next_code("N") for _ in range(9)][4:]
+    assert codes[:3] == ["N0000998", "N0000999", "N0001000"]
+    assert sorted(codes) == codes
+    assert all(len(c) == len(codes[0]) for c in codes)
@@ -0,0 +1,35 @@
+import metrics
+
+
+def _queries(app, endpoint="inventory.api_ton_kho"):
+    """(số request, tổng số câu SQL) đã ghi cho endpoint (metrics.py)."""
+    with app.app_context():
+        d = metrics.registry().req_queries._data.get((endpoint, "GET"))
+    return (d[-1], d[-2]) if d else (0, 0)
+
+
+def _poll_twice(app, c, url):
+    r = c.get(url)
+    assert r.status_code == 200
+    n0, q0 = _queries(app)
+    r2 = c.get(url, headers={"If-None-Match": r.headers["ETag"]})
+    assert r2.status_code == 304
+    n1, q1 = _queries(app)
+    assert n1 == n0 + 1
+    return q1 - q0
+
+
+def test_repeated_poll_is_304_without_sql(login, seeded):
+    c = login()
+    assert _poll_twice(seeded, c, "/api/ton-kho?sp=SP001,SP002") == 0
+
+
+def test_unknown_kho_poll_is_cached(login, seeded):
+    c = login()
+    etag = c.get("/api/ton-kho?sp=SP001&kho=K9").headers["ETag"]
+    c.get("/api/ton-kho?sp=SP001&kho=K8")
+    # K8 nạp lại cache nhưng vẫn nhớ K9 chưa có dòng: hỏi lại K9 không đọc DB
+    n0, q0 = _queries(seeded)
+    r = c.get("/api/ton-kho?sp=SP001&kho=K9", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert _queries(seeded) == (n0 + 1, q0)
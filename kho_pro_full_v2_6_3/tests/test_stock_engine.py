@@ -0,0 +1,74 @@
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+
+from models import db, Kho, SanPham, TonKho, HoaDonNhap
+from stock_engine import apply_deltas, transfer, InsufficientStock
+
+
+def _ton():
+    return dict(db.session.execute(select(TonKho.id_san_pham, TonKho.so_luong)).all())
+
+
+def test_shortfall_keeps_caller_transaction(app):
+    db.session.add(Kho(id_kho="K1", ten_kho="Kho 1"))
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=f"SP {i}") for i in (1, 2, 3)])
+    apply_deltas([("K1", "SP001", 10), ("K1", "SP002", 1)])
+    db.session.commit()
+
+    # người gọi đã ghi trong giao dịch trước khi trừ tồn
+    db.session.execute(insert(HoaDonNhap), [dict(
+        id_hoa_don_nhap="N1", id_san_pham="SP003", id_kho="K1",
+        so_san_pham_nhap=4, gia_nhap=1, ngay_nhap=datetime(2026, 1, 1))])
+    apply_deltas([("K1", "SP003", 4)])
+    with pytest.raises(InsufficientStock) as e:
+        apply_deltas([("K1", "SP001", -3), ("K1", "SP002", -5)])
+    assert (e.value.id_san_pham, e.value.ton) == ("SP002", 1)
+
+    # chỉ câu trừ tồn bị hoàn lại; phần của người gọi còn nguyên tới khi họ rollback
+    assert _ton() == {"SP001": 10, "SP002": 1, "SP003": 4}
+    assert db.session.get(HoaDonNhap, ("N1", "SP003", "K1")) is not None
+    db.session.rollback()
+    assert _ton() == {"SP001": 10, "SP002": 1}
+
+
+def _seed_transfer():
+    db.session.add_all([Kho(id_kho=k, ten_kho=f"Kho {k}") for k in ("K1", "K2")])
+    db.session.add_all([SanPham(id_san_pham=f"SP00{i}", ten_san_pham=f"SP {i}") for i in (1, 2)])
+    apply_deltas([("K1", "SP001", 10), ("K1", "SP002", 3), ("K2", "SP001", 1)])
+    db.session.commit()
+
+
+def _ton_kho():
+    return {(k, sp): q for k, sp, q in db.session.execute(
+        select(TonKho.id_kho, TonKho.id_san_pham, TonKho.so_luong))}
+
+
+def test_transfer_merges_duplicate_lines_and_drops_non_positive(app):
+    _seed_transfer()
+    qty = transfer("K1", "K2", [("SP001", 2), ("SP001", "3"), ("SP002", 0), ("SP002", -1)])
+    db.session.commit()
+    assert qty == {"SP001": 5}
+    assert _ton_kho() == {("K1", "SP001"): 5, ("K1", "SP002"): 3, ("K2", "SP001"): 6}
+    assert transfer("K1", "K2", [("SP002", 0)]) == {}
+
+
+def test_transfer_shortfall_leaves_both_khos_untouched(app):
+    _seed_transfer()
+    before = _ton_kho()
+    with pytest.raises(InsufficientStock) as e:
+        transfer("K1", "K2", [("SP001", 4), ("SP002", 2), ("SP002", 2)])
+    assert (e.value.id_kho, e.value.id_san_pham, e.value.ton, e.value.yeu_cau) == ("K1", "SP002", 3, 4)
+    # kiểm tra đủ hàng trước khi ghi: chưa dòng nào bị trừ / cộng, kể cả trước rollback
+    assert _ton_kho() == before
+    db.session.rollback()
+    assert _ton_kho() == before
+
+
+def test_transfer_to_same_kho_is_rejected(app):
+    _seed_transfer()
+    before = _ton_kho()
+    with pytest.raises(ValueError):
+        transfer("K1", "K1", [("SP001", 2)])
+    assert _ton_kho() == before
@@ -0,0 +1,41 @@
+import html
+import re
+
+from models import db, SanPham
+from stock_engine import apply_deltas
+
+
+def _seed_stock(n):
+    db.session.add_all([SanPham(id_san_pham=f"SQ{i:03d}", ten_san_pham=f"SP {i}") for i in range(n)])
+    apply_deltas([("K1", f"SQ{i:03d}", i % 4 + 1) for i in range(n)])
+    db.session.commit()
+
+
+def _ids(body):
+    return re.findall(r"<td>(SQ\d{3})</td>", body)
+
+
+def test_bad_cursor_falls_back_to_first_page(login):
+    _seed_stock(5)
+    c = login()
+    first = c.get("/stock?sort=K1")
+    r = c.get("/stock?sort=K1&after=abc&after_id=SP010")
+    assert r.status_code == 200
+    assert _ids(r.get_data(as_text=True)) == _ids(first.get_data(as_text=True))
+
+
+def test_next_page_walk_visits_every_row_once(login, seeded):
+    _seed_stock(11)
+    seeded.config["STOCK_PAGE_SIZE"] = 4
+    c = login()
+    url, seen, pages = "/stock?sort=K1&dir=desc", [], 0
+    while url:
+        body = c.get(url).get_data(as_text=True)
+        seen += _ids(body)
+        m = re.search(r'href="([^"]*after_id[^"]*)">Trang sau', body)
+        url = html.unescape(m.group(1)) if m else None
+        pages += 1
+    assert pages == 3
+    assert sorted(seen) == [f"SQ{i:03d}" for i in range(11)]
+    qty = {f"SQ{i:03d}": i % 4 + 1 for i in range(11)}
+    assert [qty[s] for s in seen] == sorted(qty.values(), reverse=True)
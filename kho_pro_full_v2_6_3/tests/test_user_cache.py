@@ -0,0 +1,70 @@
+from sqlalchemy import select
+
+from app import create_app
+from config import Config
+from models import db, User
+import passwords
+import user_cache
+
+
+def _nv1():
+    return db.session.execute(select(User).where(User.username == "nv1")).scalar_one()
+
+
+def test_role_change_seen_on_next_request(login, seeded):
+    c = login("nv1", "123456")
+    assert "Kho K2" not in c.get("/stock").get_data(as_text=True)
+
+    with seeded.test_request_context("/", method="POST"):
+        _nv1().role = "admin"
+        db.session.commit()
+
+    # cùng tiến trình: after_commit xóa cache, request sau đọc lại user
+    assert "Kho K2" in c.get("/stock").get_data(as_text=True)
+
+
+def test_password_change_bumps_version_and_drops_cache(login, seeded):
+    c = login("nv1", "123456")
+    uid = _nv1().id
+    with seeded.test_request_context("/"):
+        assert user_cache.load(uid).role == "staff"
+        before = user_cache._version(user_cache._state())
+
+    r = c.post("/account/password", data={"current_password": "123456", "new_password": "moi123456",
+                                          "confirm_password": "moi123456"})
+    assert r.status_code == 302
+    ext = user_cache._state()
+    assert ext["user_cache_version"]["version"] is None
+    with seeded.test_request_context("/"):
+        assert user_cache._version(ext) > before
+    assert passwords.verify(_nv1().password_hash, "moi123456")
+
+
+def test_other_process_sees_change_after_check_interval(seeded):
+    """Tiến trình thứ hai = app thứ hai trên cùng DB (cache nằm trong app.extensions)."""
+    class Other(Config):
+        TESTING = True
+        SQLALCHEMY_DATABASE_URI = seeded.config["SQLALCHEMY_DATABASE_URI"]
+        SQLALCHEMY_BINDS = {}
+        PASSWORD_HASH_WORKERS = 0
+        USER_CACHE_CHECK_SECONDS = 5
+
+    other = create_app(Other)
+    uid = _nv1().id
+    with other.test_request_context("/"):
+        assert user_cache.load(uid).role == "staff"
+        db.session.remove()
+
+    with seeded.test_request_context("/", method="POST"):
+        _nv1().role = "admin"
+        db.session.commit()
+
+    with other.test_request_context("/"):
+        # chưa tới lần đọc phiên bản kế tiếp: vẫn là bản cũ (độ trễ tối đa giữa các worker)
+        assert user_cache.load(uid).role == "staff"
+        # giả lập đã qua USER_CACHE_CHECK_SECONDS giây
+        user_cache._state()["user_cache_version"]["checked"] -= other.config["USER_CACHE_CHECK_SECONDS"]
+        assert user_cache.load(uid).role == "admin"
+        db.session.remove()
+    with other.app_context():
+        db.engine.dispose()
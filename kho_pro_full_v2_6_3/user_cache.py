@@ -0,0 +1,120 @@
+"""Cache trong tiến trình cho người dùng đăng nhập (load_user của Flask-Login).
+
+Trước đây mỗi request đã đăng nhập (kể cả AJAX, SSE nối lại) đều
+`db.session.get(User, id)` chỉ để biết vai trò / kho được phân. Ở đây:
+  * giữ bản gọn CachedUser (không phải object ORM, dùng được qua nhiều phiên),
+    LRU + TTL như ref_cache (USER_CACHE_TTL, USER_CACHE_MAX_ENTRIES);
+  * phiên bản "users" trong `phien_ban_du_lieu` tăng khi một dòng users bị sửa /
+    xóa qua ORM (đổi mật khẩu, `flask set-password`, băm lại khi đăng nhập, đổi
+    vai trò / kho): worker khác thấy thay đổi trong USER_CACHE_CHECK_SECONDS giây;
+  * phiên bản chỉ được đọc lại tối đa mỗi USER_CACHE_CHECK_SECONDS giây cho cả
+    tiến trình, nên request bình thường không tốn câu SQL nào để xác định người dùng.
+Sửa bảng users bằng SQL tay thì chờ hết TTL (hoặc khởi động lại worker).
+"""
+import threading
+import time
+
+from flask import current_app, has_app_context
+from flask_login import UserMixin
+from sqlalchemy import event, select
+
+from models import db, User
+from ref_cache import RefCache, phien_ban, bump_version
+from db_routing import RoutingSession
+
+VERSION_KEY = "users"
+_lock = threading.Lock()
+
+
+class CachedUser(UserMixin):
+    """Các cột của User mà view / template dùng; đọc-only."""
+
+    def __init__(self, id, username, full_name, role, assigned_kho):
+        self.id = id
+        self.username = username
+        self.full_name = full_name
+        self.role = role
+        self.assigned_kho = assigned_kho
+
+    @property
+    def is_admin(self) -> bool:
+        return self.role == 'admin'
+
+    @property
+    def is_staff(self) -> bool:
+        return self.role == 'staff'
+
+    def allowed_khos(self):
+        """Danh sách id_kho mà user được thao tác (dùng cho lọc query)."""
+        if self.is_admin:
+            return None  # None = tất cả
+        return [self.assigned_kho] if self.assigned_kho else []
+
+    def __repr__(self) -> str:
+        return f"<CachedUser {self.username} ({self.role})>"
+
+
+def _state():
+    ext = current_app.extensions
+    if "user_cache" not in ext:
+        with _lock:
+            if "user_cache" not in ext:
+                cfg = current_app.config
+                ext["user_cache_version"] = {"version": None, "checked": 0.0}
+                # mỗi mục là tuple 1 phần tử để dùng chung RefCache (max_rows tính theo len)
+                ext["user_cache"] = RefCache(ttl=cfg.get("USER_CACHE_TTL", 300),
+                                             max_entries=cfg.get("USER_CACHE_MAX_ENTRIES", 1000),
+                                             max_rows=1)
+    return ext
+
+
+def _version(ext):
+    st = ext["user_cache_version"]
+    now = time.monotonic()
+    if st["version"] is None or now - st["checked"] >= current_app.config.get("USER_CACHE_CHECK_SECONDS", 5):
+        st["version"] = db.session.execute(
+            select(phien_ban.c.phien_ban).where(phien_ban.c.ten_bang == VERSION_KEY)
+        ).scalar() or 0
+        st["checked"] = now
+    return st["version"]
+
+
+def load(user_id):
+    """CachedUser theo id (None nếu không còn tồn tại)."""
+    ext = _state()
+    version = _version(ext)
+    cache = ext["user_cache"]
+    hit = cache.get(user_id, version)
+    if hit is not None:
+        return hit[0]
+    row = db.session.execute(
+        select(User.id, User.username, User.full_name, User.role, User.assigned_kho).where(User.id == user_id)
+    ).first()
+    if row is None:
+        return None
+    u = CachedUser(*row)
+    cache.put(user_id, version, (u,))
+    return u
+
+
+@event.listens_for(RoutingSession, "before_flush")
+def _bump_on_user_change(session, flush_context, instances):
+    changed = [o for o in session.deleted if isinstance(o, User)]
+    changed += [o for o in session.dirty if isinstance(o, User) and session.is_modified(o)]
+    if changed:
+        bump_version(VERSION_KEY, session=session)
+        session.info["users_changed"] = True
+
+
+@event.listens_for(RoutingSession, "after_commit")
+def _drop_local(session):
+    # tiến trình vừa ghi bỏ cache ngay, không chờ lần đọc phiên bản kế tiếp
+    if session.info.pop("users_changed", False) and has_app_context():
+        ext = _state()
+        ext["user_cache"].clear()
+        ext["user_cache_version"]["version"] = None
+
+
+@event.listens_for(RoutingSession, "after_rollback")
+def _forget_change(session):
+    session.info.pop("users_changed", None)
@@ -0,0 +1,11 @@
+"""Blueprint theo khu vực; register(app) gắn tất cả vào app (gọi từ create_app)."""
+from views import auth, catalog, inventory, reports, master_data
+from views.common import inject_role_helpers
+
+BLUEPRINTS = (auth.bp, catalog.bp, inventory.bp, reports.bp, master_data.bp)
+
+
+def register(app):
+    for bp in BLUEPRINTS:
+        app.register_blueprint(bp)
+    app.context_processor(inject_role_helpers)
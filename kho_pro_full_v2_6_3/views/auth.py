@@ -0,0 +1,85 @@
+"""Đăng nhập / đăng xuất / đổi mật khẩu."""
+
+from flask import Blueprint, render_template, redirect, url_for, request, flash
+from flask_login import login_user, login_required, logout_user, current_user
+
+from models import db, User
+import passwords
+
+bp = Blueprint("auth", __name__)
+
+@bp.route("/")
+@login_required
+def home():
+    return redirect(url_for("reports.home_page"))
+
+# ---- Auth ----
+@bp.route("/login", methods=["GET", "POST"])
+def login():
+    if request.method == "POST":
+        username = request.form.get("username", "").strip()
+        password = request.form.get("password", "")
+        key = passwords.fail_key(username, request.remote_addr)
+        wait = passwords.blocked_for(key)
+        if wait:
+            flash(f"Sai mật khẩu quá nhiều lần, thử lại sau {wait} giây", "danger")
+            return render_template("login.html"), 429
+        u = User.query.filter_by(username=username).first()
+        try:
+            ok = u is not None and passwords.verify(u.password_hash, password)
+        except passwords.HashBusy:
+            flash("Hệ thống đang bận, vui lòng thử lại sau ít giây", "warning")
+            return render_template("login.html"), 503
+        if ok:
+            passwords.record_success(key)
+            _upgrade_hash(u, password)
+            login_user(u)
+            flash("Đăng nhập thành công!", "success")
+            return redirect(url_for("reports.home_page"))
+        passwords.record_failure(key)
+        flash("Sai tài khoản hoặc mật khẩu", "danger")
+    return render_template("login.html")
+
+def _upgrade_hash(u, password):
+    """Băm lại theo PASSWORD_HASH_METHOD hiện tại nếu hash cũ dùng tham số khác."""
+    try:
+        if passwords.needs_rehash(u.password_hash):
+            u.password_hash = passwords.hash_password(password)
+            db.session.commit()
+    except passwords.HashBusy:
+        pass  # để lần đăng nhập sau
+
+@bp.route("/logout")
+@login_required
+def logout():
+    logout_user()
+    flash("Đã đăng xuất", "info")
+    return redirect(url_for("auth.login"))
+
+@bp.route("/account/password", methods=["GET", "POST"])
+@login_required
+def change_password():
+    if request.method == "POST":
+        cur = request.form.get("current_password", "")
+        new = request.form.get("new_password", "")
+        cfm = request.form.get("confirm_password", "")
+        u = db.session.get(User, current_user.id)
+        try:
+            ok = passwords.verify(u.password_hash, cur)
+        except passwords.HashBusy:
+            flash("Hệ thống đang bận, vui lòng thử lại sau ít giây", "warning")
+            return render_template("change_password.html"), 503
+        if not ok:
+            flash("Mật khẩu hiện tại không đúng", "danger")
+            return render_template("change_password.html")
+        if len(new) < 6:
+            flash("Mật khẩu mới phải ≥ 6 ký tự", "warning")
+            return render_template("change_password.html")
+        if new != cfm:
+            flash("Xác nhận mật khẩu không khớp", "warning")
+            return render_template("change_password.html")
+        u.password_hash = passwords.hash_password(new)
+        db.session.commit()
+        flash("Đã đổi mật khẩu thành công", "success")
+        return redirect(url_for("catalog.products"))
+    return render_template("change_password.html")
@@ -0,0 +1,196 @@
+"""Sản phẩm (danh sách, thêm / sửa / xóa) và API gợi ý SP / KH cho form."""
+
+from flask import (
+    Blueprint, current_app, render_template, redirect, url_for, request, flash, jsonify,
+)
+from flask_login import login_required, current_user
+from sqlalchemy import func, select, or_, null
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SanPham, TonKho, KhachHang
+from sequences import next_code, claim
+from search import apply_search, paginate
+
+from views.common import is_staff, limit_khos_for_user, enforce_staff_kho
+
+bp = Blueprint("catalog", __name__)
+
+# ---- Sản phẩm ----
+@bp.route("/products")
+@login_required
+def products():
+    q = (request.args.get("q", "") or "").strip()
+    selected_kho_req = request.args.get("kho", "ALL")
+
+    selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+    khos = limit_khos_for_user()
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    page = request.args.get("page", 1, type=int)
+
+    query = db.session.query(SanPham)
+    if selected_kho != "ALL":
+        query = query.join(
+            TonKho,
+            (TonKho.id_san_pham == SanPham.id_san_pham) & (TonKho.id_kho == selected_kho),
+        ).filter(TonKho.so_luong > 0)
+
+    query, ranked = apply_search(query, "san_pham", q)
+    if not ranked:
+        query = query.order_by(SanPham.id_san_pham)
+    items, has_next = paginate(query, page, current_app.config.get("SEARCH_PAGE_SIZE", 50))
+
+    # tồn chỉ cho các SP của trang hiện tại
+    ids = [sp.id_san_pham for sp in items]
+    ton_q = db.session.query(TonKho.id_san_pham, func.coalesce(func.sum(TonKho.so_luong), 0))\
+                      .filter(TonKho.id_san_pham.in_(ids))
+    if selected_kho != "ALL":
+        ton_q = ton_q.filter(TonKho.id_kho == selected_kho)
+    ton_map = {k: int(v or 0) for k, v in ton_q.group_by(TonKho.id_san_pham).all()} if ids else {}
+
+    return render_template(
+        "products.html",
+        items=items,
+        q=q,
+        page=page,
+        has_next=has_next,
+        khos=khos,
+        selected_kho=selected_kho,
+        ton_map=ton_map,
+    )
+
+@bp.route("/products/create", methods=["GET", "POST"])
+@login_required
+def create_product():
+    def norm(v):
+        if v is None: return None
+        v = v.strip()
+        return None if v == "" or v.lower() == "none" else v
+
+    if request.method == "POST":
+        sp = SanPham(
+            id_san_pham=((request.form.get("id_san_pham") or "").strip() or next_code("SP")),
+            ten_san_pham=request.form["ten_san_pham"].strip(),
+            chat_lieu=norm(request.form.get("chat_lieu")),
+            mau=norm(request.form.get("mau")),
+        )
+        db.session.add(sp)
+        claim("SP", [request.form.get("id_san_pham")])
+        db.session.commit()
+        flash(f"Đã thêm sản phẩm {sp.id_san_pham}", "success")
+        return redirect(url_for("catalog.products"))
+    return render_template("product_form.html", item=None)
+
+@bp.route("/products/<id>/edit", methods=["GET", "POST"])
+@login_required
+def edit_product(id):
+    item = db.session.get(SanPham, id)
+    if not item:
+        flash("Không tìm thấy sản phẩm", "warning")
+        return redirect(url_for("catalog.products"))
+
+    def norm(v):
+        if v is None: return None
+        v = v.strip()
+        return None if v == "" or v.lower() == "none" else v
+
+    if request.method == "POST":
+        item.ten_san_pham = request.form["ten_san_pham"].strip()
+        item.chat_lieu = norm(request.form.get("chat_lieu"))
+        item.mau = norm(request.form.get("mau"))
+        db.session.commit()
+        flash("Đã cập nhật", "success")
+        return redirect(url_for("catalog.products"))
+    return render_template("product_form.html", item=item, next_id=item.id_san_pham)
+
+@bp.route("/products/<id>/delete", methods=["POST"])
+@login_required
+def delete_product(id):
+    if is_staff():
+        flash("Bạn không có quyền xoá sản phẩm.", "warning")
+        return redirect(url_for("catalog.products"))
+
+    sp = SanPham.query.get(id)
+    if sp:
+        try:
+            db.session.delete(sp)
+            db.session.commit()
+            flash("Đã xóa sản phẩm thành công.", "success")
+        except IntegrityError:
+            db.session.rollback()
+            flash("Không thể xóa sản phẩm vì đã có dữ liệu liên quan.", "danger")
+    return redirect(url_for("catalog.products"))
+
+
+# ==== GỢI Ý (TYPEAHEAD) CHO FORM ====
+def _typeahead_args():
+    """q, after (mã cuối trang trước), limit đã chặn trần."""
+    q = (request.args.get("q") or "").strip()
+    after = (request.args.get("after") or "").strip() or None
+    limit = request.args.get("limit", type=int) or current_app.config.get("TYPEAHEAD_LIMIT", 20)
+    limit = max(1, min(limit, current_app.config.get("TYPEAHEAD_MAX_LIMIT", 50)))
+    return q, after, limit
+
+def _prefix_like(col, q):
+    """col LIKE 'q%' (dùng được index), thoát ký tự đại diện trong q."""
+    q = q.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return col.like(q + "%", escape="\\")
+
+def _typeahead_page(stmt, key_col, after, limit, to_item):
+    """Phân trang keyset theo mã: lấy limit+1 dòng để biết còn trang sau không."""
+    if after:
+        stmt = stmt.where(key_col > after)
+    rows = db.session.execute(stmt.order_by(key_col).limit(limit + 1)).all()
+    items = [to_item(r) for r in rows[:limit]]
+    nxt = items[-1]["id"] if len(rows) > limit else None
+    return {"items": items, "next": nxt}
+
+@bp.route("/api/goi-y/san-pham")
+@login_required
+def goi_y_san_pham():
+    """Top N sản phẩm khớp tiền tố mã/tên; có `kho` thì chỉ lấy SP còn tồn ở kho đó."""
+    q, after, limit = _typeahead_args()
+    kho = (request.args.get("kho") or "").strip()
+    if is_staff() and kho:
+        kho = current_user.assigned_kho or ""
+
+    if kho and kho != "ALL":
+        stmt = (
+            select(SanPham.id_san_pham, SanPham.ten_san_pham, TonKho.so_luong)
+            .join(TonKho, (TonKho.id_san_pham == SanPham.id_san_pham) & (TonKho.id_kho == kho))
+            .where(TonKho.so_luong > 0)
+        )
+    else:
+        stmt = select(SanPham.id_san_pham, SanPham.ten_san_pham, null())
+    if q:
+        stmt = stmt.where(or_(_prefix_like(SanPham.id_san_pham, q),
+                              _prefix_like(SanPham.ten_san_pham, q)))
+
+    def to_item(r):
+        text = f"{r[0]} - {r[1]}" + (f" (tồn {r[2]})" if r[2] is not None else "")
+        return {"id": r[0], "text": text, "ton": r[2]}
+
+    return jsonify(_typeahead_page(stmt, SanPham.id_san_pham, after, limit, to_item))
+
+@bp.route("/api/goi-y/khach-hang")
+@login_required
+def goi_y_khach_hang():
+    """Top N khách hàng khớp tiền tố mã / họ / tên / số điện thoại."""
+    q, after, limit = _typeahead_args()
+    stmt = select(KhachHang.id_khach_hang, KhachHang.ho, KhachHang.ten_dem,
+                  KhachHang.ten, KhachHang.so_dien_thoai)
+    if q:
+        stmt = stmt.where(or_(
+            _prefix_like(KhachHang.id_khach_hang, q),
+            _prefix_like(KhachHang.ten, q),
+            _prefix_like(KhachHang.ho, q),
+            _prefix_like(KhachHang.so_dien_thoai, q),
+        ))
+
+    def to_item(r):
+        ten = " ".join(x for x in (r[1], r[2], r[3]) if x) or "KH không tên"
+        text = f"{r[0]} - {ten}" + (f" - {r[4]}" if r[4] else "")
+        return {"id": r[0], "text": text}
+
+    return jsonify(_typeahead_page(stmt, KhachHang.id_khach_hang, after, limit, to_item))
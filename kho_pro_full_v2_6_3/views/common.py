@@ -0,0 +1,216 @@
+"""Hàm dùng chung của các blueprint: quyền theo vai trò / kho, đọc tham số lọc."""
+
+from datetime import datetime, timedelta
+
+from flask_login import current_user
+from sqlalchemy import func, select, or_
+from sqlalchemy.exc import ProgrammingError, OperationalError
+
+from models import db, HoaDonNhap, HoaDonXuat, TonKho, DieuChuyen, DieuChuyenCT
+from ref_cache import ref_rows
+
+# Map username -> mã nhân viên
+USERNAME_TO_NV = {
+    "nv1": "NV001",
+    "nv2": "NV002",
+    "nv3": "NV003",
+}
+
+# -----------------------------------------------------------------------------
+# Helpers
+# -----------------------------------------------------------------------------
+def is_admin():
+    return (getattr(current_user, "role", None) == "admin")
+
+def is_staff():
+    return (getattr(current_user, "role", None) == "staff")
+
+def user_kho():
+    if is_staff():
+        return current_user.assigned_kho
+    return None
+
+def limit_khos_for_user():
+    if is_admin():
+        return list(ref_rows("kho"))
+    if current_user.is_authenticated and current_user.assigned_kho:
+        return [k for k in ref_rows("kho") if k.id_kho == current_user.assigned_kho]
+    return []
+
+def enforce_staff_kho(selected_kho: str | None, allow_all: bool = False) -> str:
+    if is_admin():
+        return selected_kho if selected_kho else ("ALL" if allow_all else "")
+    return current_user.assigned_kho or ""
+
+def get_ton_kho_dict(id_kho=None):
+    """Đọc nhanh tồn kho; nếu thiếu bảng TonKho thì fallback theo N-X."""
+    try:
+        q = db.session.query(TonKho.id_san_pham, func.sum(TonKho.so_luong))
+        if id_kho and id_kho != "ALL":
+            q = q.filter(TonKho.id_kho == id_kho)
+        rows = q.group_by(TonKho.id_san_pham).all()
+        return {k: int(v or 0) for k, v in rows}
+    except (ProgrammingError, OperationalError):
+        db.session.rollback()
+        qn = db.session.query(HoaDonNhap.id_san_pham, func.sum(HoaDonNhap.so_san_pham_nhap))
+        qx = db.session.query(HoaDonXuat.id_san_pham, func.sum(HoaDonXuat.so_san_pham_xuat))
+        if id_kho and id_kho != "ALL" and hasattr(HoaDonNhap, "id_kho"):
+            qn = qn.filter(HoaDonNhap.id_kho == id_kho)
+        if id_kho and id_kho != "ALL" and hasattr(HoaDonXuat, "id_kho"):
+            qx = qx.filter(HoaDonXuat.id_kho == id_kho)
+        dn = {k: int(v or 0) for k, v in qn.group_by(HoaDonNhap.id_san_pham).all()}
+        dx = {k: int(v or 0) for k, v in qx.group_by(HoaDonXuat.id_san_pham).all()}
+        ids = set(dn) | set(dx)
+        return {i: dn.get(i, 0) - dx.get(i, 0) for i in ids}
+
+def _read_invoice_lines(d, price_field, price_required=True):
+    """Đọc các dòng id_sp[] / so_luong[] / <price_field>[] của phiếu nhiều dòng.
+
+    Vẫn nhận form cũ một dòng (id_sp / so_luong / <price_field>).
+    Dòng trùng sản phẩm cùng giá được gộp số lượng (PK hóa đơn gồm id_san_pham).
+    """
+    sp_ids = d.getlist("id_sp[]") or d.getlist("id_sp")
+    sl_list = d.getlist("so_luong[]") or d.getlist("so_luong")
+    gia_list = d.getlist(f"{price_field}[]") or d.getlist(price_field)
+
+    lines = {}
+    for i, sp in enumerate(sp_ids):
+        sp = (sp or "").strip()
+        if not sp:
+            continue
+        qty = int(sl_list[i]) if i < len(sl_list) and sl_list[i] else 0
+        if qty <= 0:
+            raise ValueError(f"Số lượng dòng {i + 1} ({sp}) phải > 0.")
+        raw_gia = gia_list[i] if i < len(gia_list) else ""
+        if not raw_gia and price_required:
+            raise ValueError(f"Thiếu giá ở dòng {i + 1} ({sp}).")
+        gia = float(raw_gia or 0)
+        if sp in lines:
+            old_qty, old_gia = lines[sp]
+            if old_gia != gia:
+                raise ValueError(f"Sản phẩm {sp} bị lặp với giá khác nhau.")
+            qty += old_qty
+        lines[sp] = (qty, gia)
+
+    if not lines:
+        raise ValueError("Chưa chọn sản phẩm / số lượng hợp lệ.")
+    return [(sp, qty, gia) for sp, (qty, gia) in lines.items()]
+
+def _parse_date_arg(s, end=False):
+    """Đọc ?from= / ?to= (YYYY-MM-DD hoặc YYYY-MM-DDTHH:MM); rỗng -> 30 ngày gần nhất."""
+    if not s:
+        d = datetime.now() - (timedelta(days=29) if not end else timedelta(0))
+        if end:
+            d = datetime.now()
+        return d.replace(hour=(23 if end else 0), minute=(59 if end else 0), second=59)
+    try:
+        if "T" in s:
+            dt = datetime.strptime(s, "%Y-%m-%dT%H:%M")
+        else:
+            dt = datetime.strptime(s, "%Y-%m-%d")
+        if "T" not in s:
+            dt = dt.replace(hour=(23 if end else 0), minute=(59 if end else 0), second=59)
+        return dt
+    except:
+        return None
+
+def _date_range_conds(col, args):
+    """Điều kiện khoảng ngày cho lịch sử: chỉ lọc khi người dùng nhập from/to."""
+    conds = []
+    if args.get("from"):
+        fdt = _parse_date_arg(args["from"], end=False)
+        if fdt:
+            conds.append(col >= fdt)
+    if args.get("to"):
+        tdt = _parse_date_arg(args["to"], end=True)
+        if tdt:
+            conds.append(col <= tdt)
+    return conds
+
+def _nhap_hist_filters(args):
+    """Điều kiện lọc lịch sử nhập (quyền + bộ lọc trên trang), dùng chung cho export."""
+    # Staff: chỉ lọc theo NCC; Admin: có thể lọc thêm theo NV và Kho
+    f_ncc = (args.get("f_ncc") or "").strip()
+    f_nv  = (args.get("f_nv")  or "").strip()  # dùng cho admin
+    f_kho = (args.get("f_kho") or "ALL").strip()  # dùng cho admin
+
+    conds = []
+    if is_staff():
+        # Staff thấy TẤT CẢ phiếu trong kho được gán (kể cả NV000)
+        conds.append(HoaDonNhap.id_kho == current_user.assigned_kho)
+    else:
+        # Admin optional filter
+        if f_nv:
+            conds.append(HoaDonNhap.id_nhan_vien == f_nv)
+        if f_kho and f_kho != "ALL":
+            conds.append(HoaDonNhap.id_kho == f_kho)
+
+    if f_ncc:
+        conds.append(HoaDonNhap.id_nha_cung_cap == f_ncc)
+    conds += _date_range_conds(HoaDonNhap.ngay_nhap, args)
+
+    return conds, dict(f_ncc=f_ncc, f_nv=f_nv, f_kho=f_kho,
+                       date_from=args.get("from", ""), date_to=args.get("to", ""))
+
+def _xuat_hist_filters(args):
+    """Điều kiện lọc lịch sử xuất (quyền + bộ lọc trên trang), dùng chung cho export."""
+    f_xe = (args.get("f_xe") or "").strip()
+    f_kh = (args.get("f_kh") or "").strip()
+    if is_staff():
+        f_nv  = USERNAME_TO_NV.get(current_user.username.lower()) or ""
+        f_kho = current_user.assigned_kho
+    else:
+        f_nv  = (args.get("f_nv")  or "").strip()
+        f_kho = (args.get("f_kho") or "ALL").strip()
+
+    conds = []
+    if is_staff():
+        # staff: luôn bó theo kho của mình
+        conds.append(HoaDonXuat.id_kho == current_user.assigned_kho)
+        # hiển thị cả phiếu có id_nhan_vien = NV của mình HOẶC NULL (các phiếu cũ)
+        nv_self = USERNAME_TO_NV.get(current_user.username.lower())
+        if nv_self:
+            conds.append(or_(HoaDonXuat.id_nhan_vien == nv_self,
+                             HoaDonXuat.id_nhan_vien.is_(None)))
+    else:
+        if f_nv:
+            conds.append(HoaDonXuat.id_nhan_vien == f_nv)
+        if f_kho and f_kho != "ALL":
+            conds.append(HoaDonXuat.id_kho == f_kho)
+
+    if f_xe:
+        conds.append(HoaDonXuat.id_xe_van_chuyen == f_xe)
+    if f_kh:
+        conds.append(HoaDonXuat.id_khach_hang == f_kh)
+    conds += _date_range_conds(HoaDonXuat.ngay_xuat, args)
+
+    return conds, dict(f_nv=f_nv, f_xe=f_xe, f_kh=f_kh, f_kho=f_kho,
+                       date_from=args.get("from", ""), date_to=args.get("to", ""))
+
+def _dc_hist_filters(args):
+    """Điều kiện lọc lịch sử điều chuyển (kho nguồn / đích / SP / ngày), dùng chung cho export."""
+    f_src = (args.get("f_src") or "").strip()
+    f_dst = (args.get("f_dst") or "").strip()
+    f_kho = (args.get("f_kho") or "ALL").strip()  # kho ở một trong hai đầu
+    f_sp  = (args.get("f_sp")  or "").strip()
+
+    conds = []
+    if f_src:
+        conds.append(DieuChuyen.kho_nguon == f_src)
+    if f_dst:
+        conds.append(DieuChuyen.kho_dich == f_dst)
+    if f_kho and f_kho != "ALL":
+        conds.append(or_(DieuChuyen.kho_nguon == f_kho, DieuChuyen.kho_dich == f_kho))
+    if f_sp:
+        # tra theo PK (id_dieu_chuyen, id_san_pham) của chi tiết
+        conds.append(select(DieuChuyenCT.id_san_pham)
+                     .where(DieuChuyenCT.id_dieu_chuyen == DieuChuyen.id_dieu_chuyen,
+                            DieuChuyenCT.id_san_pham == f_sp)
+                     .correlate(DieuChuyen).exists())
+    conds += _date_range_conds(DieuChuyen.ngay_dc, args)
+
+    return conds, dict(f_src=f_src, f_dst=f_dst, f_kho=f_kho, f_sp=f_sp,
+                       date_from=args.get("from", ""), date_to=args.get("to", ""))
+
+def inject_role_helpers():
+    return dict(IS_ADMIN=is_admin(), IS_STAFF=is_staff(), ASSIGNED_KHO=user_kho())
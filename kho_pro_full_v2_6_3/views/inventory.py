@@ -0,0 +1,672 @@
+"""Tồn kho, cảnh báo, nhập / xuất / điều chuyển, luồng sự kiện + API tồn, nhập hàng loạt."""
+
+from datetime import datetime, timedelta
+import time
+
+from flask import (
+    Blueprint, current_app, render_template, redirect, url_for, request, flash, jsonify,
+    Response,
+)
+from flask_login import login_required, current_user
+from sqlalchemy import func, insert, select, update, or_, and_, case
+
+from models import db, SanPham, HoaDonNhap, HoaDonXuat, TonKho, DieuChuyen, DieuChuyenCT, CanhBaoTon
+from stock_engine import apply_deltas, transfer, run_tx, InsufficientStock
+from bulk_import import import_invoices
+from sequences import next_code, claim
+from ref_cache import ref_rows
+from rollup import record_nhap, record_xuat
+import costing
+import kpi
+import alerts
+import events
+import stock_api
+import ledger
+
+from views.common import (
+    USERNAME_TO_NV, is_admin, is_staff, limit_khos_for_user, enforce_staff_kho,
+    _read_invoice_lines, _nhap_hist_filters, _xuat_hist_filters, _dc_hist_filters,
+)
+
+bp = Blueprint("inventory", __name__)
+
+# ---- Stock ----
+STOCK_FILTERS = {
+    "con": "Còn hàng",
+    "thap": "Sắp hết (≤ ngưỡng)",
+    "het": "Hết hàng",
+    "am": "Âm kho",
+    "all": "Tất cả",
+}
+
+def _stock_matrix(kho_ids, loc, sort, desc, after, limit):
+    """Pivot ton_kho thành ma trận SP × kho bằng MỘT truy vấn GROUP BY, phân trang keyset.
+
+    sort: "" (mã SP) | "tong" | mã kho; after: (giá trị cột sắp, mã SP) của dòng cuối trang trước,
+    đã kiểm ở stock() (số nguyên khi sắp theo số lượng).
+    Trả về (rows, next_cursor); mỗi row: id_san_pham, ten_san_pham, k0..kn, tong.
+    """
+    key = SanPham.id_san_pham
+    cells = [
+        func.coalesce(func.sum(case((TonKho.id_kho == k, TonKho.so_luong), else_=0)), 0)
+        for k in kho_ids
+    ]
+    total = func.coalesce(func.sum(TonKho.so_luong), 0)
+    stmt = (
+        select(key, SanPham.ten_san_pham,
+               *[c.label(f"k{i}") for i, c in enumerate(cells)], total.label("tong"))
+        .outerjoin(TonKho, (TonKho.id_san_pham == key) & TonKho.id_kho.in_(kho_ids))
+        .group_by(key, SanPham.ten_san_pham)
+    )
+
+    having = {
+        "con": total > 0,
+        "het": total == 0,
+        "am": func.min(TonKho.so_luong) < 0,
+        "thap": func.sum(case(((TonKho.so_luong > 0) & (TonKho.so_luong <= TonKho.nguong_canh_bao), 1),
+                              else_=0)) > 0,
+    }.get(loc)
+    if having is not None:
+        stmt = stmt.having(having)
+
+    sort_expr = total if sort == "tong" else (cells[kho_ids.index(sort)] if sort in kho_ids else None)
+    if sort_expr is None:
+        if after:
+            stmt = stmt.where(key < after[1] if desc else key > after[1])
+        stmt = stmt.order_by(key.desc() if desc else key)
+    else:
+        if after:
+            v = after[0]
+            stmt = stmt.having(or_(sort_expr < v if desc else sort_expr > v,
+                                   and_(sort_expr == v, key > after[1])))
+        stmt = stmt.order_by(sort_expr.desc() if desc else sort_expr, key)
+
+    rows = db.session.execute(stmt.limit(limit + 1)).all()
+    page, nxt = rows[:limit], None
+    if len(rows) > limit:
+        last = page[-1]
+        nxt = (last.tong if sort == "tong" else last[2 + kho_ids.index(sort)] if sort in kho_ids else "",
+               last.id_san_pham)
+    return page, nxt
+
+@bp.route("/stock")
+@login_required
+def stock():
+    selected_kho_req = request.args.get("kho", "ALL")
+    selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+    khos = limit_khos_for_user()
+
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    cols = khos if selected_kho == "ALL" else [k for k in khos if k.id_kho == selected_kho]
+    kho_ids = [k.id_kho for k in cols]
+
+    loc = request.args.get("loc", "con")
+    if loc not in STOCK_FILTERS:
+        loc = "con"
+    sort = request.args.get("sort", "")
+    if sort != "tong" and sort not in kho_ids:
+        sort = ""
+    desc = request.args.get("dir") == "desc"
+    # con trỏ từ URL: cột sắp theo số thì giá trị phải là số nguyên; hỏng -> về trang đầu
+    after_id = request.args.get("after_id")
+    after = None
+    if after_id:
+        try:
+            after = (int(request.args.get("after", "")) if sort else "", after_id)
+        except ValueError:
+            after = None
+
+    records, nxt = [], None
+    if kho_ids:
+        records, nxt = _stock_matrix(kho_ids, loc, sort, desc, after,
+                                     current_app.config.get("STOCK_PAGE_SIZE", 100))
+
+    return render_template("stock.html", records=records, khos=khos, cols=cols,
+                           selected_kho=selected_kho, loc=loc, sort=sort, desc=desc,
+                           next_cursor=nxt, paged=bool(after), filters=STOCK_FILTERS)
+
+# ---- Cảnh báo tồn thấp ----
+@bp.route("/canh-bao")
+@login_required
+def canh_bao():
+    selected_kho_req = request.args.get("kho", "ALL")
+    selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+    khos = limit_khos_for_user()
+
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    # chỉ đọc cảnh báo đang mở (alerts.py), không quét ton_kho
+    rows = db.session.execute(
+        alerts.active_query(selected_kho).order_by(CanhBaoTon.id_kho, CanhBaoTon.id_san_pham)
+    ).all()
+
+    return render_template("canh_bao.html", rows=rows, khos=khos, selected_kho=selected_kho)
+
+@bp.route("/canh-bao/nguong", methods=["POST"])
+@login_required
+def canh_bao_nguong():
+    """Admin đổi ngưỡng cảnh báo của một (kho, SP) rồi đối chiếu lại cảnh báo."""
+    d = request.form
+    if is_staff():
+        flash("Bạn không có quyền đổi ngưỡng cảnh báo.", "warning")
+        return redirect(url_for("inventory.canh_bao"))
+    id_kho, id_sp = d.get("id_kho", "").strip(), d.get("id_san_pham", "").strip()
+    try:
+        nguong = int(d.get("nguong", ""))
+        if nguong < 0:
+            raise ValueError
+    except ValueError:
+        flash("Ngưỡng cảnh báo phải là số nguyên không âm.", "warning")
+        return redirect(url_for("inventory.canh_bao", kho=d.get("kho") or "ALL"))
+
+    def _ghi():
+        res = db.session.execute(
+            update(TonKho.__table__)
+            .where(TonKho.id_kho == id_kho, TonKho.id_san_pham == id_sp)
+            .values(nguong_canh_bao=nguong)
+        )
+        if res.rowcount:
+            alerts.sync([(id_kho, id_sp)])
+        return res.rowcount
+
+    if run_tx(_ghi):
+        flash(f"Đã đặt ngưỡng {id_sp} tại kho {id_kho} = {nguong}.", "success")
+    else:
+        flash("Không tìm thấy dòng tồn kho.", "warning")
+    return redirect(url_for("inventory.canh_bao", kho=d.get("kho") or "ALL"))
+
+@bp.route("/api/canh-bao/dem")
+@login_required
+def canh_bao_dem():
+    """Số cảnh báo đang mở (badge trên menu); staff chỉ thấy kho của mình."""
+    kho = request.args.get("kho", "ALL")
+    if is_staff():
+        kho = current_user.assigned_kho or ""
+        if not kho:
+            return jsonify({"kho": None, "count": 0})
+    return jsonify({"kho": kho, "count": alerts.count_active(kho)})
+
+def _page_args():
+    """Tham số lọc hiện tại, bỏ con trỏ trang (cho link trang đầu / trang sau / export)."""
+    return {k: v for k, v in request.args.items() if k not in ledger.CURSOR_ARGS}
+
+@bp.route("/nhap-kho", methods=["GET", "POST"])
+@login_required
+def nhap_kho():
+    # ===== POST: lưu phiếu nhập =====
+    if request.method == "POST":
+        d = request.form
+        try:
+            id_kho = d["id_kho"].strip()
+            if is_staff():
+                if not current_user.assigned_kho:
+                    raise ValueError("Tài khoản chưa được gán kho làm việc.")
+                if id_kho != current_user.assigned_kho:
+                    raise ValueError(f"Bạn chỉ được nhập kho {current_user.assigned_kho}.")
+
+            lines = _read_invoice_lines(d, "gia_nhap")
+
+            # Gán NV: staff tự map theo username; admin chọn tự do
+            id_nhan_vien = (
+                USERNAME_TO_NV.get(current_user.username.lower())
+                if is_staff()
+                else (d.get("id_nv") or None)
+            )
+
+            id_nhap_tay = (d.get("id_hd") or "").strip()
+            id_hd = id_nhap_tay or next_code("N")
+            ngay = datetime.strptime(d["ngay"], "%Y-%m-%dT%H:%M")
+            id_ncc = d.get("id_ncc") or None
+            rows = [
+                dict(
+                    id_hoa_don_nhap=id_hd,
+                    id_san_pham=sp,
+                    id_kho=id_kho,
+                    so_san_pham_nhap=qty,
+                    gia_nhap=gia,
+                    ngay_nhap=ngay,
+                    id_nhan_vien=id_nhan_vien,
+                    id_nha_cung_cap=id_ncc,
+                )
+                for sp, qty, gia in lines
+            ]
+
+            def _ghi_phieu():
+                # 1 executemany cho các dòng hóa đơn + 1 upsert tồn cho cả phiếu
+                if id_nhap_tay:
+                    claim("N", [id_hd])
+                kpi.on_invoices("nhap", rows)
+                db.session.execute(insert(HoaDonNhap), rows)
+                apply_deltas((id_kho, sp, +qty) for sp, qty, _ in lines)
+                costing.receive((id_kho, sp, qty, gia, ngay) for sp, qty, gia in lines)
+                record_nhap((id_hd, sp, id_kho) for sp, _, _ in lines)
+
+            run_tx(_ghi_phieu)
+            flash(f"Đã ghi nhận nhập kho {id_hd} ({len(lines)} dòng)", "success")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Lỗi khi lưu: {e}", "danger")
+        return redirect(url_for("inventory.nhap_kho"))
+
+    # ===== GET: form & lịch sử =====
+    khos = limit_khos_for_user()
+
+    # Kho dùng cho FORM chọn sản phẩm
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+    else:
+        selected_kho_req = request.args.get("kho", "ALL")
+        selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+
+    # ---- Bộ lọc lịch sử ----
+    conds, flt = _nhap_hist_filters(request.args)
+    items, next_cursor, paged = ledger.page("nhap", conds, request.args)
+
+    # Dropdown NV cho FORM (chỉ admin cần)
+    if is_staff():
+        nvs = []
+        staff_nv_id = USERNAME_TO_NV.get(current_user.username.lower())
+        staff_nv_label = f"{staff_nv_id} - {(current_user.full_name or current_user.username)}"
+    else:
+        nvs = ref_rows("nhan_vien")
+        staff_nv_id = None
+        staff_nv_label = None
+
+    nccs = ref_rows("nha_cung_cap")
+    # Sản phẩm của FORM được gợi ý theo từng ký tự gõ (goi_y_san_pham)
+
+    return render_template(
+        "nhap_kho.html",
+        items=items,
+        nvs=nvs,
+        nccs=nccs,
+        khos=khos,
+        selected_kho=selected_kho,
+        staff_nv_label=staff_nv_label,
+        staff_nv_id=staff_nv_id,
+        next_cursor=next_cursor,
+        paged=paged,
+        page_args=_page_args(),
+        # giữ các giá trị lọc để set selected ở template
+        **flt,
+    )
+
+
+
+# ---- Xuất kho ----
+@bp.route("/xuat-kho", methods=["GET", "POST"])
+@login_required
+def xuat_kho():
+    # ===== POST: Lưu phiếu xuất =====
+    if request.method == "POST":
+        d = request.form
+        try:
+            id_kho = d["id_kho"].strip()
+            if is_staff():
+                if not current_user.assigned_kho:
+                    raise ValueError("Tài khoản chưa được gán kho làm việc.")
+                if id_kho != current_user.assigned_kho:
+                    raise ValueError(f"Bạn chỉ được xuất kho {current_user.assigned_kho}.")
+
+            lines = _read_invoice_lines(d, "gia_ban", price_required=False)
+
+            # staff: tự gán mã NV
+            if is_staff():
+                id_nhan_vien = USERNAME_TO_NV.get(current_user.username.lower())
+            else:
+                id_nhan_vien = (d.get("id_nv") or None)
+
+            id_nhap_tay = (d.get("id_hd") or "").strip()
+            id_hd = id_nhap_tay or next_code("X")
+            ngay = datetime.strptime(d["ngay"], "%Y-%m-%dT%H:%M")
+            id_xe = d.get("id_xe") or None
+            id_kh = d.get("id_kh") or None
+            rows = [
+                dict(
+                    id_hoa_don_xuat=id_hd,
+                    id_san_pham=sp,
+                    id_kho=id_kho,
+                    so_san_pham_xuat=qty,
+                    gia_ban=gia,
+                    ngay_xuat=ngay,
+                    id_nhan_vien=id_nhan_vien,
+                    id_xe_van_chuyen=id_xe,
+                    id_khach_hang=id_kh,
+                )
+                for sp, qty, gia in lines
+            ]
+
+            def _ghi_phieu():
+                # trừ tồn trước: thiếu hàng ở dòng nào thì dừng luôn, chưa ghi hóa đơn
+                apply_deltas((id_kho, sp, -qty) for sp, qty, _ in lines)
+                gia_von = costing.issue((id_kho, sp, qty) for sp, qty, _ in lines)
+                for r in rows:
+                    r["don_gia_von"] = gia_von[(id_kho, r["id_san_pham"])]
+                if id_nhap_tay:
+                    claim("X", [id_hd])
+                kpi.on_invoices("xuat", rows)
+                db.session.execute(insert(HoaDonXuat), rows)
+                record_xuat((id_hd, sp, id_kho) for sp, _, _ in lines)
+
+            run_tx(_ghi_phieu)
+            flash(f"✅ Đã ghi nhận phiếu xuất kho {id_hd} ({len(lines)} dòng)", "success")
+        except InsufficientStock as e:
+            db.session.rollback()
+            flash(str(e), "danger")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Lỗi khi lưu: {e}", "danger")
+        return redirect(url_for("inventory.xuat_kho"))
+
+    # ===== GET =====
+    khos = limit_khos_for_user()
+
+    # Kho cho FORM
+    selected_kho_req = request.args.get("kho", "ALL")
+    selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    # Lịch sử
+    conds, flt = _xuat_hist_filters(request.args)
+    items, next_cursor, paged = ledger.page("xuat", conds, request.args)
+
+    # Dropdown cho form
+    if is_staff():
+        nvs = []
+        staff_nv_label = current_user.full_name or current_user.username
+    else:
+        nvs = ref_rows("nhan_vien")
+        staff_nv_label = None
+
+    # Sản phẩm / khách hàng của FORM được gợi ý khi gõ (goi_y_san_pham, goi_y_khach_hang)
+    xes = ref_rows("xe_van_chuyen")
+
+    return render_template(
+        "xuat_kho.html",
+        items=items,
+        nvs=nvs,
+        xes=xes,
+        khos=khos,
+        selected_kho=selected_kho,
+        staff_nv_label=staff_nv_label,
+        next_cursor=next_cursor,
+        paged=paged,
+        page_args=_page_args(),
+        **flt
+    )
+
+# ---- Điều chuyển (ADMIN ONLY) ----
+@bp.route("/dieu-chuyen", methods=["GET", "POST"])
+@login_required
+def dieu_chuyen():
+    if is_staff():
+        flash("Bạn không có quyền điều chuyển hàng.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    khos = ref_rows("kho")
+
+    if request.method == "POST":
+        d = request.form
+        kho_src = (d.get("kho_src") or "").strip()
+        kho_dst = (d.get("kho_dst") or "").strip()
+
+        if not kho_src or not kho_dst:
+            flash("Vui lòng chọn kho nguồn và kho đích.", "warning")
+            return redirect(url_for("inventory.dieu_chuyen"))
+        if kho_src == kho_dst:
+            flash("Kho nguồn và kho đích phải khác nhau.", "warning")
+            return redirect(url_for("inventory.dieu_chuyen"))
+
+        try:
+            ngay = datetime.strptime(d.get("ngay"), "%Y-%m-%dT%H:%M")
+        except Exception:
+            flash("Ngày không hợp lệ.", "warning")
+            return redirect(url_for("inventory.dieu_chuyen"))
+
+        note = (d.get("ghi_chu") or "").strip() or None
+
+        sp_ids  = d.getlist("id_sp[]")
+        sl_list = d.getlist("so_luong[]")
+        lines = []
+        for sp, sl in zip(sp_ids, sl_list):
+            sp = (sp or "").strip()
+            try:
+                qty = int(sl)
+            except Exception:
+                qty = 0
+            if sp and qty > 0:
+                lines.append((sp, qty))
+
+        if not lines:
+            flash("Chưa chọn sản phẩm / số lượng hợp lệ.", "warning")
+            return redirect(url_for("inventory.dieu_chuyen"))
+
+        id_nhap_tay = (d.get("id_dc") or "").strip()
+        id_dc = id_nhap_tay or next_code("DC")
+
+        def _ghi_phieu():
+            # khóa tồn nguồn + đích một lần, thiếu hàng ở bất kỳ dòng nào -> InsufficientStock
+            qty = transfer(kho_src, kho_dst, lines)
+            # giá vốn đi theo hàng: xuất khỏi kho nguồn rồi nhập kho đích cùng đơn giá
+            gia_von = costing.issue((kho_src, sp, q) for sp, q in qty.items())
+            costing.receive((kho_dst, sp, q, gia_von[(kho_src, sp)], ngay) for sp, q in qty.items())
+
+            if id_nhap_tay:
+                claim("DC", [id_dc])
+            db.session.add(DieuChuyen(
+                id_dieu_chuyen=id_dc,
+                kho_nguon=kho_src,
+                kho_dich=kho_dst,
+                ngay_dc=ngay,
+                ghi_chu=note
+            ))
+            db.session.flush()
+            db.session.execute(insert(DieuChuyenCT.__table__), [
+                dict(id_dieu_chuyen=id_dc, id_san_pham=sp, so_luong=q, don_gia_von=gia_von[(kho_src, sp)])
+                for sp, q in qty.items()
+            ])
+
+        try:
+            run_tx(_ghi_phieu)
+            flash(f"✅ Đã ghi nhận điều chuyển {id_dc}.", "success")
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Lỗi điều chuyển: {e}", "danger")
+
+        return redirect(url_for("inventory.dieu_chuyen"))
+
+    recent = db.session.query(DieuChuyen, DieuChuyenCT, SanPham.ten_san_pham)\
+        .join(DieuChuyenCT, DieuChuyen.id_dieu_chuyen == DieuChuyenCT.id_dieu_chuyen)\
+        .outerjoin(SanPham, SanPham.id_san_pham == DieuChuyenCT.id_san_pham)\
+        .order_by(DieuChuyen.ngay_dc.desc()).limit(10).all()
+
+    return render_template("dieu_chuyen.html",
+                           khos=khos, recent=recent)
+
+
+@bp.route("/dieu-chuyen/lich-su")
+@login_required
+def lich_su_dieu_chuyen():
+    """Lịch sử điều chuyển phân trang keyset theo (ngay_dc, id) + ma trận luồng kho -> kho của kỳ lọc."""
+    if not is_admin():
+        flash("Bạn không có quyền xem lịch sử điều chuyển.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    args = request.args.to_dict()
+    if not args.get("from") and not args.get("to"):
+        args["from"] = (datetime.now() - timedelta(days=29)).strftime("%Y-%m-%d")
+    conds, filters = _dc_hist_filters(args)
+
+    # trang: keyset trên (ngay_dc, id_dieu_chuyen) giảm dần; ix_dc_ngay (InnoDB kèm PK) phục vụ ORDER BY
+    after_id = request.args.get("after_id")
+    try:
+        after = datetime.fromisoformat(request.args.get("after", "")) if after_id else None
+    except ValueError:
+        after = None
+    size = current_app.config.get("TRANSFER_PAGE_SIZE", 50)
+    stmt = select(DieuChuyen).where(*conds)
+    if after:
+        stmt = stmt.where(DieuChuyen.ngay_dc <= after,
+                          or_(DieuChuyen.ngay_dc < after, DieuChuyen.id_dieu_chuyen < after_id))
+    hdrs = db.session.execute(
+        stmt.order_by(DieuChuyen.ngay_dc.desc(), DieuChuyen.id_dieu_chuyen.desc()).limit(size + 1)
+    ).scalars().all()
+    next_cursor = None
+    if len(hdrs) > size:
+        hdrs = hdrs[:size]
+        next_cursor = (hdrs[-1].ngay_dc.isoformat(), hdrs[-1].id_dieu_chuyen)
+
+    # chi tiết của cả trang: một truy vấn
+    lines = {}
+    if hdrs:
+        for ct_id, sp, ten, sl, gia in db.session.execute(
+            select(DieuChuyenCT.id_dieu_chuyen, DieuChuyenCT.id_san_pham, SanPham.ten_san_pham,
+                   DieuChuyenCT.so_luong, DieuChuyenCT.don_gia_von)
+            .outerjoin(SanPham, SanPham.id_san_pham == DieuChuyenCT.id_san_pham)
+            .where(DieuChuyenCT.id_dieu_chuyen.in_([h.id_dieu_chuyen for h in hdrs]))
+            .order_by(DieuChuyenCT.id_dieu_chuyen, DieuChuyenCT.id_san_pham)
+        ):
+            lines.setdefault(ct_id, []).append((sp, ten, sl, gia))
+
+    # ma trận luồng kho nguồn × kho đích cho cả kỳ lọc (không phụ thuộc trang): một GROUP BY
+    flow_conds = list(conds)
+    if filters["f_sp"]:
+        flow_conds.append(DieuChuyenCT.id_san_pham == filters["f_sp"])
+    flow = {}
+    for src, dst, so_phieu, sl, gia_tri in db.session.execute(
+        select(DieuChuyen.kho_nguon, DieuChuyen.kho_dich,
+               func.count(func.distinct(DieuChuyen.id_dieu_chuyen)),
+               func.coalesce(func.sum(DieuChuyenCT.so_luong), 0),
+               func.coalesce(func.sum(DieuChuyenCT.so_luong * func.coalesce(DieuChuyenCT.don_gia_von, 0)), 0))
+        .join(DieuChuyenCT, DieuChuyenCT.id_dieu_chuyen == DieuChuyen.id_dieu_chuyen)
+        .where(*flow_conds)
+        .group_by(DieuChuyen.kho_nguon, DieuChuyen.kho_dich)
+    ):
+        flow[(src, dst)] = dict(so_phieu=int(so_phieu), so_luong=int(sl), gia_tri=float(gia_tri))
+    flow_khos = sorted({k for key in flow for k in key})
+    out_tot = {k: sum(v["so_luong"] for (s, _), v in flow.items() if s == k) for k in flow_khos}
+    in_tot = {k: sum(v["so_luong"] for (_, d), v in flow.items() if d == k) for k in flow_khos}
+
+    page_args = {k: v for k, v in args.items() if k not in ("after", "after_id")}
+    return render_template("lich_su_dieu_chuyen.html", khos=ref_rows("kho"), hdrs=hdrs, lines=lines,
+                           flow=flow, flow_khos=flow_khos, out_tot=out_tot, in_tot=in_tot,
+                           next_cursor=next_cursor, paged=bool(after), page_args=page_args, **filters)
+
+
+@bp.route("/api/su-kien/ton-kho")
+@login_required
+def su_kien_ton_kho():
+    """Luồng SSE thay đổi tồn kho (events.py), lọc theo kho user được xem; ?kho= để thu hẹp."""
+    allowed = current_user.allowed_khos()
+    kho = (request.args.get("kho") or "").strip()
+    if kho and kho != "ALL":
+        khos = [kho] if allowed is None or kho in allowed else []
+    else:
+        khos = allowed
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("last_id")
+
+    cfg = current_app.config
+    heartbeat = cfg.get("SSE_HEARTBEAT_SECONDS", 15)
+    max_seconds = cfg.get("SSE_MAX_SECONDS", 300)
+    retry_ms = cfg.get("SSE_RETRY_MS", 3000)
+    bus = events.bus()
+    sub = bus.subscribe(khos, last_id)
+    # luồng có thể mở nhiều phút: trả kết nối DB về pool ngay
+    db.session.remove()
+
+    def stream():
+        # hết max_seconds thì đóng để giải phóng worker; trình duyệt tự nối lại bằng Last-Event-ID
+        deadline = time.monotonic() + max_seconds
+        try:
+            yield f"retry: {retry_ms}\n\n"
+            while time.monotonic() < deadline:
+                ev = sub.get(timeout=heartbeat)
+                if ev is None:
+                    yield ": ping\n\n"
+                    continue
+                yield events.sse_format(bus, ev)
+                if ev is events.RESET:
+                    break
+        finally:
+            bus.unsubscribe(sub)
+
+    return Response(stream(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+def _split_list(v):
+    if isinstance(v, str):
+        v = v.split(",")
+    seen, out = set(), []
+    for x in v or ():
+        x = str(x).strip()
+        if x and x not in seen:
+            seen.add(x)
+            out.append(x)
+    return out
+
+@bp.route("/api/ton-kho", methods=["GET", "POST"])
+@login_required
+def api_ton_kho():
+    """Tồn của nhiều SKU ở một / nhiều kho trong một lần gọi (stock_api.py).
+
+    GET ?sp=SP001,SP002&kho=K1,K2  hoặc  POST {"sp": [...], "kho": [...]}; không có kho = mọi kho được phép.
+    Có ETag: gửi lại If-None-Match khi poll, tồn không đổi thì nhận 304.
+    """
+    if request.method == "POST":
+        body = request.get_json(silent=True) or {}
+        skus, khos = _split_list(body.get("sp")), _split_list(body.get("kho"))
+    else:
+        skus, khos = _split_list(request.args.get("sp")), _split_list(request.args.get("kho"))
+
+    max_skus = current_app.config.get("STOCK_API_MAX_SKUS", 5000)
+    if not skus:
+        return stock_api.json_response({"error": "Thiếu danh sách mã SP (sp)."}, 400)
+    if len(skus) > max_skus:
+        return stock_api.json_response({"error": f"Tối đa {max_skus} mã SP mỗi lần gọi."}, 400)
+
+    allowed = current_user.allowed_khos()
+    if not khos:
+        khos = [k.id_kho for k in ref_rows("kho")] if allowed is None else list(allowed)
+    elif allowed is not None and any(k not in allowed for k in khos):
+        return stock_api.json_response({"error": "Không có quyền xem kho này."}, 403)
+    if not khos:
+        return stock_api.json_response({"error": "Tài khoản chưa được gán kho."}, 403)
+
+    etag = stock_api.etag_for(khos, skus)
+    headers = {"ETag": f'"{etag}"', "Cache-Control": "private, no-cache"}
+    if request.if_none_match.contains(etag):
+        return Response(status=304, headers=headers)
+    return stock_api.json_response({"kho": khos, "ton": stock_api.lookup(khos, skus)}, headers=headers)
+
+
+# ==== NHẬP HÀNG LOẠT HÓA ĐƠN TỪ FILE (ADMIN) ====
+@bp.route("/admin/import-hoa-don", methods=["GET", "POST"])
+@login_required
+def import_hoa_don():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    report = None
+    if request.method == "POST":
+        kind = request.form.get("kind", "nhap")
+        f = request.files.get("file")
+        if kind not in ("nhap", "xuat") or not f or not f.filename:
+            flash("Vui lòng chọn loại hóa đơn và file CSV/XLSX.", "warning")
+            return redirect(url_for("inventory.import_hoa_don"))
+        try:
+            report = import_invoices(kind, f.stream, f.filename)
+            flash(
+                f"Đã nhập {report['inserted']}/{report['rows']} dòng "
+                f"({report['rows_per_sec']} dòng/giây).",
+                "success" if not report["skipped"] else "warning",
+            )
+        except Exception as e:
+            db.session.rollback()
+            flash(f"Lỗi khi nhập file: {e}", "danger")
+
+    return render_template("import_hoa_don.html", report=report)
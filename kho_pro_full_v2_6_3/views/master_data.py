@@ -0,0 +1,294 @@
+"""Danh mục: kho, địa điểm, nhà cung cấp, khách hàng, xe vận chuyển."""
+
+from flask import Blueprint, current_app, render_template, redirect, url_for, request, flash
+from flask_login import login_required
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Kho, NhaCungCap, XeVanChuyen, KhachHang, DiaDiem
+from sequences import next_code, claim
+from ref_cache import ref_rows, bump_version
+from search import apply_search, paginate
+
+from views.common import is_admin
+
+bp = Blueprint("master_data", __name__)
+
+# ---- Danh mục view-only ----
+@bp.route("/dm/kho")
+@login_required
+def kho_list():
+    rows = db.session.query(Kho).order_by(Kho.id_kho).all()
+    data = [(r.id_kho, r.ten_kho, r.id_dia_diem) for r in rows]
+    headers = ["Mã kho", "Tên kho", "Địa điểm"]
+    return render_template("list_generic.html", title="Kho hàng", headers=headers, rows=data)
+
+@bp.route("/dm/dia-diem")
+@login_required
+def dia_diem_list():
+    rows = db.session.query(DiaDiem).order_by(DiaDiem.id_dia_diem).all()
+    data = [(r.id_dia_diem, r.ten_dia_diem) for r in rows]
+    return render_template("list_generic.html", title="Địa điểm", headers=["Mã", "Tên"], rows=data)
+
+# ==== QUẢN LÝ NHÀ CUNG CẤP (ADMIN CRUD) ====
+@bp.route("/dm/nha-cung-cap/manage")
+@login_required
+def ncc_manage():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    q = request.args.get("q", "").strip()
+    page = request.args.get("page", 1, type=int)
+    qry, ranked = apply_search(NhaCungCap.query, "nha_cung_cap", q)
+    if not ranked:
+        qry = qry.order_by(NhaCungCap.id_nha_cung_cap)
+    rows, has_next = paginate(qry, page, current_app.config.get("SEARCH_PAGE_SIZE", 50))
+    return render_template("ncc_manage.html", rows=rows, q=q, page=page, has_next=has_next)
+
+@bp.route("/dm/nha-cung-cap/create", methods=["GET","POST"])
+@login_required
+def ncc_create():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        ncc = NhaCungCap(
+            id_nha_cung_cap=(d.get("id_nha_cung_cap") or "").strip() or next_code("NCC"),
+            ten_nha_cung_cap=d.get("ten_nha_cung_cap").strip(),
+            so_dien_thoai_nha_cung_cap=(d.get("so_dien_thoai_nha_cung_cap") or "").strip() or None,
+            id_dia_chi=(d.get("dia_diem") or "").strip() or None,
+        )
+        db.session.add(ncc)
+        claim("NCC", [d.get("id_nha_cung_cap")])
+        bump_version("nha_cung_cap")
+        db.session.commit()
+        flash("Đã thêm nhà cung cấp.", "success")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    dds = ref_rows("dia_diem")
+    return render_template("ncc_form.html", item=None, dds=dds)
+
+@bp.route("/dm/nha-cung-cap/<id>/edit", methods=["GET","POST"])
+@login_required
+def ncc_edit(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    item = db.session.get(NhaCungCap, id)
+    if not item:
+        flash("Không tìm thấy nhà cung cấp.", "warning")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        item.ten_nha_cung_cap = d.get("ten_nha_cung_cap").strip()
+        item.so_dien_thoai_nha_cung_cap = (d.get("so_dien_thoai_nha_cung_cap") or "").strip() or None
+        item.id_dia_chi = (d.get("dia_diem") or "").strip() or None
+        bump_version("nha_cung_cap")
+        db.session.commit()
+        flash("Đã cập nhật.", "success")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    dds = ref_rows("dia_diem")
+    return render_template("ncc_form.html", item=item, dds=dds)
+
+@bp.route("/dm/nha-cung-cap/<id>/delete", methods=["POST"])
+@login_required
+def ncc_delete(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.ncc_manage"))
+
+    item = db.session.get(NhaCungCap, id)
+    if item:
+        try:
+            db.session.delete(item)
+            bump_version("nha_cung_cap")
+            db.session.commit()
+            flash("Đã xóa.", "success")
+        except IntegrityError:
+            db.session.rollback()
+            flash("Không thể xóa: đã có dữ liệu liên quan.", "danger")
+    return redirect(url_for("master_data.ncc_manage"))
+
+# ==== QUẢN LÝ KHÁCH HÀNG (ADMIN CRUD) ====
+@bp.route("/dm/khach-hang/manage")
+@login_required
+def kh_manage():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    q = request.args.get("q", "").strip()
+    page = request.args.get("page", 1, type=int)
+    query, ranked = apply_search(KhachHang.query, "khach_hang", q)
+    if not ranked:
+        query = query.order_by(KhachHang.id_khach_hang)
+    rows, has_next = paginate(query, page, current_app.config.get("SEARCH_PAGE_SIZE", 50))
+    return render_template("kh_manage.html", rows=rows, q=q, page=page, has_next=has_next)
+
+@bp.route("/dm/khach-hang/create", methods=["GET","POST"])
+@login_required
+def kh_create():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.kh_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        kh = KhachHang(
+            id_khach_hang=(d.get("id_khach_hang") or "").strip() or next_code("KH"),
+            ho=(d.get("ho") or "").strip() or None,
+            ten_dem=(d.get("ten_dem") or "").strip() or None,
+            ten=(d.get("ten") or "").strip() or None,
+            so_dien_thoai=(d.get("so_dien_thoai") or "").strip() or None,
+            id_dia_chi=(d.get("dia_diem") or "").strip() or None,
+        )
+        db.session.add(kh)
+        claim("KH", [d.get("id_khach_hang")])
+        bump_version("khach_hang")
+        db.session.commit()
+        flash("Đã thêm khách hàng.", "success")
+        return redirect(url_for("master_data.kh_manage"))
+
+    dds = ref_rows("dia_diem")
+    return render_template("kh_form.html", item=None, dds=dds)
+
+@bp.route("/dm/khach-hang/<id>/edit", methods=["GET","POST"])
+@login_required
+def kh_edit(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.kh_manage"))
+
+    item = db.session.get(KhachHang, id)
+    if not item:
+        flash("Không tìm thấy khách hàng.", "warning")
+        return redirect(url_for("master_data.kh_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        item.ho = (d.get("ho") or "").strip() or None
+        item.ten_dem = (d.get("ten_dem") or "").strip() or None
+        item.ten = (d.get("ten") or "").strip() or None
+        item.so_dien_thoai = (d.get("so_dien_thoai") or "").strip() or None
+        item.id_dia_chi = (d.get("dia_diem") or "").strip() or None
+        bump_version("khach_hang")
+        db.session.commit()
+        flash("Đã cập nhật.", "success")
+        return redirect(url_for("master_data.kh_manage"))
+
+    dds = ref_rows("dia_diem")
+    return render_template("kh_form.html", item=item, dds=dds)
+
+@bp.route("/dm/khach-hang/<id>/delete", methods=["POST"])
+@login_required
+def kh_delete(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.kh_manage"))
+
+    item = db.session.get(KhachHang, id)
+    if item:
+        try:
+            db.session.delete(item)
+            bump_version("khach_hang")
+            db.session.commit()
+            flash("Đã xóa.", "success")
+        except IntegrityError:
+            db.session.rollback()
+            flash("Không thể xóa: đã có dữ liệu liên quan.", "danger")
+    return redirect(url_for("master_data.kh_manage"))
+
+# ==== QUẢN LÝ XE VẬN CHUYỂN (ADMIN CRUD) ====
+@bp.route("/dm/xe/manage")
+@login_required
+def xe_manage():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+
+    q = request.args.get("q", "").strip()
+    query = XeVanChuyen.query
+    if q:
+        like = f"%{q}%"
+        query = query.filter(
+            (XeVanChuyen.id_xe_van_chuyen.ilike(like)) |
+            (XeVanChuyen.bien_so.ilike(like))
+        )
+    rows = query.order_by(XeVanChuyen.id_xe_van_chuyen).all()
+    return render_template("xe_manage.html", rows=rows, q=q)
+
+@bp.route("/dm/xe/create", methods=["GET", "POST"])
+@login_required
+def xe_create():
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.xe_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        xe = XeVanChuyen(
+            id_xe_van_chuyen=(d.get("id_xe_van_chuyen") or "").strip() or next_code("VC"),
+            bien_so=d["bien_so"].strip(),
+            ho=(d.get("ho") or "").strip() or None,
+            ten_dem=(d.get("ten_dem") or "").strip() or None,
+            ten=(d.get("ten") or "").strip() or None,
+            so_dien_thoai_tai_xe=(d.get("so_dien_thoai_tai_xe") or "").strip() or None,
+        )
+        db.session.add(xe)
+        claim("VC", [d.get("id_xe_van_chuyen")])
+        bump_version("xe_van_chuyen")
+        db.session.commit()
+        flash("Đã thêm xe vận chuyển.", "success")
+        return redirect(url_for("master_data.xe_manage"))
+
+    return render_template("xe_form.html", item=None)
+
+@bp.route("/dm/xe/<id>/edit", methods=["GET", "POST"])
+@login_required
+def xe_edit(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.xe_manage"))
+
+    item = db.session.get(XeVanChuyen, id)
+    if not item:
+        flash("Không tìm thấy xe.", "warning")
+        return redirect(url_for("master_data.xe_manage"))
+
+    if request.method == "POST":
+        d = request.form
+        item.bien_so = d["bien_so"].strip()
+        item.ho = (d.get("ho") or "").strip() or None
+        item.ten_dem = (d.get("ten_dem") or "").strip() or None
+        item.ten = (d.get("ten") or "").strip() or None
+        item.so_dien_thoai_tai_xe = (d.get("so_dien_thoai_tai_xe") or "").strip() or None
+        bump_version("xe_van_chuyen")
+        db.session.commit()
+        flash("Đã cập nhật.", "success")
+        return redirect(url_for("master_data.xe_manage"))
+
+    return render_template("xe_form.html", item=item)
+
+@bp.route("/dm/xe/<id>/delete", methods=["POST"])
+@login_required
+def xe_delete(id):
+    if not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("master_data.xe_manage"))
+
+    item = db.session.get(XeVanChuyen, id)
+    if item:
+        try:
+            db.session.delete(item)
+            bump_version("xe_van_chuyen")
+            db.session.commit()
+            flash("Đã xóa.", "success")
+        except IntegrityError:
+            db.session.rollback()
+            flash("Không thể xóa: đã có dữ liệu liên quan.", "danger")
+    return redirect(url_for("master_data.xe_manage"))
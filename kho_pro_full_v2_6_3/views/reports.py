@@ -0,0 +1,286 @@
+"""Trang chủ, doanh thu, xuất file, công việc chạy nền, /metrics."""
+
+from datetime import datetime
+import os
+
+from flask import (
+    Blueprint, current_app, render_template, redirect, url_for, request, flash, abort, jsonify,
+    Response, send_file,
+)
+from flask_login import login_required, current_user
+from sqlalchemy import func, select
+
+from models import db, SanPham, HoaDonNhap, HoaDonXuat, DieuChuyen, DieuChuyenCT, DoanhThuNgay
+from exports import stream_rows, csv_response, xlsx_response
+from ref_cache import ref_rows
+import kpi
+import jobs
+import metrics
+
+from views.common import (
+    USERNAME_TO_NV, is_admin, is_staff, limit_khos_for_user, enforce_staff_kho, _parse_date_arg,
+    _nhap_hist_filters, _xuat_hist_filters, _dc_hist_filters,
+)
+
+bp = Blueprint("reports", __name__)
+
+# ==== SỐ LIỆU VẬN HÀNH (Prometheus text format) ====
+@bp.route("/metrics")
+def metrics_view():
+    """Cho máy thu thập nội bộ (METRICS_ALLOWED_IPS) hoặc admin đã đăng nhập."""
+    if request.remote_addr not in current_app.config.get("METRICS_ALLOWED_IPS", ()) and not is_admin():
+        abort(403)
+    return Response(metrics.registry().render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+# ==== THỐNG KÊ DOANH THU & BÁN CHẠY ====
+def _doanh_thu_report(selected_kho, fdt, tdt):
+    """Doanh thu / giá vốn / lợi nhuận theo ngày + top bán chạy (trang doanh thu & export).
+
+    Đọc từ bảng tổng hợp doanh_thu_ngay (rollup.py) thay vì quét hoa_don_xuat.
+    """
+    conds = [DoanhThuNgay.sl_xuat > 0]
+    if selected_kho != "ALL":
+        conds.append(DoanhThuNgay.id_kho == selected_kho)
+    if fdt:
+        conds.append(DoanhThuNgay.ngay >= fdt.date())
+    if tdt:
+        conds.append(DoanhThuNgay.ngay <= tdt.date())
+
+    # --- Doanh thu / giá vốn theo ngày ---
+    daily = db.session.execute(
+        select(
+            DoanhThuNgay.ngay,
+            func.sum(DoanhThuNgay.doanh_thu),
+            func.sum(DoanhThuNgay.gia_von),
+        ).where(*conds).group_by(DoanhThuNgay.ngay).order_by(DoanhThuNgay.ngay)
+    ).all()
+
+    # --- Lợi nhuận ---
+    rows = []
+    total_rev = total_cogs = 0.0
+    for d, rev, cogs in daily:
+        rev, cogs = float(rev or 0), float(cogs or 0)
+        rows.append({
+            "date": d.strftime("%Y-%m-%d"),
+            "revenue": rev,
+            "cogs": cogs,
+            "profit": rev - cogs
+        })
+        total_rev += rev
+        total_cogs += cogs
+    total_profit = total_rev - total_cogs
+
+    # --- Top bán chạy ---
+    qty = func.sum(DoanhThuNgay.sl_xuat)
+    amt = func.sum(DoanhThuNgay.doanh_thu)
+    top_by_qty = db.session.execute(
+        select(DoanhThuNgay.id_san_pham, qty.label("qty")).where(*conds)
+        .group_by(DoanhThuNgay.id_san_pham).order_by(qty.desc()).limit(10)
+    ).all()
+    top_by_rev = db.session.execute(
+        select(DoanhThuNgay.id_san_pham, amt.label("amt")).where(*conds)
+        .group_by(DoanhThuNgay.id_san_pham).order_by(amt.desc()).limit(10)
+    ).all()
+
+    return dict(
+        rows=rows,
+        total_rev=total_rev,
+        total_cogs=total_cogs,
+        total_profit=total_profit,
+        top_by_qty=top_by_qty,
+        top_by_rev=top_by_rev,
+    )
+
+@bp.route("/doanh-thu")
+@login_required
+def doanh_thu_view():
+    kho_req = request.args.get("kho", "ALL")
+    selected_kho = enforce_staff_kho(kho_req, allow_all=True)
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    date_from = request.args.get("from", "")
+    date_to = request.args.get("to", "")
+    fdt = _parse_date_arg(date_from, end=False)
+    tdt = _parse_date_arg(date_to, end=True)
+
+    rep = _doanh_thu_report(selected_kho, fdt, tdt)
+
+    return render_template(
+        "doanh_thu.html",
+        khos=limit_khos_for_user(),
+        selected_kho=selected_kho,
+        date_from=date_from,
+        date_to=date_to,
+        **rep
+    )
+
+# ==== XUẤT FILE CSV / XLSX (cùng bộ lọc với trang) ====
+def _job_scope():
+    """Phạm vi quyền của người dùng hiện tại (nằm trong băm tham số công việc nền)."""
+    if is_staff():
+        return f"staff:{current_user.assigned_kho}:{USERNAME_TO_NV.get(current_user.username.lower()) or ''}"
+    return "admin"
+
+def _export_spec(kind, args):
+    """(header, produce, params) cho một loại export; quyền + bộ lọc được áp ngay tại đây.
+
+    produce() không dùng request / current_user nên chạy được cả trong luồng nền (jobs.py).
+    """
+    if kind == "nhap":
+        conds, params = _nhap_hist_filters(args)
+        header = ["Hóa đơn", "Sản phẩm", "Kho", "Số lượng", "Giá nhập",
+                  "Ngày nhập", "Nhân viên", "Nhà cung cấp"]
+        stmt = select(
+            HoaDonNhap.id_hoa_don_nhap, HoaDonNhap.id_san_pham, HoaDonNhap.id_kho,
+            HoaDonNhap.so_san_pham_nhap, HoaDonNhap.gia_nhap, HoaDonNhap.ngay_nhap,
+            HoaDonNhap.id_nhan_vien, HoaDonNhap.id_nha_cung_cap,
+        ).where(*conds).order_by(HoaDonNhap.ngay_nhap.desc())
+
+    elif kind == "xuat":
+        conds, params = _xuat_hist_filters(args)
+        header = ["Hóa đơn", "Sản phẩm", "Kho", "Số lượng", "Giá bán",
+                  "Ngày xuất", "Nhân viên", "Xe VC", "Khách hàng"]
+        stmt = select(
+            HoaDonXuat.id_hoa_don_xuat, HoaDonXuat.id_san_pham, HoaDonXuat.id_kho,
+            HoaDonXuat.so_san_pham_xuat, HoaDonXuat.gia_ban, HoaDonXuat.ngay_xuat,
+            HoaDonXuat.id_nhan_vien, HoaDonXuat.id_xe_van_chuyen, HoaDonXuat.id_khach_hang,
+        ).where(*conds).order_by(HoaDonXuat.ngay_xuat.desc())
+
+    elif kind == "dieu-chuyen":
+        conds, params = _dc_hist_filters(args)
+        if params["f_sp"]:
+            conds.append(DieuChuyenCT.id_san_pham == params["f_sp"])  # chỉ xuất dòng của SP đang lọc
+        header = ["Mã DC", "Ngày", "Kho nguồn", "Kho đích", "Mã SP", "Tên SP", "Số lượng", "Ghi chú"]
+        stmt = select(
+            DieuChuyen.id_dieu_chuyen, DieuChuyen.ngay_dc, DieuChuyen.kho_nguon, DieuChuyen.kho_dich,
+            DieuChuyenCT.id_san_pham, SanPham.ten_san_pham, DieuChuyenCT.so_luong, DieuChuyen.ghi_chu,
+        ).join(DieuChuyenCT, DieuChuyenCT.id_dieu_chuyen == DieuChuyen.id_dieu_chuyen)\
+         .join(SanPham, SanPham.id_san_pham == DieuChuyenCT.id_san_pham)\
+         .where(*conds).order_by(DieuChuyen.ngay_dc.desc(), DieuChuyen.id_dieu_chuyen)
+
+    elif kind == "doanh-thu":
+        selected_kho = enforce_staff_kho(args.get("kho", "ALL"), allow_all=True)
+        if is_staff():
+            selected_kho = current_user.assigned_kho
+        fdt = _parse_date_arg(args.get("from", ""), end=False)
+        tdt = _parse_date_arg(args.get("to", ""), end=True)
+        # khoảng ngày đã quy đổi (mặc định 30 ngày) để hai người xem cùng tháng dùng chung kết quả
+        params = dict(kho=selected_kho,
+                      date_from=fdt.isoformat(timespec="minutes") if fdt else "",
+                      date_to=tdt.isoformat(timespec="minutes") if tdt else "")
+        header = ["Ngày", "Doanh thu", "Giá vốn", "Lợi nhuận"]
+
+        def produce():
+            rep = _doanh_thu_report(selected_kho, fdt, tdt)
+            return ((r["date"], r["revenue"], r["cogs"], r["profit"]) for r in rep["rows"])
+        return header, produce, params
+
+    else:
+        abort(404)
+
+    return header, lambda: stream_rows(stmt), params
+
+@bp.route("/export/<kind>.<fmt>")
+@login_required
+def export_data(kind, fmt):
+    if fmt not in ("csv", "xlsx"):
+        abort(404)
+    if kind == "dieu-chuyen" and not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+    header, produce, _ = _export_spec(kind, request.args)
+    rows = produce()
+
+    filename = f"{kind}_{datetime.now():%Y%m%d_%H%M}"
+    if fmt == "csv":
+        return csv_response(filename, header, rows)
+    return xlsx_response(filename, header, rows)
+
+# ==== CÔNG VIỆC CHẠY NỀN (báo cáo / export lớn) ====
+@bp.route("/cong-viec/export/<kind>.<fmt>", methods=["POST"])
+@login_required
+def export_job(kind, fmt):
+    """Như export_data nhưng chạy nền; trùng tham số thì dùng lại công việc / file đã có."""
+    if fmt not in jobs.WRITERS:
+        abort(404)
+    if kind == "dieu-chuyen" and not is_admin():
+        flash("Bạn không có quyền.", "warning")
+        return redirect(url_for("reports.home_page"))
+    # nút "chạy nền" nằm trong form lọc (formmethod=post) nên bộ lọc đến qua form hoặc query
+    header, produce, params = _export_spec(kind, request.values)
+    job = jobs.submit(f"export:{kind}", params, _job_scope(), fmt, header, produce,
+                      filename=f"{kind}_{datetime.now():%Y%m%d_%H%M}", user=current_user.username)
+    if request.accept_mimetypes.best == "application/json":
+        return jsonify(jobs.to_dict(job)), 202
+    return redirect(url_for("reports.cong_viec_view", job_id=job.id))
+
+def _job_or_404(job_id):
+    job = jobs.get(job_id)
+    if job is None or not (is_admin() or job.pham_vi == _job_scope()):
+        abort(404)
+    return job
+
+@bp.route("/cong-viec/<job_id>")
+@login_required
+def cong_viec_view(job_id):
+    job = _job_or_404(job_id)
+    return render_template("cong_viec.html", job=job,
+                           poll_ms=current_app.config.get("JOB_POLL_MS", 2000))
+
+@bp.route("/api/cong-viec/<job_id>")
+@login_required
+def cong_viec_status(job_id):
+    job = _job_or_404(job_id)
+    data = jobs.to_dict(job)
+    if job.trang_thai == jobs.XONG:
+        data["url"] = url_for("reports.cong_viec_tai_ve", job_id=job.id)
+    return jsonify(data)
+
+@bp.route("/cong-viec/<job_id>/tai-ve")
+@login_required
+def cong_viec_tai_ve(job_id):
+    job = _job_or_404(job_id)
+    if job.trang_thai != jobs.XONG or not job.duong_dan or not os.path.exists(job.duong_dan):
+        abort(404)
+    return send_file(job.duong_dan, as_attachment=True, download_name=job.ten_file)
+
+
+# ---- Home (dashboard) ----
+@bp.route("/home")
+@login_required
+def home_page():
+    selected_kho_req = request.args.get("kho", "ALL")
+    selected_kho = enforce_staff_kho(selected_kho_req, allow_all=True)
+    khos = limit_khos_for_user()
+
+    if is_staff():
+        selected_kho = current_user.assigned_kho
+
+    # chỉ số đọc từ ảnh chụp chi_so_kho (kpi.py): một dòng mỗi kho, "ALL" = cộng các dòng
+    if selected_kho == "ALL":
+        kho_ids = [k.id_kho for k in ref_rows("kho")]
+    else:
+        kho_ids = [selected_kho] if selected_kho else []
+    kp = kpi.totals(kho_ids)
+
+    if selected_kho == "ALL":
+        # toàn hệ thống: số mã trong danh mục (đếm trên khóa chính)
+        stat_sp = db.session.query(func.count(SanPham.id_san_pham)).scalar() or 0
+    else:
+        stat_sp = kp["so_sp_con"]
+    stat_ton = kp["tong_ton"]
+    stat_don = kp["so_don_xuat"]
+
+    candidates = [v for v in (kp["nhap_cuoi"], kp["xuat_cuoi"]) if v]
+    stat_latest = candidates and max(candidates).strftime("%d/%m/%Y %H:%M") or "—"
+
+    return render_template(
+        "home.html",
+        stat_sp=stat_sp,
+        stat_ton=stat_ton,
+        stat_don=stat_don,
+        stat_latest=stat_latest,
+        khos=khos,
+        selected_kho=selected_kho,
+    )
@@ -25,6 +25,15 @@ DROP TABLE IF EXISTS khach_hang;
 DROP TABLE IF EXISTS chuc_vu;
 DROP TABLE IF EXISTS dia_diem;
 DROP TABLE IF EXISTS users;
+DROP TABLE IF EXISTS ma_so;
+DROP TABLE IF EXISTS phien_ban_du_lieu;
+DROP TABLE IF EXISTS doanh_thu_ngay;
+DROP TABLE IF EXISTS chi_so_kho;
+DROP TABLE IF EXISTS chi_so_kho_delta;
+DROP TABLE IF EXISTS canh_bao_ton;
+DROP TABLE IF EXISTS gia_von_tb;
+DROP TABLE IF EXISTS lop_gia_von;
+DROP TABLE IF EXISTS cong_viec;
 DROP TABLE IF EXISTS kho;
 SET FOREIGN_KEY_CHECKS = 1;
 
@@ -63,6 +72,8 @@ CREATE TABLE nha_cung_cap (
   ten_nha_cung_cap           VARCHAR(255) NOT NULL,
   so_dien_thoai_nha_cung_cap VARCHAR(20),
   id_dia_chi                 VARCHAR(100),
+  tim_kiem                   TEXT,
+  FULLTEXT INDEX ft_nha_cung_cap (tim_kiem) WITH PARSER ngram,
   CONSTRAINT fk_ncc_dd FOREIGN KEY (id_dia_chi)
     REFERENCES dia_diem(id_dia_diem)
     ON UPDATE CASCADE ON DELETE SET NULL
@@ -75,6 +86,11 @@ CREATE TABLE khach_hang (
   ten            VARCHAR(100),
   so_dien_thoai  VARCHAR(20),
   id_dia_chi     VARCHAR(100),
+  tim_kiem       TEXT,
+  INDEX ix_kh_ten (ten),
+  INDEX ix_kh_ho (ho),
+  INDEX ix_kh_sdt (so_dien_thoai),
+  FULLTEXT INDEX ft_khach_hang (tim_kiem) WITH PARSER ngram,
   CONSTRAINT fk_kh_dd FOREIGN KEY (id_dia_chi)
     REFERENCES dia_diem(id_dia_diem)
     ON UPDATE CASCADE ON DELETE SET NULL
@@ -108,7 +124,10 @@ CREATE TABLE san_pham (
   id_san_pham   VARCHAR(100) PRIMARY KEY,
   ten_san_pham  VARCHAR(255) NOT NULL,
   chat_lieu     VARCHAR(100),
-  mau           VARCHAR(100)
+  mau           VARCHAR(100),
+  tim_kiem      TEXT,  -- mã + tên + chất liệu + màu đã bỏ dấu; app tự điền khi khởi động
+  INDEX ix_sp_ten (ten_san_pham),
+  FULLTEXT INDEX ft_san_pham (tim_kiem) WITH PARSER ngram
 ) ENGINE=InnoDB;
 
 -- --------------------------
@@ -150,8 +169,15 @@ CREATE TABLE hoa_don_nhap (
   CONSTRAINT fk_hdn_ncc FOREIGN KEY (id_nha_cung_cap) REFERENCES nha_cung_cap(id_nha_cung_cap)
     ON UPDATE CASCADE ON DELETE SET NULL,
   INDEX ix_hdn_sp (id_san_pham),
-  INDEX ix_hdn_kho (id_kho),
-  INDEX ix_hdn_ngay (ngay_nhap)
+  INDEX ix_hdn_kho_sp_ngay (id_kho, id_san_pham, ngay_nhap),
+  -- lịch sử nhập: (cột lọc, ngày, mã HĐ, mã SP) khớp ORDER BY của trang, không filesort
+  INDEX ix_hdn_ngay_id (ngay_nhap, id_hoa_don_nhap, id_san_pham),
+  INDEX ix_hdn_kho_ngay (id_kho, ngay_nhap, id_hoa_don_nhap, id_san_pham),
+  INDEX ix_hdn_nv_ngay (id_nhan_vien, ngay_nhap, id_hoa_don_nhap, id_san_pham),
+  INDEX ix_hdn_ncc_ngay (id_nha_cung_cap, ngay_nhap, id_hoa_don_nhap, id_san_pham),
+  -- kho + một bộ lọc khác (admin chọn kho rồi lọc thêm)
+  INDEX ix_hdn_kho_nv_ngay (id_kho, id_nhan_vien, ngay_nhap, id_hoa_don_nhap, id_san_pham),
+  INDEX ix_hdn_kho_ncc_ngay (id_kho, id_nha_cung_cap, ngay_nhap, id_hoa_don_nhap, id_san_pham)
 ) ENGINE=InnoDB;
 
 CREATE TABLE hoa_don_xuat (
@@ -164,6 +190,7 @@ CREATE TABLE hoa_don_xuat (
   id_nhan_vien     VARCHAR(100),
   id_xe_van_chuyen VARCHAR(100),
   id_khach_hang    VARCHAR(100),
+  don_gia_von      DECIMAL(18,4),
   PRIMARY KEY (id_hoa_don_xuat, id_san_pham, id_kho),
   CONSTRAINT fk_hdx_sp FOREIGN KEY (id_san_pham) REFERENCES san_pham(id_san_pham)
     ON UPDATE CASCADE ON DELETE RESTRICT,
@@ -176,8 +203,15 @@ CREATE TABLE hoa_don_xuat (
   CONSTRAINT fk_hdx_kh FOREIGN KEY (id_khach_hang) REFERENCES khach_hang(id_khach_hang)
     ON UPDATE CASCADE ON DELETE SET NULL,
   INDEX ix_hdx_sp (id_san_pham),
-  INDEX ix_hdx_kho (id_kho),
-  INDEX ix_hdx_ngay (ngay_xuat)
+  -- lịch sử xuất, như hoa_don_nhap
+  INDEX ix_hdx_ngay_id (ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_kho_ngay (id_kho, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_nv_ngay (id_nhan_vien, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_xe_ngay (id_xe_van_chuyen, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_kh_ngay (id_khach_hang, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_kho_nv_ngay (id_kho, id_nhan_vien, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_kho_xe_ngay (id_kho, id_xe_van_chuyen, ngay_xuat, id_hoa_don_xuat, id_san_pham),
+  INDEX ix_hdx_kho_kh_ngay (id_kho, id_khach_hang, ngay_xuat, id_hoa_don_xuat, id_san_pham)
 ) ENGINE=InnoDB;
 
 -- --------------------------
@@ -199,6 +233,7 @@ CREATE TABLE dieu_chuyen_ct (
   id_dieu_chuyen VARCHAR(100) NOT NULL,
   id_san_pham    VARCHAR(100) NOT NULL,
   so_luong       INT UNSIGNED NOT NULL,
+  don_gia_von    DECIMAL(18,4),
   PRIMARY KEY (id_dieu_chuyen, id_san_pham),
   CONSTRAINT fk_dcct_hd FOREIGN KEY (id_dieu_chuyen) REFERENCES dieu_chuyen(id_dieu_chuyen)
     ON UPDATE CASCADE ON DELETE CASCADE,
@@ -250,6 +285,124 @@ CREATE TABLE users (
     ON UPDATE CASCADE ON DELETE SET NULL
 ) ENGINE=InnoDB;
 
+-- --------------------------
+-- Bộ đếm cấp mã (N/X/DC/SP/KH/NCC/VC) - app tự khởi tạo từ dữ liệu cũ
+-- --------------------------
+CREATE TABLE ma_so (
+  tien_to  VARCHAR(20) PRIMARY KEY,
+  gia_tri  BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Phiên bản dữ liệu danh mục (cache tham chiếu trong app)
+-- --------------------------
+CREATE TABLE phien_ban_du_lieu (
+  ten_bang   VARCHAR(64) PRIMARY KEY,
+  phien_ban  BIGINT NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Tổng hợp bán hàng theo ngày (app tự cộng dồn; tính lại: flask rebuild-doanh-thu)
+-- --------------------------
+CREATE TABLE doanh_thu_ngay (
+  ngay          DATE          NOT NULL,
+  id_kho        VARCHAR(50)   NOT NULL,
+  id_san_pham   VARCHAR(100)  NOT NULL,
+  sl_xuat       INT           NOT NULL DEFAULT 0,
+  doanh_thu     DECIMAL(18,2) NOT NULL DEFAULT 0,
+  gia_von       DECIMAL(18,2) NOT NULL DEFAULT 0,
+  sl_nhap       INT           NOT NULL DEFAULT 0,
+  gia_tri_nhap  DECIMAL(18,2) NOT NULL DEFAULT 0,
+  PRIMARY KEY (ngay, id_kho, id_san_pham),
+  INDEX ix_dtn_kho_ngay (id_kho, ngay)
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Chỉ số trang chủ theo kho (app tự cộng dồn qua chi_so_kho_delta; cap_nhat NULL / quá hạn -> tính lại)
+-- --------------------------
+CREATE TABLE chi_so_kho (
+  id_kho       VARCHAR(50)  PRIMARY KEY,
+  so_sp_con    INT          NOT NULL DEFAULT 0,
+  tong_ton     BIGINT       NOT NULL DEFAULT 0,
+  so_don_xuat  INT          NOT NULL DEFAULT 0,
+  nhap_cuoi    DATETIME,
+  xuat_cuoi    DATETIME,
+  cap_nhat     DATETIME,
+  phien_ban    BIGINT       NOT NULL DEFAULT 0
+) ENGINE=InnoDB;
+
+-- phần cộng dồn của từng giao dịch ghi (chỉ INSERT; lần tính lại gộp vào chi_so_kho rồi xóa)
+CREATE TABLE chi_so_kho_delta (
+  id           BIGINT       AUTO_INCREMENT PRIMARY KEY,
+  id_kho       VARCHAR(50)  NOT NULL,
+  so_sp_con    INT          NOT NULL DEFAULT 0,
+  tong_ton     BIGINT       NOT NULL DEFAULT 0,
+  so_don_xuat  INT          NOT NULL DEFAULT 0,
+  nhap_cuoi    DATETIME,
+  xuat_cuoi    DATETIME,
+  phien_ban    INT          NOT NULL DEFAULT 0,
+  INDEX ix_cskd_kho (id_kho, id)
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Cảnh báo tồn thấp (dong_luc NULL = đang mở; đối chiếu lại: flask sync-canh-bao)
+-- --------------------------
+CREATE TABLE canh_bao_ton (
+  id           BIGINT AUTO_INCREMENT PRIMARY KEY,
+  id_kho       VARCHAR(50)  NOT NULL,
+  id_san_pham  VARCHAR(100) NOT NULL,
+  so_luong     INT          NOT NULL,
+  nguong       INT          NOT NULL,
+  mo_luc       DATETIME     NOT NULL,
+  dong_luc     DATETIME,
+  INDEX ix_cbt_mo (dong_luc, id_kho, id_san_pham),
+  INDEX ix_cbt_kho_sp (id_kho, id_san_pham)
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Giá vốn (COSTING_METHOD: average -> gia_von_tb, fifo -> lop_gia_von)
+-- Để trống: lần chạy đầu app tự phát lại lịch sử (flask rebuild-gia-von)
+-- --------------------------
+CREATE TABLE gia_von_tb (
+  id_kho       VARCHAR(50)   NOT NULL,
+  id_san_pham  VARCHAR(100)  NOT NULL,
+  so_luong     INT           NOT NULL DEFAULT 0,
+  don_gia      DECIMAL(18,4) NOT NULL DEFAULT 0,
+  PRIMARY KEY (id_kho, id_san_pham)
+) ENGINE=InnoDB;
+
+CREATE TABLE lop_gia_von (
+  id            BIGINT AUTO_INCREMENT PRIMARY KEY,
+  id_kho        VARCHAR(50)   NOT NULL,
+  id_san_pham   VARCHAR(100)  NOT NULL,
+  ngay          DATETIME      NOT NULL,
+  so_luong_con  INT           NOT NULL,
+  don_gia       DECIMAL(18,4) NOT NULL,
+  INDEX ix_lgv_kho_sp_ngay (id_kho, id_san_pham, ngay, id)
+) ENGINE=InnoDB;
+
+-- --------------------------
+-- Công việc chạy nền (báo cáo / export lớn, jobs.py)
+-- --------------------------
+CREATE TABLE cong_viec (
+  id            VARCHAR(32)  PRIMARY KEY,
+  loai          VARCHAR(50)  NOT NULL,
+  tham_so_hash  VARCHAR(64)  NOT NULL,
+  tham_so       TEXT,
+  pham_vi       VARCHAR(100) NOT NULL,
+  trang_thai    VARCHAR(20)  NOT NULL DEFAULT 'cho',
+  tien_do       INT          NOT NULL DEFAULT 0,
+  thong_bao     VARCHAR(500),
+  ten_file      VARCHAR(255),
+  duong_dan     VARCHAR(500),
+  nguoi_tao     VARCHAR(100),
+  tao_luc       DATETIME     NOT NULL,
+  cap_nhat      DATETIME     NOT NULL,
+  ket_thuc      DATETIME,
+  het_han       DATETIME,
+  INDEX ix_cv_hash (tham_so_hash, tao_luc)
+) ENGINE=InnoDB;
+
 -- --------------------------
 -- DỮ LIỆU MẪU (Seed)
 -- --------------------------
@@ -270,83 +423,89 @@ INSERT INTO nhan_vien VALUES
 ('NV002','Trần','Thị','Bình','1996-07-21','0909000002','CV002'),
 ('NV003','Lê','Văn','Cường','1995-05-09','0909000003','CV002');
 
-INSERT INTO nha_cung_cap VALUES
-('NCC001','Nhà cung cấp Sao Mai','0288888888','DD004'),
-('NCC002','Nhà cung cấp Hồng Hà','0247777777','DD001');
+INSERT INTO nha_cung_cap (id_nha_cung_cap, ten_nha_cung_cap, so_dien_thoai_nha_cung_cap, id_dia_chi) VALUES
+('NCC0000001','Nhà cung cấp Sao Mai','0288888888','DD004'),
+('NCC0000002','Nhà cung cấp Hồng Hà','0247777777','DD001');
 
-INSERT INTO khach_hang VALUES
-('KH001','Phạm','Minh','Tuấn','0909888777','DD001'),
-('KH002','Lê','Thị','Hà','0909777666','DD004');
+INSERT INTO khach_hang (id_khach_hang, ho, ten_dem, ten, so_dien_thoai, id_dia_chi) VALUES
+('KH0000001','Phạm','Minh','Tuấn','0909888777','DD001'),
+('KH0000002','Lê','Thị','Hà','0909777666','DD004');
 
 INSERT INTO xe_van_chuyen VALUES
-('VC001','51A-123.45','Nguyễn','Văn','Tài','0912000001'),
-('VC002','43B-678.90','Đỗ','Thành','Công','0912000002');
+('VC0000001','51A-123.45','Nguyễn','Văn','Tài','0912000001'),
+('VC0000002','43B-678.90','Đỗ','Thành','Công','0912000002');
 
 INSERT INTO kho VALUES
 ('K1','Kho Hà Nội','DD001'),
 ('K2','Kho TP.HCM','DD004'),
 ('K3','Kho Đà Nẵng','DD003');
 
-INSERT INTO san_pham VALUES
-('SP001','Bút bi Thiên Long 0.5','Nhựa','Xanh'),
-('SP002','Vở học sinh 200 trang','Giấy','Trắng'),
-('SP003','Kéo học sinh','Thép + Nhựa','Đen'),
-('SP004','Thước kẻ 20cm','Nhựa','Trong suốt'),
-('SP005','Tẩy chì Campus','Cao su','Trắng'),
-('SP006','Bút chì 2B','Gỗ','Vàng'),
-('SP007','Bút dạ quang Stabilo','Nhựa','Vàng neon'),
-('SP008','Bìa hồ sơ A4','Nhựa','Xanh dương'),
-('SP009','Tập giấy note 3x3','Giấy','Vàng nhạt'),
-('SP010','Ghim bấm số 10','Thép','Bạc'),
-('SP011','Máy tính Casio FX-580VN X','Nhựa','Đen'),
-('SP012','Băng keo trong 5cm','Nhựa','Trong suốt'),
-('SP013','Kẹp giấy cỡ nhỏ','Thép','Đen'),
-('SP014','Bút lông bảng Thiên Long','Nhựa','Đỏ'),
-('SP015','Sổ tay lò xo A5','Giấy','Xanh'),
-('SP016','Giấy in A4 Double A','Giấy','Trắng'),
-('SP017','Chuột máy tính Logitech','Nhựa','Đen'),
-('SP018','Bàn phím không dây Logitech','Nhựa','Đen'),
-('SP019','Ổ cắm điện 3 chấu','Nhựa','Trắng'),
-('SP020','Bút xóa nước','Nhựa','Trắng');
+INSERT INTO san_pham (id_san_pham, ten_san_pham, chat_lieu, mau) VALUES
+('SP0000001','Bút bi Thiên Long 0.5','Nhựa','Xanh'),
+('SP0000002','Vở học sinh 200 trang','Giấy','Trắng'),
+('SP0000003','Kéo học sinh','Thép + Nhựa','Đen'),
+('SP0000004','Thước kẻ 20cm','Nhựa','Trong suốt'),
+('SP0000005','Tẩy chì Campus','Cao su','Trắng'),
+('SP0000006','Bút chì 2B','Gỗ','Vàng'),
+('SP0000007','Bút dạ quang Stabilo','Nhựa','Vàng neon'),
+('SP0000008','Bìa hồ sơ A4','Nhựa','Xanh dương'),
+('SP0000009','Tập giấy note 3x3','Giấy','Vàng nhạt'),
+('SP0000010','Ghim bấm số 10','Thép','Bạc'),
+('SP0000011','Máy tính Casio FX-580VN X','Nhựa','Đen'),
+('SP0000012','Băng keo trong 5cm','Nhựa','Trong suốt'),
+('SP0000013','Kẹp giấy cỡ nhỏ','Thép','Đen'),
+('SP0000014','Bút lông bảng Thiên Long','Nhựa','Đỏ'),
+('SP0000015','Sổ tay lò xo A5','Giấy','Xanh'),
+('SP0000016','Giấy in A4 Double A','Giấy','Trắng'),
+('SP0000017','Chuột máy tính Logitech','Nhựa','Đen'),
+('SP0000018','Bàn phím không dây Logitech','Nhựa','Đen'),
+('SP0000019','Ổ cắm điện 3 chấu','Nhựa','Trắng'),
+('SP0000020','Bút xóa nước','Nhựa','Trắng');
 
 -- Hóa đơn mẫu
 INSERT INTO hoa_don_nhap VALUES
-('N001','SP001','K1',200,3000.00,'2025-10-10 10:00:00','NV001','NCC001'),
-('N002','SP002','K1',150,8000.00,'2025-10-10 10:05:00','NV001','NCC002'),
-('N003','SP003','K2',100,12000.00,'2025-10-12 09:30:00','NV002','NCC001');
+('N0000001','SP0000001','K1',200,3000.00,'2025-10-10 10:00:00','NV001','NCC0000001'),
+('N0000002','SP0000002','K1',150,8000.00,'2025-10-10 10:05:00','NV001','NCC0000002'),
+('N0000003','SP0000003','K2',100,12000.00,'2025-10-12 09:30:00','NV002','NCC0000001');
 
-INSERT INTO hoa_don_xuat VALUES
-('X001','SP001','K1',50,5000.00,'2025-10-13 14:00:00','NV002','VC001','KH001'),
-('X002','SP002','K1',30,11000.00,'2025-10-13 14:05:00','NV002','VC001','KH001'),
-('X003','SP003','K2',10,18000.00,'2025-10-14 09:45:00','NV001','VC002','KH002');
+INSERT INTO hoa_don_xuat (id_hoa_don_xuat, id_san_pham, id_kho, so_san_pham_xuat, gia_ban, ngay_xuat,
+                          id_nhan_vien, id_xe_van_chuyen, id_khach_hang) VALUES
+('X0000001','SP0000001','K1',50,5000.00,'2025-10-13 14:00:00','NV002','VC0000001','KH0000001'),
+('X0000002','SP0000002','K1',30,11000.00,'2025-10-13 14:05:00','NV002','VC0000001','KH0000001'),
+('X0000003','SP0000003','K2',10,18000.00,'2025-10-14 09:45:00','NV001','VC0000002','KH0000002');
 
 -- Tồn kho ban đầu
 INSERT INTO ton_kho (id_kho, id_san_pham, so_luong, nguong_canh_bao) VALUES
-('K1','SP001',150,10),('K1','SP002',120,10),('K1','SP003',80,10),
-('K1','SP004',100,10),('K1','SP005',60,10),('K1','SP006',200,10),
-('K1','SP007',90,10),('K1','SP008',70,10),('K1','SP009',50,10),('K1','SP010',110,10),
+('K1','SP0000001',150,10),('K1','SP0000002',120,10),('K1','SP0000003',80,10),
+('K1','SP0000004',100,10),('K1','SP0000005',60,10),('K1','SP0000006',200,10),
+('K1','SP0000007',90,10),('K1','SP0000008',70,10),('K1','SP0000009',50,10),('K1','SP0000010',110,10),
 
-('K2','SP001',60,10),('K2','SP002',90,10),('K2','SP003',90,10),('K2','SP004',100,10),
-('K2','SP005',80,10),('K2','SP006',140,10),('K2','SP007',60,10),('K2','SP008',50,10),
-('K2','SP009',120,10),('K2','SP010',70,10),('K2','SP011',40,10),('K2','SP012',60,10),
-('K2','SP013',90,10),('K2','SP014',80,10),('K2','SP015',100,10),
+('K2','SP0000001',60,10),('K2','SP0000002',90,10),('K2','SP0000003',90,10),('K2','SP0000004',100,10),
+('K2','SP0000005',80,10),('K2','SP0000006',140,10),('K2','SP0000007',60,10),('K2','SP0000008',50,10),
+('K2','SP0000009',120,10),('K2','SP0000010',70,10),('K2','SP0000011',40,10),('K2','SP0000012',60,10),
+('K2','SP0000013',90,10),('K2','SP0000014',80,10),('K2','SP0000015',100,10),
 
-('K3','SP001',40,10),('K3','SP002',70,10),('K3','SP003',50,10),('K3','SP004',90,10),
-('K3','SP005',60,10),('K3','SP006',80,10),('K3','SP007',70,10),('K3','SP008',90,10),
-('K3','SP009',40,10),('K3','SP010',120,10),('K3','SP011',30,10),('K3','SP012',60,10),
-('K3','SP013',50,10),('K3','SP014',70,10),('K3','SP015',100,10),('K3','SP016',150,10),
-('K3','SP017',40,10),('K3','SP018',50,10),('K3','SP019',60,10),('K3','SP020',80,10);
+('K3','SP0000001',40,10),('K3','SP0000002',70,10),('K3','SP0000003',50,10),('K3','SP0000004',90,10),
+('K3','SP0000005',60,10),('K3','SP0000006',80,10),('K3','SP0000007',70,10),('K3','SP0000008',90,10),
+('K3','SP0000009',40,10),('K3','SP0000010',120,10),('K3','SP0000011',30,10),('K3','SP0000012',60,10),
+('K3','SP0000013',50,10),('K3','SP0000014',70,10),('K3','SP0000015',100,10),('K3','SP0000016',150,10),
+('K3','SP0000017',40,10),('K3','SP0000018',50,10),('K3','SP0000019',60,10),('K3','SP0000020',80,10);
 
 -- Điều chuyển mẫu
 INSERT INTO dieu_chuyen VALUES
-('DC001','K1','K2','2025-10-20 10:00:00','Chuyển bút bi sang kho 2');
-INSERT INTO dieu_chuyen_ct VALUES ('DC001','SP001',20);
-UPDATE ton_kho SET so_luong = so_luong - 20 WHERE id_kho='K1' AND id_san_pham='SP001';
+('DC0000001','K1','K2','2025-10-20 10:00:00','Chuyển bút bi sang kho 2');
+INSERT INTO dieu_chuyen_ct (id_dieu_chuyen, id_san_pham, so_luong) VALUES ('DC0000001','SP0000001',20);
+UPDATE ton_kho SET so_luong = so_luong - 20 WHERE id_kho='K1' AND id_san_pham='SP0000001';
 INSERT INTO ton_kho (id_kho,id_san_pham,so_luong,nguong_canh_bao)
-VALUES ('K2','SP001',20,10)
+VALUES ('K2','SP0000001',20,10)
 ON DUPLICATE KEY UPDATE so_luong = so_luong + 20;
 
--- Xoá users để ứng dụng tự bootstrap
+-- Cảnh báo tồn thấp cho dữ liệu mẫu (app tự duy trì từ đây)
+INSERT INTO canh_bao_ton (id_kho, id_san_pham, so_luong, nguong, mo_luc)
+SELECT id_kho, id_san_pham, so_luong, nguong_canh_bao, NOW()
+FROM ton_kho WHERE so_luong <= nguong_canh_bao;
+
+-- Xoá users; chạy `flask bootstrap` để tạo lại admin + nhân viên mặc định
 DELETE FROM users;
 
 -- (TÙY CHỌN) Tạo nhanh user (cần password_hash do app sinh):